@@ -0,0 +1,394 @@
+"""整本漫画的下载管理
+
+所有"下载漫画"请求进入同一个优先级队列，由固定数量的工作线程按优先级取出下载，
+同时下载的漫画数有上限；每本漫画可暂停、继续、取消，所有图片共享一个带宽上限。
+下载使用jmcomic的下载器子类，在章节和图片的回调中统计进度、检查暂停与取消、计入带宽。
+setting.yml只在第一次下载时读取，之后复用同一个JmOption。
+指定图片处理进程池（image_pipeline.ImagePipeline）时，下载线程只取回原始图片数据，
+还原和格式转换交给进程池，每个章节结束前等待该章节的图片全部写出。
+"""
+import heapq
+import itertools
+import logging
+import os
+import threading
+
+import metrics
+from rate_limit import TokenBucket
+
+logger = logging.getLogger("ComicBrowser.album")
+
+SETTING_PATH = "setting.yml"
+
+# 任务状态
+ALBUM_QUEUED = "queued"
+ALBUM_RUNNING = "running"
+ALBUM_PAUSED = "paused"
+ALBUM_DONE = "done"
+ALBUM_FAILED = "failed"
+ALBUM_CANCELLED = "cancelled"
+FINISHED_STATES = (ALBUM_DONE, ALBUM_FAILED, ALBUM_CANCELLED)
+
+# 优先级，数值大的先下载
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 5
+PRIORITY_HIGH = 10
+# 任务中保存的错误信息的最大长度
+ERROR_MAX_LENGTH = 200
+
+_downloader_class = None
+
+
+def load_option(path=SETTING_PATH):
+    """读取jmcomic下载配置，文件不存在时先写入默认配置"""
+    import jmcomic
+    if not os.path.exists(path):
+        jmcomic.JmOption.default().to_file(path)
+    return jmcomic.create_option_by_file(path)
+
+
+def downloader_class():
+    """jmcomic导入较慢，第一次下载时才定义下载器子类"""
+    global _downloader_class
+    if _downloader_class is None:
+        import jmcomic
+
+        class ManagedDownloader(jmcomic.JmDownloader):
+            """在jmcomic的下载回调中汇报进度，并在每个检查点处理暂停、取消和带宽限制"""
+
+            def __init__(self, option, task, manager):
+                self.task = task
+                self.manager = manager
+                # 交给进程池的图片: 原始数据大小（按路径）和未完成的Future（按章节目录）
+                self._sizes = {}
+                self._pending = {}
+                self._pending_lock = threading.Lock()
+                super().__init__(option)
+
+            def create_client(self):
+                client = super().create_client()
+                if self.manager.pipeline is not None:
+                    # 客户端取回图片后调用save_image_resp保存，在此改为提交到进程池
+                    client.save_image_resp = self._submit_image
+                return client
+
+            def _submit_image(self, decode_image, img_save_path, img_url, resp, scramble_id):
+                """在下载线程中调用，只取出原始数据，不做解码"""
+                url = img_url.split("?", 1)[0]
+                num = 0
+                if decode_image and scramble_id is not None:
+                    num = jmcomic.JmImageTool.get_num_by_url(scramble_id, url)
+                data = resp.content
+                self._sizes[img_save_path] = len(data)
+                if num == 0 and not jmcomic.suffix_not_equal(url, img_save_path):
+                    # 无需还原也无需转换格式，直接写入
+                    with open(img_save_path, "wb") as f:
+                        f.write(data)
+                    return
+                future = self.manager.pipeline.submit(data, num, img_save_path)
+                with self._pending_lock:
+                    self._pending.setdefault(os.path.normpath(os.path.dirname(img_save_path)), []).append(future)
+
+            def _wait_images(self, photo):
+                """等待该章节交给进程池的图片全部写出，有失败时抛出第一个异常"""
+                with self._pending_lock:
+                    futures = self._pending.pop(os.path.normpath(photo.save_path), [])
+                errors = [future.exception() for future in futures]
+                errors = [e for e in errors if e is not None]
+                if errors:
+                    metrics.incr("album.image_errors", len(errors))
+                    raise errors[0]
+
+            def raise_if_cancelled(self):
+                # jmcomic在每个章节、每张图片前后都会调用，暂停时在此阻塞
+                self.task.checkpoint()
+                if self.task.cancelled:
+                    raise jmcomic.DownloadCancelledException("用户取消")
+                super().raise_if_cancelled()
+
+            def before_album(self, album):
+                self.task.photos_total = len(album)
+                super().before_album(album)
+
+            def before_photo(self, photo):
+                super().before_photo(photo)
+                if not photo.skip:
+                    self.task.images_total += len(photo)
+
+            def after_photo(self, photo):
+                self._wait_images(photo)
+                super().after_photo(photo)
+                self.task.photos_done += 1
+
+            def after_image(self, image, img_save_path):
+                downloaded = not (image.cache and image.exists)
+                super().after_image(image, img_save_path)
+                size = self._sizes.pop(img_save_path, 0)
+                if downloaded:
+                    # 图片大小只有下载后才知道，按原始数据（未使用进程池时按保存的文件）大小计入带宽，超出时在此等待
+                    if not size:
+                        try:
+                            size = os.path.getsize(img_save_path)
+                        except OSError:
+                            pass
+                    self.manager.bandwidth.consume(size)
+                self.task.image_done(size)
+                self.manager._notify(self.task)
+
+        _downloader_class = ManagedDownloader
+    return _downloader_class
+
+
+class AlbumTask:
+    """一本漫画的下载任务；进度字段由工作线程更新，界面线程只读取"""
+
+    def __init__(self, comic_id, title, priority):
+        self.id = comic_id
+        self.title = title
+        self.priority = priority
+        self.state = ALBUM_QUEUED
+        self.error = ""
+        self.photos_done = 0
+        self.photos_total = 0
+        self.images_done = 0
+        self.images_total = 0
+        self.bytes = 0
+        self.control = None
+        self.cancelled = False
+        self._resume = threading.Event()
+        self._resume.set()
+
+    @property
+    def finished(self):
+        return self.state in FINISHED_STATES
+
+    def checkpoint(self):
+        """暂停时阻塞到继续或取消"""
+        self._resume.wait()
+
+    def image_done(self, size):
+        self.images_done += 1
+        self.bytes += size
+        metrics.incr("album.images")
+        metrics.incr("album.bytes", size)
+
+    def progress_text(self):
+        if not self.images_total:
+            return "0/?"
+        return f"{self.images_done}/{self.images_total}"
+
+    def as_dict(self):
+        return {
+            "id": self.id, "title": self.title, "priority": self.priority, "state": self.state,
+            "error": self.error, "photos_done": self.photos_done, "photos_total": self.photos_total,
+            "images_done": self.images_done, "images_total": self.images_total, "bytes": self.bytes,
+        }
+
+
+class AlbumDownloadManager:
+    """整本漫画的下载队列
+
+    max_albums: 同时下载的漫画数
+    bandwidth: 所有图片合计的下载速率上限（字节/秒），0表示不限
+    bucket: 全局请求速率令牌桶，每本漫画开始前取一个令牌
+    on_update(task): 任务状态或进度变化时在工作线程中调用
+    pipeline: 图片处理进程池（image_pipeline.ImagePipeline），None表示在下载线程中处理
+    """
+
+    def __init__(self, max_albums=2, bandwidth=0, bucket=None, on_update=None, option_loader=load_option,
+                 pipeline=None):
+        self.max_albums = max(1, int(max_albums))
+        self.bandwidth = TokenBucket(bandwidth, burst=bandwidth)
+        self.bucket = bucket
+        self.on_update = on_update
+        self.option_loader = option_loader
+        self.pipeline = pipeline
+        self.tasks = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._workers = []
+        self._closed = False
+        self._option = None
+        self._option_lock = threading.Lock()
+
+    @property
+    def option(self):
+        """setting.yml只读取一次，所有下载共用"""
+        with self._option_lock:
+            if self._option is None:
+                self._option = self.option_loader()
+            return self._option
+
+    def reload_option(self):
+        """setting.yml修改后调用，下一本漫画开始时重新读取"""
+        with self._option_lock:
+            self._option = None
+
+    def set_bandwidth(self, bytes_per_second):
+        self.bandwidth.set_rate(bytes_per_second, burst=bytes_per_second)
+
+    def submit(self, comic_id, title="", priority=PRIORITY_NORMAL):
+        """加入下载队列；已在队列中或正在下载时只更新优先级，返回任务"""
+        comic_id = str(comic_id)
+        with self._cond:
+            task = self.tasks.get(comic_id)
+            if task is not None and not task.finished:
+                self._set_priority(task, max(task.priority, priority))
+                return task
+            task = AlbumTask(comic_id, title, priority)
+            self.tasks[comic_id] = task
+            self._push(task)
+            self._ensure_workers()
+        self._notify(task)
+        return task
+
+    def _push(self, task):
+        heapq.heappush(self._heap, (-task.priority, next(self._counter), task))
+        self._cond.notify()
+
+    def _set_priority(self, task, priority):
+        if priority == task.priority:
+            return
+        task.priority = priority
+        # 旧的堆条目在取出时按优先级不一致丢弃
+        if task.state == ALBUM_QUEUED:
+            self._push(task)
+
+    def set_priority(self, comic_id, priority):
+        with self._cond:
+            task = self.tasks.get(str(comic_id))
+            if task is None or task.finished:
+                return
+            self._set_priority(task, priority)
+        self._notify(task)
+
+    def pause(self, comic_id):
+        """暂停任务：排队中的不会被取出，下载中的在下一张图片前停下（仍占用一个下载名额）"""
+        with self._cond:
+            task = self.tasks.get(str(comic_id))
+            if task is None or task.finished or task.state == ALBUM_PAUSED:
+                return
+            task._resume.clear()
+            task.state = ALBUM_PAUSED
+        self._notify(task)
+
+    def resume(self, comic_id):
+        with self._cond:
+            task = self.tasks.get(str(comic_id))
+            if task is None or task.state != ALBUM_PAUSED:
+                return
+            if task.control is None:
+                task.state = ALBUM_QUEUED
+                self._push(task)
+            else:
+                task.state = ALBUM_RUNNING
+            task._resume.set()
+        self._notify(task)
+
+    def cancel(self, comic_id):
+        """取消任务：排队中的直接移除，下载中的在下一个检查点停止，已下载的图片保留"""
+        with self._cond:
+            task = self.tasks.get(str(comic_id))
+            if task is None or task.finished:
+                return
+            task.cancelled = True
+            if task.control is not None:
+                task.control.cancel("用户取消")
+            else:
+                task.state = ALBUM_CANCELLED
+            task._resume.set()
+        self._notify(task)
+
+    def clear_finished(self):
+        with self._cond:
+            for comic_id in [comic_id for comic_id, task in self.tasks.items() if task.finished]:
+                del self.tasks[comic_id]
+
+    def snapshot(self):
+        """按状态和优先级排序的任务列表（字典），供界面显示"""
+        with self._cond:
+            tasks = list(self.tasks.values())
+        order = {ALBUM_RUNNING: 0, ALBUM_PAUSED: 1, ALBUM_QUEUED: 2}
+        tasks.sort(key=lambda task: (order.get(task.state, 3), -task.priority))
+        return [task.as_dict() for task in tasks]
+
+    def counts(self):
+        with self._cond:
+            states = [task.state for task in self.tasks.values()]
+        return {state: states.count(state) for state in
+                (ALBUM_QUEUED, ALBUM_RUNNING, ALBUM_PAUSED) + FINISHED_STATES}
+
+    def _ensure_workers(self):
+        while len(self._workers) < self.max_albums:
+            worker = threading.Thread(target=self._run_worker, name=f"album-{len(self._workers)}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _next_task(self, new_control):
+        """阻塞到有可下载的任务，关闭时返回None"""
+        with self._cond:
+            while True:
+                while self._heap:
+                    neg_priority, _, task = heapq.heappop(self._heap)
+                    # 跳过已取消、暂停或优先级已改变的旧条目
+                    if task.state == ALBUM_QUEUED and -neg_priority == task.priority:
+                        task.state = ALBUM_RUNNING
+                        task.control = new_control()
+                        return task
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+    def _run_worker(self):
+        from jmcomic.jm_task_context import DownloadControl
+        while True:
+            task = self._next_task(DownloadControl)
+            if task is None:
+                return
+            self._run(task)
+
+    def _run(self, task):
+        import jmcomic
+        self._notify(task)
+        logger.info(f"开始下载漫画: {task.title} (ID: {task.id})")
+        try:
+            if self.bucket is not None:
+                self.bucket.acquire()
+            with metrics.timer("album.download"):
+                jmcomic.download_album(
+                    task.id, self.option,
+                    downloader=lambda option: downloader_class()(option, task, self),
+                    control=task.control)
+            task.state = ALBUM_DONE
+            metrics.incr("album.done")
+            logger.info(f"漫画下载完成: {task.title} (ID: {task.id}), {task.images_done} 张图片")
+        except Exception as e:
+            if task.cancelled:
+                task.state = ALBUM_CANCELLED
+                logger.info(f"已取消下载: {task.title} (ID: {task.id})")
+            else:
+                task.state = ALBUM_FAILED
+                # 部分图片失败时jmcomic的异常信息会列出每张图片，只保留开头
+                task.error = " ".join(str(e).split())[:ERROR_MAX_LENGTH]
+                metrics.incr("album.failed")
+                logger.error(f"下载漫画失败: {task.id}, {task.error}")
+        self._notify(task)
+
+    def _notify(self, task):
+        if self.on_update is not None:
+            try:
+                self.on_update(task)
+            except Exception as e:
+                logger.debug(f"下载进度回调失败: {task.id}, {str(e)}")
+
+    def shutdown(self):
+        """取消全部未完成的任务并通知工作线程退出"""
+        with self._cond:
+            self._closed = True
+            ids = [comic_id for comic_id, task in self.tasks.items() if not task.finished]
+            self._cond.notify_all()
+        for comic_id in ids:
+            self.cancel(comic_id)
+        if self.pipeline is not None:
+            self.pipeline.shutdown()
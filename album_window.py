@@ -0,0 +1,132 @@
+import tkinter as tk
+from tkinter import ttk
+
+from album_download import (
+    ALBUM_CANCELLED, ALBUM_DONE, ALBUM_FAILED, ALBUM_PAUSED, ALBUM_QUEUED, ALBUM_RUNNING,
+)
+
+# 下载管理窗口的刷新间隔（毫秒）
+ALBUM_REFRESH_MS = 500
+# 每次调整优先级的幅度
+PRIORITY_STEP = 1
+
+STATE_TEXT = {
+    ALBUM_QUEUED: "排队中",
+    ALBUM_RUNNING: "下载中",
+    ALBUM_PAUSED: "已暂停",
+    ALBUM_DONE: "已完成",
+    ALBUM_FAILED: "失败",
+    ALBUM_CANCELLED: "已取消",
+}
+
+
+class AlbumDownloadWindow:
+    """显示整本漫画的下载队列，可暂停、继续、取消、调整优先级和带宽上限"""
+
+    def __init__(self, master, manager):
+        self.manager = manager
+        self._after_id = None
+
+        self.window = tk.Toplevel(master)
+        self.window.title("下载管理")
+        self.window.geometry("820x420")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        toolbar = ttk.Frame(self.window)
+        toolbar.pack(fill=tk.X, padx=10, pady=(10, 5))
+        for text, command in (("暂停", self.manager.pause), ("继续", self.manager.resume),
+                              ("取消", self.manager.cancel)):
+            ttk.Button(toolbar, text=text, command=lambda c=command: self._apply(c)).pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Button(toolbar, text="提高优先级", command=lambda: self._shift_priority(PRIORITY_STEP)).pack(
+            side=tk.LEFT, padx=(0, 5))
+        ttk.Button(toolbar, text="降低优先级", command=lambda: self._shift_priority(-PRIORITY_STEP)).pack(
+            side=tk.LEFT, padx=(0, 5))
+        ttk.Button(toolbar, text="清除已结束", command=self.clear_finished).pack(side=tk.LEFT, padx=(0, 5))
+
+        ttk.Button(toolbar, text="应用", command=self.apply_bandwidth).pack(side=tk.RIGHT)
+        rate = self.manager.bandwidth.rate
+        self.bandwidth_var = tk.StringVar(value=str(int(rate / 1024)) if rate > 0 else "0")
+        ttk.Entry(toolbar, textvariable=self.bandwidth_var, width=8).pack(side=tk.RIGHT, padx=5)
+        ttk.Label(toolbar, text="限速(KB/s, 0为不限)").pack(side=tk.RIGHT)
+
+        container = ttk.Frame(self.window)
+        container.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 5))
+        scrollbar = ttk.Scrollbar(container)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        columns = ("id", "title", "state", "priority", "images", "photos", "size")
+        self.tree = ttk.Treeview(container, columns=columns, show="headings", selectmode="extended",
+                                 yscrollcommand=scrollbar.set)
+        scrollbar.config(command=self.tree.yview)
+        for column, text, width, anchor in (
+                ("id", "ID", 80, tk.CENTER), ("title", "标题", 260, tk.W), ("state", "状态", 70, tk.CENTER),
+                ("priority", "优先级", 60, tk.CENTER), ("images", "图片", 90, tk.CENTER),
+                ("photos", "章节", 70, tk.CENTER), ("size", "已下载(MB)", 90, tk.E)):
+            self.tree.heading(column, text=text)
+            self.tree.column(column, width=width, anchor=anchor)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.status_var = tk.StringVar()
+        ttk.Label(self.window, textvariable=self.status_var, anchor=tk.W).pack(fill=tk.X, padx=10, pady=(0, 10))
+        self.refresh()
+
+    def _selected_ids(self):
+        return list(self.tree.selection())
+
+    def _apply(self, command):
+        for comic_id in self._selected_ids():
+            command(comic_id)
+        self.refresh(reschedule=False)
+
+    def _shift_priority(self, delta):
+        tasks = self.manager.tasks
+        for comic_id in self._selected_ids():
+            task = tasks.get(comic_id)
+            if task is not None:
+                self.manager.set_priority(comic_id, task.priority + delta)
+        self.refresh(reschedule=False)
+
+    def clear_finished(self):
+        self.manager.clear_finished()
+        self.refresh(reschedule=False)
+
+    def apply_bandwidth(self):
+        try:
+            kb = float(self.bandwidth_var.get() or 0)
+        except ValueError:
+            self.status_var.set("限速必须是数字")
+            return
+        self.manager.set_bandwidth(max(0.0, kb) * 1024)
+        self.refresh(reschedule=False)
+
+    def refresh(self, reschedule=True):
+        rows = self.manager.snapshot()
+        ids = []
+        for row in rows:
+            images = f"{row['images_done']}/{row['images_total']}" if row["images_total"] else "-"
+            photos = f"{row['photos_done']}/{row['photos_total']}" if row["photos_total"] else "-"
+            values = (row["id"], row["title"], STATE_TEXT.get(row["state"], row["state"]), row["priority"],
+                      images, photos, f"{row['bytes'] / (1024 * 1024):.1f}")
+            # 已有的行只更新数值，保持选中状态
+            if self.tree.exists(row["id"]):
+                self.tree.item(row["id"], values=values)
+            else:
+                self.tree.insert("", tk.END, iid=row["id"], values=values)
+            ids.append(row["id"])
+        stale = set(self.tree.get_children()) - set(ids)
+        if stale:
+            self.tree.delete(*stale)
+        for index, comic_id in enumerate(ids):
+            self.tree.move(comic_id, "", index)
+
+        counts = self.manager.counts()
+        rate = self.manager.bandwidth.rate
+        self.status_var.set(f"下载中 {counts[ALBUM_RUNNING]}, 排队 {counts[ALBUM_QUEUED]}, "
+                            f"暂停 {counts[ALBUM_PAUSED]}, 完成 {counts[ALBUM_DONE]}, 失败 {counts[ALBUM_FAILED]}, "
+                            f"限速 {f'{rate / 1024:g} KB/s' if rate > 0 else '不限'}")
+        if reschedule:
+            self._after_id = self.window.after(ALBUM_REFRESH_MS, self.refresh)
+
+    def close(self):
+        if self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+        self.window.destroy()
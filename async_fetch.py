@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from detail_download import (
+    DETAIL_MODE_FORCE, DETAIL_MAX_AGE, DETAIL_SKIPPED,
+    album_cover_url, album_to_json, detail_is_fresh, save_cover,
+)
+import metrics
+from rate_limit import OUTCOME_ERROR, OUTCOME_OK, OUTCOME_THROTTLED, is_throttle_error
+from storage import DETAILS_DIR, as_store
+
+logger = logging.getLogger("ComicBrowser.async")
+
+
+def jm_async_client_factory(option=None):
+    """返回创建jmcomic异步客户端的工厂函数，需在事件循环线程中调用"""
+    def create():
+        import jmcomic
+        return (option or jmcomic.JmOption.default()).new_jm_async_client()
+    return create
+
+
+@asynccontextmanager
+async def limiter_slot(limiter):
+    """AdaptiveLimiter.slot的协程版本：名额已满时在事件循环中等待，不占用线程"""
+    if limiter is None:
+        yield
+        return
+    loop = asyncio.get_running_loop()
+    while True:
+        released = loop.create_future()
+
+        def wake(released=released):
+            try:
+                loop.call_soon_threadsafe(lambda: released.done() or released.set_result(None))
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+        if limiter.try_acquire(wake):
+            break
+        await released
+    start = time.monotonic()
+    outcome = OUTCOME_OK
+    try:
+        yield
+    except Exception as e:
+        outcome = OUTCOME_THROTTLED if is_throttle_error(e) else OUTCOME_ERROR
+        raise
+    finally:
+        limiter.release(time.monotonic() - start, outcome)
+
+
+async def download_detail_async(client, id, album_id, path, mode=DETAIL_MODE_FORCE,
+                                max_age=DETAIL_MAX_AGE, album_sem=None, cover_sem=None, bucket=None,
+                                limiter=None):
+    """download_detail的异步版本，约定相同：返回 (success, error)
+
+    详情和封面的章节信息并发获取；封面解码和缩略图生成在线程中执行，不阻塞事件循环。
+    给出limiter（AdaptiveLimiter）时每个请求都占用它的一个并发名额，并按结果调整并发上限；
+    bucket默认为limiter的令牌桶。
+    """
+    store = as_store(path)
+    album_sem = album_sem or asyncio.Semaphore(1)
+    cover_sem = cover_sem or asyncio.Semaphore(1)
+    if bucket is None and limiter is not None:
+        bucket = limiter.bucket
+
+    @asynccontextmanager
+    async def request():
+        async with limiter_slot(limiter):
+            if bucket is not None and bucket.rate > 0:
+                await asyncio.to_thread(bucket.acquire)
+            yield
+
+    async def fetch_album():
+        async with album_sem:
+            async with request():
+                with metrics.timer("fetch.album"):
+                    album = await client.get_album_detail(album_id)
+        await asyncio.to_thread(store.write_album, id, album_to_json(album))
+
+    async def fetch_cover():
+        async with cover_sem:
+            try:
+                # 封面图直链只需一次请求，且不需要解码
+                url = album_cover_url(album_id)
+                async with request():
+                    with metrics.timer("fetch.image"):
+                        resp = await client.get_jm_image(url)
+                    resp.require_success()
+                scramble_id, decode_image = None, False
+            except Exception as e:
+                logger.debug(f"直接下载封面失败，改为读取章节第一页: {id}, {str(e)}")
+                metrics.incr("fetch.cover_fallback")
+                async with request():
+                    with metrics.timer("fetch.photo_detail"):
+                        photo = await client.get_photo_detail(album_id, fetch_album=False)
+                first_image = photo[0]
+                url = first_image.img_url
+                async with request():
+                    with metrics.timer("fetch.image"):
+                        resp = await client.get_jm_image(first_image.download_url)
+                scramble_id, decode_image = first_image.scramble_id, True
+        await asyncio.to_thread(save_cover, store, id,
+                                lambda cover_path: resp.transfer_to(cover_path, scramble_id, decode_image, url))
+        try:
+            await asyncio.to_thread(store.ensure_thumbnail, id)
+        except Exception as e:
+            logger.warning(f"生成缩略图失败: {id}, {str(e)}")
+
+    try:
+        if detail_is_fresh(store, id, mode, max_age):
+            metrics.incr("fetch.skipped")
+            return True, DETAIL_SKIPPED
+        with metrics.timer("fetch.total"):
+            # 一项失败时等另一项结束再返回，不留下仍占用限制器名额的请求
+            for result in await asyncio.gather(fetch_album(), fetch_cover(), return_exceptions=True):
+                if isinstance(result, BaseException):
+                    raise result
+        return True, ""
+    except Exception as e:
+        metrics.incr("fetch.failed")
+        return False, str(e)
+
+
+class AsyncDetailEngine:
+    """在后台线程的单个事件循环上并发抓取大量详情
+
+    submit() 可在任意线程调用，返回concurrent.futures.Future，结果为 (success, error)；
+    需要在结果出来时通知界面的调用方通过on_done回调转交。
+    """
+
+    def __init__(self, path=DETAILS_DIR, client_factory=None, album_concurrency=32,
+                 cover_concurrency=16, mode=DETAIL_MODE_FORCE, max_age=DETAIL_MAX_AGE, bucket=None,
+                 limiter=None):
+        self.store = as_store(path)
+        self.client_factory = client_factory or jm_async_client_factory()
+        self.album_concurrency = album_concurrency
+        self.cover_concurrency = cover_concurrency
+        self.mode = mode
+        self.max_age = max_age
+        self.bucket = bucket
+        self.limiter = limiter
+
+        self._loop = None
+        self._thread = None
+        self._client = None
+        self._ready = threading.Event()
+
+    @property
+    def concurrency(self):
+        return self.album_concurrency
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run_loop, name="async-detail", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._album_sem = asyncio.Semaphore(self.album_concurrency)
+        self._cover_sem = asyncio.Semaphore(self.cover_concurrency)
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _get_client(self):
+        # 客户端绑定事件循环，必须在循环线程中创建
+        if self._client is None:
+            self._client = self.client_factory()
+        return self._client
+
+    async def _fetch(self, comic_id, comic_title, on_done):
+        try:
+            client = await self._get_client()
+            success, error = await download_detail_async(
+                client, comic_id, comic_id, self.store, self.mode, self.max_age,
+                album_sem=self._album_sem, cover_sem=self._cover_sem, bucket=self.bucket,
+                limiter=self.limiter)
+        except Exception as e:
+            success, error = False, str(e)
+        if on_done is not None:
+            # 结果登记可能涉及磁盘IO，放到线程中执行；完成后Future才结束
+            await asyncio.to_thread(on_done, comic_id, comic_title, success, error)
+        return success, error
+
+    def submit(self, comic_id, comic_title="", on_done=None):
+        """提交一个漫画ID，on_done(comic_id, comic_title, success, error) 在工作线程中调用"""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(self._fetch(comic_id, comic_title, on_done), self._loop)
+
+    def fetch_many(self, ids):
+        """阻塞地抓取一批ID，返回 {id: (success, error)}"""
+        futures = {comic_id: self.submit(comic_id) for comic_id in ids}
+        return {comic_id: future.result() for comic_id, future in futures.items()}
+
+    def close(self):
+        if self._thread is None:
+            return
+
+        async def shutdown():
+            if self._client is not None and hasattr(self._client, "close"):
+                await self._client.close()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout=10)
+        except Exception as e:
+            logger.warning(f"关闭异步客户端失败: {str(e)}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
+        self._thread = None
@@ -0,0 +1,175 @@
+"""对比整本漫画下载时在下载线程中还原图片与使用图片处理进程池的吞吐量
+
+本地生成按jmcomic规则切割打乱的webp图片作为夹具，替身客户端按延迟返回这些原始数据，
+下载经过AlbumDownloadManager和jmcomic下载器的完整流程，保存为png（即setting.yml中的格式转换）。
+结束后抽查保存的图片与原图逐像素一致。
+
+用法: python benchmarks/bench_album_pipeline.py [--albums 2] [--photos 2] [--pages 15] [--processes 0]
+"""
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import time
+
+import fake_jm  # noqa: F401  仓库根目录加入sys.path
+
+import jmcomic
+from jmcomic import JmAlbumDetail, JmImageClient, JmImageResp, JmImageTool, JmPhotoDetail
+from PIL import Image, ImageChops
+
+from album_download import ALBUM_DONE, AlbumDownloadManager
+from image_pipeline import ImagePipeline
+
+SCRAMBLE_ID = "220980"
+# 大于421926的章节ID按文件名取2~16段
+PHOTO_ID_BASE = 500000
+PAGE_SIZE = (720, 1024)
+
+
+def source_image(size=PAGE_SIZE, seed=0):
+    """生成一张带噪点的页面，避免编码器对纯色图片走捷径"""
+    rng = random.Random(seed)
+    img = Image.radial_gradient("L").resize(size).convert("RGB")
+    noise = Image.frombytes("RGB", size, rng.randbytes(size[0] * size[1] * 3))
+    return Image.blend(img, noise, 0.25)
+
+
+def scramble(img, num):
+    """unscramble的逆操作：按还原时的位置把各段放回切割前的位置"""
+    if num == 0:
+        return img
+    width, height = img.size
+    scrambled = Image.new("RGB", (width, height))
+    over = height % num
+    move = height // num
+    for i in range(num):
+        y_src = height - move * (i + 1) - over
+        y_dst = move * i
+        size = move
+        if i == 0:
+            size += over
+        else:
+            y_dst += over
+        scrambled.paste(img.crop((0, y_dst, width, y_dst + size)), (0, y_src, width, y_src + size))
+    return scrambled
+
+
+def build_fixtures(source):
+    """每种分段数一份无损webp原始数据"""
+    fixtures = {}
+    for num in [0] + list(range(2, 22, 2)):
+        buf = io.BytesIO()
+        scramble(source, num).save(buf, "WEBP", lossless=True, quality=0, method=0)
+        fixtures[num] = buf.getvalue()
+    return fixtures
+
+
+class FakeResponse:
+    def __init__(self, content, url):
+        self.content = content
+        self.url = url
+        self.status_code = 200
+
+
+class FakeAlbumClient(JmImageClient):
+    """返回jmcomic实体和夹具图片的客户端替身，经过jmcomic的download_image和save_image_resp流程"""
+
+    def __init__(self, fixtures, photos, pages, latency):
+        self.fixtures = fixtures
+        self.photos = photos
+        self.pages = pages
+        self.latency = latency
+
+    def get_album_detail(self, album_id):
+        time.sleep(self.latency)
+        base = PHOTO_ID_BASE + int(album_id) * 100
+        episodes = [(str(base + i), str(i + 1), f"{album_id}-{i + 1}") for i in range(self.photos)]
+        return JmAlbumDetail(album_id, SCRAMBLE_ID, f"album {album_id}", episodes, self.photos * self.pages,
+                             "", "", "0", "0", 0, [], [], [], [])
+
+    def get_photo_detail(self, photo_id, fetch_album=True, fetch_scramble_id=True):
+        time.sleep(self.latency)
+        return JmPhotoDetail(photo_id, "p", photo_id, 1, scramble_id=SCRAMBLE_ID,
+                             page_arr=[f"{i + 1:05d}.webp" for i in range(self.pages)],
+                             data_original_domain="fake")
+
+    def check_photo(self, photo):
+        if photo.page_arr is None:
+            fetched = self.get_photo_detail(photo.photo_id)
+            photo.page_arr = fetched.page_arr
+            photo.data_original_domain = fetched.data_original_domain
+            photo.scramble_id = SCRAMBLE_ID
+
+    def get_jm_image(self, img_url):
+        time.sleep(self.latency)
+        num = JmImageTool.get_num_by_url(SCRAMBLE_ID, img_url.split("?", 1)[0])
+        return JmImageResp(FakeResponse(self.fixtures[num], img_url))
+
+
+def run(args, fixtures, source, pipeline):
+    with tempfile.TemporaryDirectory() as tmp:
+        def option_loader():
+            option = jmcomic.JmOption.default()
+            option.dir_rule.base_dir = tmp
+            option.download.image.suffix = ".png"
+            option.download.threading.image = args.threads
+            return option
+
+        manager = AlbumDownloadManager(max_albums=args.max_albums, option_loader=option_loader, pipeline=pipeline)
+        start = time.perf_counter()
+        tasks = [manager.submit(str(i + 1), f"album {i + 1}") for i in range(args.albums)]
+        while not all(task.finished for task in tasks):
+            time.sleep(0.01)
+        wall = time.perf_counter() - start
+        manager.shutdown()
+
+        failed = [task.as_dict() for task in tasks if task.state != ALBUM_DONE]
+        assert not failed, failed
+        images = sum(task.images_done for task in tasks)
+        saved = [os.path.join(root, name) for root, _, names in os.walk(tmp) for name in names]
+        assert len(saved) == images == args.albums * args.photos * args.pages, (len(saved), images)
+        for path in random.Random(0).sample(saved, min(5, len(saved))):
+            with Image.open(path) as img:
+                assert ImageChops.difference(img.convert("RGB"), source).getbbox() is None, path
+
+    return {"wall_s": round(wall, 3), "images_per_s": round(images / wall, 1), "images": images}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--albums", type=int, default=2)
+    parser.add_argument("--photos", type=int, default=2, help="每本章节数")
+    parser.add_argument("--pages", type=int, default=15, help="每章图片数")
+    parser.add_argument("--latency", type=float, default=0.02, help="每次请求的网络延迟（秒）")
+    parser.add_argument("--threads", type=int, default=30, help="每章的图片下载线程数")
+    parser.add_argument("--max-albums", type=int, default=2)
+    parser.add_argument("--processes", type=int, default=0, help="进程池大小，0表示CPU核数")
+    args = parser.parse_args()
+
+    jmcomic.JmModuleConfig.disable_jm_log()
+    source = source_image()
+    fixtures = build_fixtures(source)
+    jmcomic.JmOption.build_jm_client = lambda option, **kwargs: FakeAlbumClient(
+        fixtures, args.photos, args.pages, args.latency)
+
+    pipeline = ImagePipeline(args.processes or None)
+    # 预热进程池，不把进程启动计入吞吐量
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline.submit(fixtures[0], 0, os.path.join(tmp, "warmup.png")).result()
+
+    report = {
+        "cpus": os.cpu_count(),
+        "processes": pipeline.workers,
+        "threads": run(args, fixtures, source, None),
+        "pipeline": run(args, fixtures, source, pipeline),
+    }
+    report["speedup"] = round(report["threads"]["wall_s"] / report["pipeline"]["wall_s"], 2)
+    pipeline.shutdown()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
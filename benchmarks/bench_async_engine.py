@@ -0,0 +1,185 @@
+"""用本地http.server替身对比线程池与asyncio引擎批量抓取详情
+
+服务器提供 /album/<id>、/photo/<id> 和 /image/<id> 三个接口，每个请求延迟--latency秒。
+线程模式使用urllib同步客户端，asyncio模式使用基于asyncio流的异步客户端，写入相同的details布局。
+
+用法: python benchmarks/bench_async_engine.py [--albums 300] [--threads 15] [--concurrency 100]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from fake_jm import cover_bytes, fake_album_json
+
+from async_fetch import AsyncDetailEngine
+from detail_download import download_detail
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, latency):
+        self.latency = latency
+        super().__init__(("127.0.0.1", 0), Handler)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0"
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        kind, album_id = self.path.strip("/").split("/")
+        if kind == "album":
+            body = json.dumps(fake_album_json(album_id), ensure_ascii=False).encode("utf-8")
+        elif kind == "photo":
+            body = json.dumps({"images": [f"/image/{album_id}"]}).encode("utf-8")
+        else:
+            body = cover_bytes()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def to_album(data):
+    return SimpleNamespace(album_id=data["id"], **{k: v for k, v in data.items() if k != "id"})
+
+
+class ImageResp:
+    def __init__(self, content):
+        self.content = content
+
+    def require_success(self):
+        pass
+
+    def transfer_to(self, path, scramble_id, decode_image=True, img_url=None):
+        with open(path, "wb") as f:
+            f.write(self.content)
+
+
+class SyncHttpClient:
+    def __init__(self, base):
+        self.base = base
+
+    def _get(self, path):
+        with urllib.request.urlopen(self.base + path, timeout=30) as resp:
+            return resp.read()
+
+    def get_album_detail(self, album_id):
+        return to_album(json.loads(self._get(f"/album/{album_id}")))
+
+    def get_photo_detail(self, photo_id, fetch_album=True, fetch_scramble_id=True):
+        images = json.loads(self._get(f"/photo/{photo_id}"))["images"]
+        return [SimpleNamespace(img_url=url, download_url=url, scramble_id="0") for url in images]
+
+    def download_album_cover(self, album_id, save_path, size=''):
+        ImageResp(self._get(f"/image/{album_id}")).transfer_to(save_path, None, False)
+
+    def download_by_image_detail(self, image, path):
+        ImageResp(self._get(image.download_url)).transfer_to(path, image.scramble_id)
+
+
+class AsyncHttpClient:
+    """基于asyncio流的最小HTTP/1.0客户端"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    async def _get(self, path):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write(f"GET {path} HTTP/1.0\r\nHost: {self.host}\r\n\r\n".encode())
+        await writer.drain()
+        data = await reader.read()
+        writer.close()
+        return data.split(b"\r\n\r\n", 1)[1]
+
+    async def get_album_detail(self, album_id):
+        return to_album(json.loads(await self._get(f"/album/{album_id}")))
+
+    async def get_photo_detail(self, photo_id, fetch_album=True, fetch_scramble_id=True):
+        images = json.loads(await self._get(f"/photo/{photo_id}"))["images"]
+        return [SimpleNamespace(img_url=url, download_url=url, scramble_id="0") for url in images]
+
+    async def get_jm_image(self, url):
+        if url.startswith("http"):
+            # 封面直链 .../media/albums/<id>.jpg
+            url = "/image/" + url.rsplit("/", 1)[1].split(".")[0]
+        return ImageResp(await self._get(url))
+
+
+def measure(func):
+    tracemalloc.start()
+    threads_before = threading.active_count()
+    start = time.perf_counter()
+    peak_threads = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "peak_traced_mb": round(peak / 1024 / 1024, 1),
+        "peak_threads": max(peak_threads, threads_before),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--albums", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=15)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = StandInServer(args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    ids = [str(200000 + i) for i in range(args.albums)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def threaded():
+            path = os.path.join(tmp, "threads", "")
+            os.makedirs(path)
+            client = SyncHttpClient(f"http://{host}:{port}")
+            with ThreadPoolExecutor(max_workers=args.threads) as executor:
+                results = list(executor.map(lambda i: download_detail(client, i, i, path), ids))
+                peak = threading.active_count()
+            assert all(ok for ok, _ in results), results[:3]
+            return peak
+
+        def asynchronous():
+            path = os.path.join(tmp, "asyncio", "")
+            os.makedirs(path)
+            engine = AsyncDetailEngine(path, client_factory=lambda: AsyncHttpClient(host, port),
+                                       album_concurrency=args.concurrency,
+                                       cover_concurrency=args.concurrency)
+            results = engine.fetch_many(ids)
+            peak = threading.active_count()
+            engine.close()
+            assert all(ok for ok, _ in results.values()), list(results.values())[:3]
+            return peak
+
+        report = {
+            "albums": args.albums,
+            "threads": dict(workers=args.threads, **measure(threaded)),
+            "asyncio": dict(concurrency=args.concurrency, **measure(asynchronous)),
+        }
+    server.shutdown()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
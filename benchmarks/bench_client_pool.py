@@ -0,0 +1,79 @@
+"""对比每个任务新建客户端与共享客户端池的单本漫画开销
+
+用法: python benchmarks/bench_client_pool.py [--albums 60] [--workers 15]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_jm import FakeJmClient
+
+from client_pool import ClientPool
+from detail_download import download_detail
+
+
+def run(albums, workers, get_result, path):
+    latencies = []
+
+    def task(album_id):
+        start = time.perf_counter()
+        success, error = get_result(album_id)
+        latencies.append(time.perf_counter() - start)
+        assert success, error
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(task, [str(100000 + i) for i in range(albums)]))
+    wall = time.perf_counter() - start
+    return {
+        "wall_s": round(wall, 3),
+        "per_album_ms": round(sum(latencies) / len(latencies) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--albums", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=15)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--setup-cost", type=float, default=0.3)
+    parser.add_argument("--connect-cost", type=float, default=0.05)
+    args = parser.parse_args()
+
+    def factory():
+        return FakeJmClient(args.latency, args.setup_cost, args.connect_cost)
+
+    # 详情与封面直链并发下载，关键路径为1次请求
+    baseline_ms = args.latency * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = tmp + os.sep
+
+        def per_task(album_id):
+            return download_detail(factory(), album_id, album_id, path, cover_client=factory())
+
+        pool = ClientPool(factory, size=args.workers * 2)
+
+        def pooled(album_id):
+            with pool.client() as client, pool.client(block=False) as cover_client:
+                return download_detail(client, album_id, album_id, path, cover_client=cover_client)
+
+        before = run(args.albums, args.workers, per_task, path)
+        after = run(args.albums, args.workers, pooled, path)
+
+    for result in (before, after):
+        result["overhead_ms"] = round(result["per_album_ms"] - baseline_ms, 1)
+    print(json.dumps({
+        "albums": args.albums,
+        "workers": args.workers,
+        "request_baseline_ms": baseline_ms,
+        "per_task_client": before,
+        "pooled_client": after,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""对比顺序下载详情+章节第一页封面与并发下载详情+封面直链的单本延迟
+
+用法: python benchmarks/bench_detail_latency.py [--albums 60] [--workers 15] [--latency 0.05]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_jm import FakeJmClient
+
+from client_pool import ClientPool
+from detail_download import download_detail, download_detail_album
+from storage import comic_dir
+
+
+def sequential_detail(client, id, album_id, path):
+    """改动前的做法：先详情，再请求完整章节信息(附带本子详情)取第一页作为封面"""
+    os.makedirs(comic_dir(path, id), exist_ok=True)
+    download_detail_album(client, id, album_id, path)
+    photo = client.get_photo_detail(album_id)
+    client.download_by_image_detail(photo[0], os.path.join(comic_dir(path, id), "cover.png"))
+    return True, ""
+
+
+def run(pool, albums, workers, fetch, path):
+    latencies = []
+    requests_before = sum(c.client.requests for c in pool._idle)
+
+    def task(album_id):
+        start = time.perf_counter()
+        with pool.client() as client:
+            success, error = fetch(client, album_id, album_id, path)
+        latencies.append(time.perf_counter() - start)
+        assert success, error
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(task, [str(300000 + i) for i in range(albums)]))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "wall_s": round(wall, 3),
+        "per_album_ms": round(sum(latencies) / len(latencies) * 1000, 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+        "requests_per_album": round((sum(c.client.requests for c in pool._idle) - requests_before) / albums, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--albums", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=15)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    pool = ClientPool(lambda: FakeJmClient(args.latency, setup_cost=0, connect_cost=0), size=args.workers)
+    with tempfile.TemporaryDirectory() as tmp:
+        before = run(pool, args.albums, args.workers, sequential_detail, os.path.join(tmp, "before", ""))
+        after = run(pool, args.albums, args.workers, download_detail, os.path.join(tmp, "after", ""))
+
+    print(json.dumps({
+        "albums": args.albums,
+        "workers": args.workers,
+        "latency_ms": args.latency * 1000,
+        "sequential": before,
+        "concurrent": after,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""用会限流的本地假服务器比较固定15线程与自适应限制器
+
+服务器同时处理的请求超过--capacity个，或每秒请求超过--server-rate个时返回429。
+每个任务失败后稍等重试，直到成功。
+
+用法: python benchmarks/bench_limiter.py [--requests 300]
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import fake_jm  # noqa: F401  设置导入路径
+
+from rate_limit import AdaptiveLimiter
+
+
+class ThrottlingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, capacity, rate, latency):
+        self.capacity = capacity
+        self.rate = rate
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.window = []
+        self.served = 0
+        self.throttled = 0
+        super().__init__(("127.0.0.1", 0), Handler)
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        now = time.monotonic()
+        with server.lock:
+            server.window = [t for t in server.window if now - t < 1.0]
+            throttle = server.in_flight >= server.capacity or len(server.window) >= server.rate
+            if throttle:
+                server.throttled += 1
+            else:
+                server.in_flight += 1
+                server.window.append(now)
+        if throttle:
+            self.send_response(429)
+            self.end_headers()
+            return
+        # 负载越高响应越慢
+        time.sleep(server.latency * (1 + server.in_flight / server.capacity))
+        with server.lock:
+            server.in_flight -= 1
+            server.served += 1
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+def fetch(url):
+    try:
+        with urllib.request.urlopen(url, timeout=10) as resp:
+            resp.read()
+    except urllib.error.HTTPError as e:
+        raise RuntimeError(f"HTTP {e.code}") from None
+
+
+def run(args, limiter):
+    server = ThrottlingServer(args.capacity, args.server_rate, args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/album"
+    limits = []
+
+    def task(_):
+        while True:
+            try:
+                if limiter is None:
+                    fetch(url)
+                else:
+                    with limiter.slot():
+                        limiter.bucket.acquire()
+                        fetch(url)
+                    limits.append(limiter.limit)
+                return
+            except RuntimeError:
+                time.sleep(0.05)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=15) as executor:
+        list(executor.map(task, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    result = {
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(args.requests / elapsed, 1),
+        "throttled_responses": server.throttled,
+    }
+    if limits:
+        result["final_limit"] = limits[-1]
+        result["mean_limit"] = round(sum(limits) / len(limits), 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--capacity", type=int, default=5)
+    parser.add_argument("--server-rate", type=int, default=80)
+    parser.add_argument("--latency", type=float, default=0.03)
+    parser.add_argument("--rate-limit", type=float, default=0, help="客户端令牌桶速率, 0为不限速")
+    args = parser.parse_args()
+
+    fixed = run(args, None)
+    adaptive = run(args, AdaptiveLimiter(min_limit=1, max_limit=15, initial=4, rate=args.rate_limit))
+    print(json.dumps({"requests": args.requests, "fixed_15_threads": fixed, "adaptive": adaptive},
+                     ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""测量浏览器的启动耗时：导入、窗口可用、第一批漫画显示、全部加载完成
+
+每次测量在新的子进程中进行，导入耗时不受已缓存模块影响。分别测量冷启动（没有catalog.db，
+需要解析全部详情）和热启动（索引已存在）。有显示环境时使用隐藏的真实Tk窗口，
+否则（或指定--headless）使用 headless_tk 替身。
+
+用法: python benchmarks/bench_startup.py [--size 10000] [--runs 3] [--backend directory] [--headless]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import headless_tk
+
+# 子进程中只导入load_detail本身，语料生成相关的模块在父进程中才导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PHASES = ("import_s", "window_ready_s", "first_rows_s", "loaded_s")
+
+
+def pump(root, done, timeout=600.0):
+    deadline = time.perf_counter() + timeout
+    while not done():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("等待界面回调超时")
+        root.update()
+        time.sleep(0.0005)
+
+
+def child(headless):
+    """子进程：在当前目录（已写好配置和语料）中启动浏览器并输出各阶段距进程开始的耗时"""
+    start = time.perf_counter()
+    import load_detail
+    result = {"import_s": time.perf_counter() - start}
+
+    if headless:
+        root = headless_tk.install(load_detail)()
+    else:
+        load_detail.import_gui()
+        root = load_detail.tk.Tk()
+        root.withdraw()
+    app = load_detail.ComicBrowser(root)
+    result["window_ready_s"] = time.perf_counter() - start
+
+    pump(root, lambda: app.comic_view.ids or not app._loading)
+    result["first_rows_s"] = time.perf_counter() - start
+    pump(root, lambda: not app._loading)
+    result["loaded_s"] = time.perf_counter() - start
+    result["comics"] = len(app.comics)
+    print(json.dumps({name: round(value, 4) for name, value in result.items()}))
+    os._exit(0)
+
+
+def run_child(tmp, headless):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child"]
+    if headless:
+        cmd.append("--headless")
+    out = subprocess.run(cmd, cwd=tmp, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    return {name: round(statistics.median(run[name] for run in runs), 4) for name in PHASES} | {
+        "comics": runs[0]["comics"], "runs": len(runs)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=10000, help="语料规模")
+    parser.add_argument("--runs", type=int, default=3, help="冷、热启动各测量几次（取中位数）")
+    parser.add_argument("--backend", choices=("directory", "packed"), default="directory")
+    parser.add_argument("--headless", action="store_true", help="即使有显示环境也使用界面替身")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    headless = args.headless or (sys.platform.startswith("linux") and not os.environ.get("DISPLAY"))
+    if args.child:
+        child(headless)
+        return
+
+    from bench_viewer import generate_corpus, write_config
+    from storage import STORAGE_PACKED, DirectoryStore, PackedStore
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            write_config(tmp, argparse.Namespace(engine="threads", workers=15, backend=args.backend))
+        finally:
+            os.chdir(cwd)
+        if args.backend == STORAGE_PACKED:
+            store = PackedStore(os.path.join(tmp, "details.db"))
+        else:
+            store = DirectoryStore(os.path.join(tmp, "details"))
+        generate_corpus(store, args.size, 0, random.Random(args.size))
+        store.close()
+
+        cold, warm = [], []
+        for _ in range(args.runs):
+            catalog_path = os.path.join(tmp, "catalog.db")
+            if os.path.exists(catalog_path):
+                os.remove(catalog_path)
+            cold.append(run_child(tmp, headless))
+            warm.append(run_child(tmp, headless))
+
+    report = {"size": args.size, "backend": args.backend, "headless": headless,
+              "cold": summarize(cold), "warm": summarize(warm)}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""对比目录布局与单文件打包存储的扫描、全量索引和封面读取耗时
+
+用法: python benchmarks/bench_storage.py [--albums 5000] [--covers 500]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from fake_jm import cover_bytes, fake_album_json
+
+from catalog import CatalogIndex
+from storage import DirectoryStore, PackedStore, migrate
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return round(time.perf_counter() - start, 3), result
+
+
+def measure(store, tmp, name, sample):
+    scan_s, (found, _) = timed(store.scan)
+    catalog = CatalogIndex(store, db_path=os.path.join(tmp, f"catalog_{name}.db"))
+    index_s, _ = timed(catalog.refresh)
+    load_s, comics = timed(catalog.load_all)
+    catalog.close()
+    covers_s, _ = timed(lambda: [store.read_cover_bytes(comic_id) for comic_id in sample])
+    return {
+        "scan_s": scan_s,
+        "full_index_s": index_s,
+        "load_all_s": load_s,
+        "cover_reads_s": covers_s,
+        "albums": len(found),
+        "comics": len(comics),
+    }
+
+
+def count_files(path):
+    if os.path.isfile(path):
+        return 1
+    return sum(len(files) for _, _, files in os.walk(path))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--albums", type=int, default=5000)
+    parser.add_argument("--covers", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    ids = [str(100000 + i) for i in range(args.albums)]
+    sample = rng.sample(ids, min(args.covers, len(ids)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = DirectoryStore(os.path.join(tmp, "details"))
+        cover = cover_bytes()
+        for comic_id in ids:
+            directory.write_album(comic_id, fake_album_json(comic_id, rng))
+            directory.write_cover_bytes(comic_id, cover)
+
+        packed = PackedStore(os.path.join(tmp, "details.db"))
+        migrate_s, _ = timed(lambda: migrate(directory, packed))
+
+        report = {
+            "albums": args.albums,
+            "cover_reads": len(sample),
+            "migrate_s": migrate_s,
+            "directory": dict(files=count_files(directory.location), **measure(directory, tmp, "dir", sample)),
+            "packed": dict(files=count_files(packed.location), **measure(packed, tmp, "packed", sample)),
+        }
+        packed.close()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+"""在合成的详情语料上测量浏览器热点路径的耗时和峰值内存
+
+按指定规模生成详情语料（标题、标签、作者、related_list，部分漫画带封面），
+再用可调延迟的jmcomic客户端替身驱动 ComicBrowser 的 load_comics、filter_comics、
+show_comic_details、load_cover_image、add_to_list 和 _download_all_comics。
+有显示环境时使用隐藏的真实Tk窗口，否则（或指定--headless）使用 headless_tk 替身。
+结果以JSON输出，可保存后在不同版本之间比较。
+
+用法: python benchmarks/bench_viewer.py [--sizes 1000,10000,100000] [--covers 300] [--latency 0.02]
+                                       [--backend directory] [--headless] [--trace-memory] [--output out.json]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import headless_tk
+from fake_jm import FakeJmClient, cover_bytes, fake_album_json
+
+import load_detail
+from storage import STORAGE_DIRECTORY, STORAGE_PACKED, DirectoryStore, PackedStore
+
+QUERIES = ["纯爱", "tag:校园", "tag:百合 tag:全彩", "author:作者12", "Love Story", "id:1000", "不存在的关键词", ""]
+FIRST_ID = 100000
+
+
+def rss_peak_mb():
+    """进程的常驻内存峰值，平台不支持时返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux单位为KB，macOS为字节
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Recorder:
+    def __init__(self, trace_memory):
+        self.trace_memory = trace_memory
+        self.report = {}
+
+    def phase(self, name, func, **extra):
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        entry = {"s": round(time.perf_counter() - start, 4), **extra}
+        if self.trace_memory:
+            entry["py_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+            tracemalloc.stop()
+        entry["rss_peak_mb"] = rss_peak_mb()
+        self.report[name] = entry
+        return result
+
+
+def latency_stats(samples):
+    if not samples:
+        return {"count": 0}
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 3),
+        "p50_ms": round(samples[len(samples) // 2] * 1000, 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95)] * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+
+
+def generate_corpus(store, size, covers, rng):
+    """写入size本漫画的详情，前covers本带封面；related_list一半指向语料内的漫画"""
+    cover = cover_bytes()
+    ids = [str(FIRST_ID + i) for i in range(size)]
+    for i, comic_id in enumerate(ids):
+        data = fake_album_json(comic_id, rng)
+        for work in data["related_list"][::2]:
+            work["id"] = rng.choice(ids)
+        store.write_album(comic_id, data)
+        if i < covers:
+            store.write_cover_bytes(comic_id, cover)
+    return ids
+
+
+def pump(root, done, timeout=60.0):
+    """运行主循环直到done()为真"""
+    deadline = time.perf_counter() + timeout
+    while not done():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("等待界面回调超时")
+        root.update()
+        time.sleep(0.0005)
+
+
+def load_and_wait(app, root):
+    app.load_comics()
+    pump(root, lambda: not app._loading, timeout=600.0)
+
+
+def bench_filter(app):
+    results = {}
+    for query in QUERIES:
+        app.search_var.set(query)
+        start = time.perf_counter()
+        app.filter_comics()
+        results[query or "(空)"] = {"ms": round((time.perf_counter() - start) * 1000, 3),
+                                    "matched": len(app.comic_view.ids)}
+    return results
+
+
+def bench_details(app, ids):
+    samples = []
+    for comic_id in ids:
+        start = time.perf_counter()
+        app.show_comic_details(comic_id)
+        samples.append(time.perf_counter() - start)
+    return latency_stats(samples)
+
+
+def bench_covers(app, root, ids):
+    """从调用load_cover_image到封面显示的延迟"""
+    shown = []
+    show_cover = app._show_cover
+
+    def record(photo, error):
+        shown.append(error)
+        show_cover(photo, error)
+
+    app._show_cover = record
+    samples = []
+    try:
+        for comic_id in ids:
+            expected = len(shown) + 1
+            start = time.perf_counter()
+            app.load_cover_image(app.comic_by_id[comic_id])
+            pump(root, lambda: len(shown) >= expected)
+            samples.append(time.perf_counter() - start)
+    finally:
+        app._show_cover = show_cover
+    stats = latency_stats(samples)
+    stats["errors"] = sum(1 for error in shown if error)
+    return stats
+
+
+def bench_add_to_list(app, ids):
+    samples = []
+    for comic_id in ids:
+        app.current_comic = app.comic_by_id[comic_id]
+        start = time.perf_counter()
+        app.add_to_list()
+        samples.append(time.perf_counter() - start)
+    return latency_stats(samples)
+
+
+def bench_download(app, root, tasks):
+    """提交批量下载并等待队列清空（含完成后的列表刷新）"""
+    finished = []
+    finish = app._finish_job_batch
+
+    def record():
+        finish()
+        finished.append(True)
+
+    app._finish_job_batch = record
+    try:
+        app._download_all_comics(tasks)
+        pump(root, lambda: finished and not app._loading, timeout=600.0)
+    finally:
+        app._finish_job_batch = finish
+
+
+def write_config(tmp, args):
+    config = {
+        "download": {"engine": args.engine, "rate_limit": 0, "max_workers": args.workers},
+        "storage": {"backend": args.backend, "details_dir": os.path.join(tmp, "details"),
+                    "packed_path": os.path.join(tmp, "details.db")},
+    }
+    with open("viewer_config.json", "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False)
+
+
+def run_size(size, args, make_root):
+    rng = random.Random(size)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        # 配置、索引、下载队列和下载列表都写在当前目录
+        os.chdir(tmp)
+        try:
+            rec = Recorder(args.trace_memory)
+            write_config(tmp, args)
+            if args.backend == STORAGE_PACKED:
+                store = PackedStore(os.path.join(tmp, "details.db"))
+            else:
+                store = DirectoryStore(os.path.join(tmp, "details"))
+            ids = rec.phase("generate_corpus", lambda: generate_corpus(store, size, min(args.covers, size), rng))
+            store.close()
+
+            root = make_root()
+            app = rec.phase("window_ready", lambda: load_detail.ComicBrowser(root))
+            # 漫画数据在后台加载，等待加载完成
+            rec.phase("startup_load", lambda: pump(root, lambda: not app._loading, timeout=600.0))
+            rec.phase("load_comics_warm", lambda: load_and_wait(app, root))
+            rec.report["filter_comics"] = rec.phase("filter_comics_total", lambda: bench_filter(app))
+
+            sample = rng.sample(ids, min(args.samples, size))
+            rec.report["show_comic_details"] = rec.phase(
+                "show_comic_details_total", lambda: bench_details(app, sample))
+            # 等待上一阶段触发的封面解码完成，再从空缓存开始
+            time.sleep(0.2)
+            pump(root, lambda: True)
+            app.cover_loader.clear()
+            # 随机访问，减少相邻预加载带来的命中
+            with_cover = rng.sample(ids[:min(args.covers, size)], min(args.covers, size, args.samples))
+            rec.report["load_cover_image_cold"] = rec.phase(
+                "load_cover_image_cold_total", lambda: bench_covers(app, root, with_cover))
+            rec.report["load_cover_image_cached"] = rec.phase(
+                "load_cover_image_cached_total", lambda: bench_covers(app, root, with_cover))
+
+            rec.report["add_to_list"] = rec.phase("add_to_list_total", lambda: bench_add_to_list(app, sample))
+            app.search_var.set("")
+            app.filter_comics()
+            rec.phase("add_filtered_to_list", app.add_filtered_to_list, rows=len(app.comic_view.ids))
+            rec.phase("list_compact", app.compact_download_list)
+
+            # 一半已在本地（跳过），一半需要通过客户端替身下载
+            batch = min(args.batch, size)
+            tasks = [{"id": comic_id, "title": ""} for comic_id in rng.sample(ids, batch // 2)]
+            tasks += [{"id": str(FIRST_ID + size + i), "title": ""} for i in range(batch - batch // 2)]
+            rec.phase("download_all_comics", lambda: bench_download(app, root, tasks), tasks=len(tasks),
+                      latency_s=args.latency, workers=args.workers)
+
+            app.cover_loader.shutdown()
+            app.store.close()
+            app.job_queue.close()
+            if app.catalog is not None:
+                app.catalog.close()
+            root.destroy()
+        finally:
+            os.chdir(cwd)
+    return rec.report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,10000", help="逗号分隔的语料规模")
+    parser.add_argument("--covers", type=int, default=300, help="带封面的漫画数")
+    parser.add_argument("--samples", type=int, default=200, help="详情、封面、添加列表各操作的次数")
+    parser.add_argument("--batch", type=int, default=200, help="批量下载的任务数")
+    parser.add_argument("--latency", type=float, default=0.02, help="客户端替身每次请求的延迟（秒）")
+    parser.add_argument("--workers", type=int, default=15)
+    parser.add_argument("--engine", choices=("threads", "asyncio"), default="threads")
+    parser.add_argument("--backend", choices=(STORAGE_DIRECTORY, STORAGE_PACKED), default=STORAGE_DIRECTORY)
+    parser.add_argument("--headless", action="store_true", help="即使有显示环境也使用界面替身")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="用tracemalloc记录每个阶段的Python堆峰值（会使计时变慢）")
+    parser.add_argument("--output", help="同时把结果写入该文件")
+    args = parser.parse_args()
+
+    # 语料中大部分漫画没有封面，不输出相应的警告
+    logging.getLogger("ComicBrowser").setLevel(logging.ERROR)
+    load_detail.jm_client_factory = lambda option=None: (
+        lambda: FakeJmClient(args.latency, setup_cost=0, connect_cost=0))
+
+    headless = args.headless or (sys.platform.startswith("linux") and not os.environ.get("DISPLAY"))
+    if headless:
+        make_root = headless_tk.install(load_detail)
+    else:
+        load_detail.import_gui()
+
+        def make_root():
+            root = load_detail.tk.Tk()
+            root.withdraw()
+            return root
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "headless": headless,
+        "backend": args.backend,
+        "engine": args.engine,
+        "sizes": {},
+    }
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        report["sizes"][str(size)] = run_size(size, args, make_root)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""基准测试用的本地jmcomic客户端替身，可调节构造开销、建连开销和请求延迟"""
+import io
+import os
+import random
+import sys
+import threading
+import time
+
+# 基准脚本从仓库根目录导入模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_COVER_LOCK = threading.Lock()
+_COVER_BYTES = None
+
+WORDS = ["纯爱", "后宫", "校园", "奇幻", "冒险", "日常", "百合", "全彩", "中文", "长篇",
+         "Love", "Story", "Summer", "Night", "Girl", "Dream", "Sister", "Magic", "Island", "Days"]
+
+
+def cover_bytes(size=(360, 500)):
+    """生成一张PNG封面（进程内只生成一次）"""
+    global _COVER_BYTES
+    with _COVER_LOCK:
+        if _COVER_BYTES is None:
+            from PIL import Image
+            img = Image.new("RGB", size)
+            img.putdata([((x * 7) % 256, (y * 3) % 256, (x + y) % 256)
+                         for y in range(size[1]) for x in range(size[0])])
+            buf = io.BytesIO()
+            img.save(buf, "PNG")
+            _COVER_BYTES = buf.getvalue()
+        return _COVER_BYTES
+
+
+def fake_album_json(album_id, rng=None, related=8):
+    """生成一份与album.json结构一致的详情数据"""
+    rng = rng or random.Random(int(album_id))
+    tags = rng.sample(WORDS[:10], 3)
+    author = f"作者{rng.randint(1, 500)}"
+    return {
+        "id": str(album_id),
+        "title": " ".join(rng.sample(WORDS, 4)) + f" {album_id}",
+        "author": author,
+        "description": "",
+        "tags": tags,
+        "comment_count": rng.randint(0, 500),
+        "likes": str(rng.randint(0, 50000)),
+        "works": [],
+        "related_list": [
+            {"id": str(rng.randint(100000, 999999)), "name": " ".join(rng.sample(WORDS, 3)),
+             "author": f"作者{rng.randint(1, 500)}", "image": ""}
+            for _ in range(related)
+        ],
+    }
+
+
+class FakeAlbum:
+    def __init__(self, album_id):
+        data = fake_album_json(album_id)
+        self.album_id = data["id"]
+        self.title = data["title"]
+        self.author = data["author"]
+        self.description = data["description"]
+        self.tags = data["tags"]
+        self.comment_count = data["comment_count"]
+        self.likes = data["likes"]
+        self.works = data["works"]
+        self.related_list = data["related_list"]
+        self.episode_list = [(self.album_id, "1", "")]
+
+
+class FakeImage:
+    def __init__(self, photo_id, index):
+        self.aid = photo_id
+        self.img_file_name = f"{index + 1:05d}"
+        self.img_url = f"http://fake/media/photos/{photo_id}/{self.img_file_name}.webp"
+
+
+class FakeJmClient:
+    """模拟jmcomic客户端
+
+    setup_cost: 构造客户端时的开销（域名探测等）
+    connect_cost: 每个客户端首次请求时的建连开销（TLS握手，会话复用后不再产生）
+    latency: 每次请求的网络延迟
+    """
+
+    def __init__(self, latency=0.02, setup_cost=0.3, connect_cost=0.05, pages=30):
+        time.sleep(setup_cost)
+        self.latency = latency
+        self.connect_cost = connect_cost
+        self.pages = pages
+        self._connected = False
+        self.requests = 0
+
+    def _request(self):
+        if not self._connected:
+            time.sleep(self.connect_cost)
+            self._connected = True
+        self.requests += 1
+        time.sleep(self.latency)
+
+    def get_domain_list(self):
+        return ["fake"]
+
+    def get_album_detail(self, album_id):
+        self._request()
+        return FakeAlbum(album_id)
+
+    def get_photo_detail(self, photo_id, fetch_album=True, fetch_scramble_id=True):
+        self._request()
+        if fetch_album:
+            self._request()
+        if fetch_scramble_id:
+            self._request()
+        return [FakeImage(photo_id, i) for i in range(self.pages)]
+
+    def download_album_cover(self, album_id, save_path, size=''):
+        self._request()
+        with open(save_path, "wb") as f:
+            f.write(cover_bytes())
+
+    def download_by_image_detail(self, image, img_save_path, decode_image=True):
+        self._request()
+        with open(img_save_path, "wb") as f:
+            f.write(cover_bytes())
@@ -0,0 +1,178 @@
+"""无显示环境下驱动ComicBrowser的界面替身
+
+只模拟浏览器用到的控件接口：控件调用大多为空操作，Treeview记录行数据，
+after()回调由update()在调用线程中按到期时间执行（与Tk主循环一样是单线程的）。
+计时结果反映模型层（索引、搜索、虚拟列表、封面解码、队列）的开销，不含真实的绘制开销。
+"""
+import heapq
+import itertools
+import threading
+import time
+import tkinter.constants
+from types import SimpleNamespace
+
+
+class FakeWidget:
+    def __init__(self, *args, **kwargs):
+        self.options = dict(kwargs)
+
+    def config(self, **kwargs):
+        self.options.update(kwargs)
+
+    configure = config
+
+    def cget(self, key):
+        return self.options.get(key)
+
+    def __getattr__(self, name):
+        # pack、bind、set、start等方法均为空操作
+        return lambda *args, **kwargs: None
+
+
+class FakeStyle(FakeWidget):
+    def configure(self, style=None, **kwargs):
+        pass
+
+    def lookup(self, *args, **kwargs):
+        return ""
+
+
+class FakeTree(FakeWidget):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._rows = {}
+        self._selection = ()
+        self._counter = itertools.count()
+
+    def insert(self, parent, index, iid=None, values=()):
+        iid = iid or f"I{next(self._counter)}"
+        self._rows[iid] = values
+        return iid
+
+    def item(self, iid, values=None, **kwargs):
+        if values is None:
+            return {"values": self._rows[iid]}
+        self._rows[iid] = values
+
+    def delete(self, *iids):
+        for iid in iids:
+            self._rows.pop(iid, None)
+
+    def exists(self, iid):
+        return iid in self._rows
+
+    def get_children(self, item=""):
+        return tuple(self._rows)
+
+    def selection(self):
+        return self._selection
+
+    def selection_set(self, *iids):
+        self._selection = tuple(iids)
+
+    def selection_remove(self, *iids):
+        self._selection = ()
+
+
+class FakeVar:
+    def __init__(self, master=None, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class FakeRoot(FakeWidget):
+    """记录after()回调，由update()执行；可在任意线程中调用after()"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self._timers = []
+        self._cancelled = set()
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.destroyed = False
+
+    def after(self, ms, func=None, *args):
+        after_id = next(self._counter)
+        with self._lock:
+            heapq.heappush(self._timers, (time.perf_counter() + ms / 1000, after_id, func, args))
+        return after_id
+
+    def after_cancel(self, after_id):
+        with self._lock:
+            self._cancelled.add(after_id)
+
+    def update(self):
+        """执行所有已到期的回调"""
+        while True:
+            with self._lock:
+                if not self._timers or self._timers[0][0] > time.perf_counter():
+                    return
+                _, after_id, func, args = heapq.heappop(self._timers)
+                if after_id in self._cancelled:
+                    self._cancelled.discard(after_id)
+                    continue
+            func(*args)
+
+    def destroy(self):
+        self.destroyed = True
+
+
+class FakePhotoImage:
+    """代替ImageTk.PhotoImage，只保留尺寸"""
+
+    def __init__(self, img):
+        self.size = img.size
+
+    def width(self):
+        return self.size[0]
+
+    def height(self):
+        return self.size[1]
+
+
+class _Widgets(SimpleNamespace):
+    def __getattr__(self, name):
+        return FakeWidget
+
+
+def _messagebox_answer(*args, **kwargs):
+    return True
+
+
+tk = _Widgets(**{name: getattr(tkinter.constants, name) for name in dir(tkinter.constants)
+                 if name.isupper()},
+              Tk=FakeRoot, StringVar=FakeVar, IntVar=FakeVar, DoubleVar=FakeVar, BooleanVar=FakeVar,
+              Toplevel=FakeRoot)
+ttk = _Widgets(Treeview=FakeTree, Style=FakeStyle)
+messagebox = SimpleNamespace(showinfo=_messagebox_answer, showwarning=_messagebox_answer,
+                             showerror=_messagebox_answer, askyesno=_messagebox_answer,
+                             askokcancel=_messagebox_answer)
+filedialog = SimpleNamespace(askopenfilename=lambda **kwargs: "", askopenfilenames=lambda **kwargs: (),
+                             asksaveasfilename=lambda **kwargs: "")
+scrolledtext = _Widgets()
+
+
+def install(load_detail):
+    """把load_detail中的界面模块替换为替身，返回根窗口类"""
+    import album_window
+    import cover_loader
+    from cover_loader import CoverLoader
+    from virtual_list import VirtualList
+
+    load_detail.tk = tk
+    load_detail.ttk = ttk
+    load_detail.messagebox = messagebox
+    load_detail.filedialog = filedialog
+    load_detail.scrolledtext = scrolledtext
+    load_detail.VirtualList = VirtualList
+    load_detail.CoverLoader = CoverLoader
+    album_window.tk = tk
+    album_window.ttk = ttk
+    load_detail.AlbumDownloadWindow = album_window.AlbumDownloadWindow
+    cover_loader.ImageTk = SimpleNamespace(PhotoImage=FakePhotoImage)
+    return FakeRoot
@@ -0,0 +1,172 @@
+import json
+import os
+import sqlite3
+import threading
+import logging
+from time import time as get_time
+
+import metrics
+from storage import DETAILS_DIR, as_store
+
+logger = logging.getLogger("ComicBrowser.catalog")
+
+# 刷新索引时每解析多少个详情报告一次进度
+PROGRESS_EVERY = 500
+
+
+class CatalogIndex:
+    """详情存储的持久化索引（SQLite），按漫画ID记录修改时间，刷新时只解析新增或变化的详情
+
+    store为详情目录或DetailStore
+    """
+
+    def __init__(self, store=DETAILS_DIR, db_path=None):
+        self.store = as_store(store)
+        if db_path is None:
+            # 索引文件放在details目录（或打包文件）旁边
+            parent = os.path.dirname(os.path.abspath(self.store.location))
+            db_path = os.path.join(parent, "catalog.db")
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS albums ("
+            "id TEXT PRIMARY KEY, "
+            "mtime REAL NOT NULL, "
+            "title TEXT, "
+            "data TEXT NOT NULL)"
+        )
+        # 统计刷新时检查过但没有变化（未重写album.json）的漫画的检查时间
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS stats_checks ("
+            "id TEXT PRIMARY KEY, "
+            "checked REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def refresh(self, on_progress=None):
+        """增量刷新索引：解析新增或修改过的详情，删除已不存在的详情
+
+        on_progress(done, total) 每解析一批详情后调用。
+        返回统计信息字典: total, added, updated, removed, failed
+        """
+        stats = {"total": 0, "added": 0, "updated": 0, "removed": 0, "failed": 0}
+        with metrics.timer("catalog.scan"):
+            found, missing = self.store.scan()
+        stats["total"] = len(found) + len(missing)
+        for dir_path in missing:
+            logger.warning(f"在文件夹中未找到album.json: {dir_path}")
+
+        # 只在读取已知记录和最后写入时持有锁，解析期间下载完成的upsert不必等待
+        with self._lock:
+            known = dict(self._conn.execute("SELECT id, mtime FROM albums"))
+
+        changed = [comic_id for comic_id, mtime in found.items() if known.get(comic_id) != mtime]
+        rows = []
+        for done, comic_id in enumerate(changed):
+            if on_progress is not None and done % PROGRESS_EVERY == 0:
+                on_progress(done, len(changed))
+            mtime = found[comic_id]
+            old_mtime = known.get(comic_id)
+            try:
+                with metrics.timer("catalog.parse"):
+                    comic_data = self.store.read_album(comic_id)
+            except Exception as e:
+                logger.error(f"加载漫画数据出错: {comic_id}, {str(e)}")
+                metrics.incr("catalog.parse_errors")
+                stats["failed"] += 1
+                continue
+            rows.append((comic_id, mtime, comic_data.get("title", "无标题"),
+                         json.dumps(comic_data, ensure_ascii=False)))
+            stats["updated" if old_mtime is not None else "added"] += 1
+
+        removed = [(comic_id, mtime) for comic_id, mtime in known.items() if comic_id not in found]
+        stats["removed"] = len(removed)
+
+        with self._lock:
+            # 解析期间upsert写入的更新记录不被扫描时的旧数据覆盖或删除
+            if rows:
+                self._conn.executemany(
+                    "INSERT INTO albums (id, mtime, title, data) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET mtime = excluded.mtime, title = excluded.title, "
+                    "data = excluded.data WHERE excluded.mtime >= albums.mtime", rows)
+            if removed:
+                self._conn.executemany("DELETE FROM albums WHERE id = ? AND mtime = ?", removed)
+                self._conn.executemany("DELETE FROM stats_checks WHERE id = ? "
+                                       "AND NOT EXISTS (SELECT 1 FROM albums WHERE albums.id = stats_checks.id)",
+                                       [(comic_id,) for comic_id, _ in removed])
+            self._conn.commit()
+
+        logger.debug(f"索引刷新完成: {stats}")
+        return stats
+
+    def upsert(self, ids):
+        """重新读取指定漫画的详情写入索引（刚下载完成时使用，不必扫描整个存储），一次提交
+
+        返回与ComicBrowser.comics相同结构的列表，读取失败的漫画不包含在内
+        """
+        comics = []
+        rows = []
+        for comic_id in ids:
+            try:
+                with metrics.timer("catalog.parse"):
+                    comic_data = self.store.read_album(comic_id)
+            except Exception as e:
+                logger.error(f"加载漫画数据出错: {comic_id}, {str(e)}")
+                metrics.incr("catalog.parse_errors")
+                continue
+            rows.append((comic_id, self.store.album_mtime(comic_id) or 0, comic_data.get("title", "无标题"),
+                         json.dumps(comic_data, ensure_ascii=False)))
+            comics.append({"id": comic_id, "dir": self.store.comic_path(comic_id), "data": comic_data})
+        if rows:
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO albums (id, mtime, title, data) VALUES (?, ?, ?, ?)", rows)
+                self._conn.commit()
+        return comics
+
+    def refresh_candidates(self):
+        """统计刷新的候选漫画，返回 [(漫画ID, 最近获取或检查的时间, 点赞数原文)]"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT a.id, MAX(a.mtime, COALESCE(c.checked, 0)), json_extract(a.data, '$.likes') "
+                "FROM albums a LEFT JOIN stats_checks c ON c.id = a.id"
+            ).fetchall()
+
+    def mark_checked(self, ids, when=None):
+        """记录统计刷新的检查时间，一次提交"""
+        when = get_time() if when is None else when
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO stats_checks (id, checked) VALUES (?, ?)",
+                [(comic_id, when) for comic_id in ids])
+            self._conn.commit()
+
+    def load_all(self):
+        """一次读取全部漫画，返回与ComicBrowser.comics相同结构的列表"""
+        with metrics.timer("catalog.load_all"):
+            return [comic for chunk in self.iter_chunks() for comic in chunk]
+
+    def iter_chunks(self, chunk_size=1000):
+        """按ID顺序分批读取漫画，每批为一个列表；每批查询只短暂持有连接"""
+        last_id = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT id, data FROM albums WHERE id > ? ORDER BY id LIMIT ?", (last_id, chunk_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [
+                {
+                    "id": comic_id,
+                    "dir": self.store.comic_path(comic_id),
+                    "data": json.loads(data),
+                }
+                for comic_id, data in rows
+            ]
@@ -0,0 +1,131 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger("ComicBrowser.client")
+
+# 连续失败多少次后认为客户端已失效并重新创建
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+def jm_client_factory(option=None):
+    """返回创建jmcomic客户端的工厂函数
+
+    所有客户端共享同一个JmOption，并使用带会话的postman以复用HTTP连接；
+    首个客户端确定的域名列表会复用给后续客户端，避免重复的域名探测。
+    ClientPool在锁外调用工厂函数：共享的JmOption只在锁内修改，首个客户端探测域名期间其他线程等待。
+    """
+    state = {"option": option, "domains": None}
+    lock = threading.Lock()
+
+    def create():
+        import jmcomic
+        with lock:
+            if state["domains"] is None:
+                if state["option"] is None:
+                    state["option"] = jmcomic.JmOption.default()
+                opt = state["option"]
+                opt.client.postman.src_dict["type"] = "curl_cffi_session"
+                client = opt.new_jm_client()
+                state["domains"] = client.get_domain_list()
+                return client
+            opt, domains = state["option"], state["domains"]
+        # 域名确定后不再修改JmOption，new_jm_client只复制其中的配置，可在多个线程中同时调用
+        return opt.new_jm_client(domain_list=domains)
+
+    return create
+
+
+class _PooledClient:
+    __slots__ = ("client", "failures")
+
+    def __init__(self, client):
+        self.client = client
+        self.failures = 0
+
+
+class ClientPool:
+    """线程间共享的长期客户端池
+
+    客户端在首次需要时才创建，数量不超过size；每个客户端同一时间只被一个线程使用。
+    使用过程中连续失败达到阈值，或health_check返回False时，该客户端会被丢弃并在下次按需重建。
+    """
+
+    def __init__(self, factory, size=4, health_check=None,
+                 max_failures=MAX_CONSECUTIVE_FAILURES):
+        self.factory = factory
+        self.size = size
+        self.health_check = health_check
+        self.max_failures = max_failures
+        # 空闲客户端栈，后进先出以便优先使用连接仍然活跃的客户端
+        self._idle = []
+        self._created = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def client(self, block=True):
+        """借出一个客户端，用完自动归还
+
+        block为False时不等待：没有空闲客户端且已达到数量上限时得到None。
+        """
+        pooled = self._acquire(block)
+        if pooled is None:
+            yield None
+            return
+        try:
+            yield pooled.client
+        except Exception:
+            pooled.failures += 1
+            self._release(pooled, healthy=self._is_healthy(pooled))
+            raise
+        else:
+            pooled.failures = 0
+            self._release(pooled, healthy=True)
+
+    def _acquire(self, block=True):
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                if not block:
+                    return None
+                self._cond.wait()
+        try:
+            client = self.factory()
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+        logger.debug(f"创建客户端 ({self._created}/{self.size})")
+        return _PooledClient(client)
+
+    def _release(self, pooled, healthy):
+        with self._cond:
+            if healthy:
+                self._idle.append(pooled)
+            else:
+                # 丢弃失效的客户端，等待中的线程会重新创建
+                logger.warning(f"客户端连续失败 {pooled.failures} 次，丢弃并将重新创建")
+                self._created -= 1
+            self._cond.notify()
+
+    def _is_healthy(self, pooled):
+        if pooled.failures >= self.max_failures:
+            return False
+        if self.health_check is not None:
+            try:
+                return bool(self.health_check(pooled.client))
+            except Exception:
+                return False
+        return True
+
+    def discard_all(self):
+        """丢弃所有空闲客户端（如切换配置后），下次使用时重新创建"""
+        with self._cond:
+            self._created -= len(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
@@ -0,0 +1,123 @@
+import copy
+import json
+import logging
+import os
+
+logger = logging.getLogger("ComicBrowser.config")
+
+CONFIG_PATH = "viewer_config.json"
+
+# 浏览器自身的配置，jmcomic的下载配置仍在setting.yml中
+DEFAULT_CONFIG = {
+    "download": {
+        # 下载详情的并发范围，实际并发由自适应限制器在此范围内调整
+        "min_workers": 1,
+        "max_workers": 15,
+        "initial_workers": 4,
+        # 期望的单次请求延迟（秒），0表示以观测到的最小延迟为基线
+        "latency_target": 0,
+        # 全局请求速率（每秒请求数），0表示不限速
+        "rate_limit": 0,
+        "burst": 5,
+        # 批量下载引擎: threads（线程池）或 asyncio（单事件循环，适合大批量）
+        "engine": "threads",
+        "async_concurrency": 64,
+        "async_cover_concurrency": 32,
+        # 整本漫画下载: 同时下载的漫画数和全部图片的带宽上限（KB/s，0表示不限）
+        "max_albums": 2,
+        "bandwidth_limit": 0,
+        # 整本漫画的图片还原和格式转换在进程池中执行（进程数0表示CPU核数）
+        "image_pipeline": False,
+        "image_processes": 0,
+    },
+    "storage": {
+        # directory: 每本漫画一个目录; packed: 全部详情和封面保存在一个SQLite文件中
+        # 两种布局可用 python storage.py pack/unpack 相互迁移
+        "backend": "directory",
+        "details_dir": "details",
+        "packed_path": "details.db",
+        # 下载封面后转码: webp、jpeg、png或original（保留原图），在进程池中执行
+        "cover_format": "webp",
+        "cover_quality": 85,
+        # 封面的最大尺寸，超过时按比例缩小
+        "cover_max_size": [600, 900],
+        # 转码进程数，0表示自动
+        "cover_workers": 0,
+    },
+    "crawl": {
+        # 从种子出发最多展开几层相关作品
+        "max_depth": 2,
+        # 单次抓取最多下载多少本（本地已有的不计入）
+        "max_count": 500,
+        # 抓取优先级权重，见crawler.DEFAULT_WEIGHTS
+        "weights": {
+            "likes": 1.0,
+            "tag_overlap": 2.0,
+            "same_author": 3.0,
+            "depth": -1.0,
+        },
+    },
+    "stats_refresh": {
+        # 定时重新获取一批漫画的详情，更新点赞、评论数等（不下载封面），只重写有变化的album.json
+        "enabled": False,
+        "interval_minutes": 60,
+        # 每次刷新的漫画数和选择策略: oldest（最久未获取或检查的）或 likes（点赞最多的）
+        "batch_size": 50,
+        "order": "oldest",
+        # 最近获取或检查过的不重复刷新（小时）
+        "min_age_hours": 24,
+    },
+    "metrics": {
+        # 记录抓取、索引、搜索、封面解码等的耗时和计数，关闭时几乎没有开销
+        "enabled": False,
+        # 定期写入的快照文件，留空则只在界面的统计面板中查看
+        "snapshot_path": "metrics.json",
+        # json 或 prometheus（文本格式，可由node_exporter的textfile收集器读取）
+        "format": "json",
+        "interval": 30,
+    },
+    "logging": {
+        "dir": "logs",
+        "file": "comic_browser.log",
+        "file_level": "DEBUG",
+        "console_level": "INFO",
+        # 轮转方式: size（超过max_bytes）或 time（按when，如midnight、H）；旧文件保留backup_count个
+        "rotate": "size",
+        "max_bytes": 5 * 1024 * 1024,
+        "when": "midnight",
+        "backup_count": 5,
+        # 轮转出的旧日志压缩为.gz
+        "compress": True,
+        # 各子系统的日志级别，如 "ComicBrowser.search": "DEBUG"、"ComicBrowser.cover": "WARNING"
+        "levels": {
+            "ComicBrowser": "INFO",
+        },
+    },
+}
+
+
+def _merge(defaults, overrides):
+    result = copy.deepcopy(defaults)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = _merge(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+def load_config(path=CONFIG_PATH):
+    """读取配置文件并与默认值合并；文件不存在时写入默认配置"""
+    if not os.path.exists(path):
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(DEFAULT_CONFIG, f, ensure_ascii=False, indent=4)
+        except Exception as e:
+            logger.warning(f"创建默认配置文件失败: {path}, {str(e)}")
+        return copy.deepcopy(DEFAULT_CONFIG)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return _merge(DEFAULT_CONFIG, json.load(f))
+    except Exception as e:
+        logger.error(f"读取配置文件失败，使用默认配置: {path}, {str(e)}")
+        return copy.deepcopy(DEFAULT_CONFIG)
@@ -0,0 +1,158 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+import metrics
+from storage import as_store
+from thumbnails import THUMB_SIZE
+
+logger = logging.getLogger("ComicBrowser.cover")
+
+# PIL.ImageTk在第一次显示封面时才导入
+ImageTk = None
+
+
+def photo_image(img):
+    global ImageTk
+    if ImageTk is None:
+        from PIL import ImageTk
+    return ImageTk.PhotoImage(img)
+
+
+class CoverMissing(Exception):
+    """漫画目录中没有封面文件"""
+
+
+def decode_cover(store, comic_id):
+    """在后台线程中读取并缩放封面，优先使用缩略图，返回已解码的PIL图片"""
+    source = store.cover_source(comic_id)
+    if source is None:
+        raise CoverMissing(comic_id)
+    with metrics.timer("cover.decode"), Image.open(source) as img:
+        # 计算保持宽高比的缩放比例
+        max_width, max_height = THUMB_SIZE
+        width, height = img.size
+        ratio = min(max_width / width, max_height / height)
+        new_size = (int(width * ratio), int(height * ratio))
+        # 缩略图已经是目标尺寸，无需再次缩放
+        if new_size != img.size:
+            return img.resize(new_size, Image.LANCZOS)
+        img.load()
+        return img.copy()
+
+
+class CoverLoader:
+    """后台解码封面，并在内存中以LRU方式缓存已生成的PhotoImage
+
+    解码在线程池中进行，结果通过root.after交回Tk主线程；
+    用户已经切换到其他漫画时，过时的显示请求结果会被直接丢弃。
+    """
+
+    def __init__(self, root, store, max_bytes=64 * 1024 * 1024, workers=2):
+        self.root = root
+        self.store = as_store(store)
+        self.max_bytes = max_bytes
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cover")
+        # 漫画ID -> (PhotoImage, 占用字节数)
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        # 正在解码的漫画ID，避免重复提交
+        self._pending = set()
+        self._lock = threading.Lock()
+        # 当前需要显示的漫画ID及其回调
+        self._wanted = None
+        self._on_ready = None
+
+    def load(self, comic_id, on_ready):
+        """请求显示封面；on_ready(photo, error) 在主线程中调用，命中缓存时立即调用"""
+        self._wanted = comic_id
+        self._on_ready = on_ready
+        cached = self._cache.get(comic_id)
+        if cached is not None:
+            metrics.incr("cover.cache_hit")
+            self._cache.move_to_end(comic_id)
+            on_ready(cached[0], None)
+            return
+        metrics.incr("cover.cache_miss")
+        self._submit(comic_id, preload=False)
+
+    def is_cached(self, comic_id):
+        return comic_id in self._cache
+
+    def preload(self, comics):
+        """预先解码可能马上会被查看的封面（如列表中的相邻项）"""
+        for comic in comics:
+            if comic["id"] not in self._cache:
+                self._submit(comic["id"], preload=True)
+
+    def invalidate(self, comic_id):
+        """封面文件变化或被删除时移除缓存"""
+        cached = self._cache.pop(comic_id, None)
+        if cached is not None:
+            self._cache_bytes -= cached[1]
+
+    def clear(self):
+        self._cache.clear()
+        self._cache_bytes = 0
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, comic_id, preload):
+        with self._lock:
+            if comic_id in self._pending:
+                return
+            self._pending.add(comic_id)
+        self._executor.submit(self._decode, comic_id, preload)
+
+    def _decode(self, comic_id, preload):
+        """线程池中执行"""
+        img, error = None, None
+        # 显示请求在开始解码前已过时则不再解码
+        if not preload and comic_id != self._wanted:
+            error = "stale"
+        else:
+            try:
+                img = decode_cover(self.store, comic_id)
+            except CoverMissing as e:
+                error = "封面不存在"
+                logger.warning(f"封面图片不存在: {e}")
+            except Exception as e:
+                error = "封面加载失败"
+                logger.error(f"加载封面图片出错: {comic_id}, {str(e)}")
+        try:
+            self.root.after(0, self._deliver, comic_id, img, error, preload)
+        except RuntimeError:
+            # 主循环已退出
+            pass
+
+    def _deliver(self, comic_id, img, error, preload):
+        """主线程中执行：生成PhotoImage、写入缓存并在仍需要时显示"""
+        with self._lock:
+            self._pending.discard(comic_id)
+        wanted = comic_id == self._wanted
+        if error == "stale":
+            # 解码前已过时，但用户在此期间又切换回来时重新提交
+            if wanted:
+                self._submit(comic_id, preload=False)
+            return
+        if not wanted and not preload:
+            return
+        photo = None
+        if img is not None:
+            photo = photo_image(img)
+            self._put(comic_id, photo, img.width * img.height * 4)
+        if wanted and self._on_ready:
+            self._on_ready(photo, error)
+
+    def _put(self, comic_id, photo, cost):
+        self.invalidate(comic_id)
+        self._cache[comic_id] = (photo, cost)
+        self._cache_bytes += cost
+        # 超出内存预算时淘汰最久未使用的封面
+        while self._cache_bytes > self.max_bytes and len(self._cache) > 1:
+            _, (_, old_cost) = self._cache.popitem(last=False)
+            self._cache_bytes -= old_cost
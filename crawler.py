@@ -0,0 +1,286 @@
+import logging
+import math
+import sqlite3
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from time import time as get_time
+
+from detail_download import DETAIL_MODE_SKIP, DETAIL_SKIPPED, detail_is_fresh
+from job_queue import is_transient_error
+from storage import DETAILS_DIR, as_store
+
+logger = logging.getLogger("ComicBrowser.crawler")
+
+# 抓取边界中每个ID的状态
+CRAWL_QUEUED = "queued"
+CRAWL_RUNNING = "running"
+CRAWL_DONE = "done"
+CRAWL_FAILED = "failed"
+
+# 优先级权重的默认值，可在配置文件crawl.weights中修改
+DEFAULT_WEIGHTS = {
+    "likes": 1.0,        # 上游作品点赞数（取对数）
+    "tag_overlap": 2.0,  # 上游作品标签与种子标签的重合比例
+    "same_author": 3.0,  # 作者与上游作品或种子相同
+    "depth": -1.0,       # 每多一层的加分，负数表示优先广度
+}
+# 种子总是最先抓取
+SEED_PRIORITY = 1e9
+# 临时错误导致失败的ID最多抓取几次
+MAX_ATTEMPTS = 3
+
+
+def parse_count(value):
+    """把 "918"、"1.2K"、"3M" 之类的计数转为整数，无法解析时返回0"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value or "").strip().replace(",", "").upper()
+    scale = 1
+    if text.endswith("K"):
+        scale, text = 1000, text[:-1]
+    elif text.endswith("M"):
+        scale, text = 1000000, text[:-1]
+    try:
+        return int(float(text) * scale)
+    except ValueError:
+        return 0
+
+
+def load_album_json(store, comic_id):
+    """读取本地详情，不存在或损坏时返回None"""
+    try:
+        return store.read_album(comic_id)
+    except Exception:
+        return None
+
+
+class RelatedCrawler:
+    """从种子ID出发，沿album.json中的related_list逐层抓取相关作品
+
+    边界（待抓取的ID）和已访问集合保存在SQLite中，中断后再次运行会从上次的位置继续。
+    待抓取的ID按优先级从高到低领取，优先级由已下载的上游详情计算：点赞数、
+    与种子的标签重合度、作者是否相同，以及深度。本地已有的详情不消耗请求预算，直接展开。
+    因临时错误失败的ID在边界领取完后（或下次运行时）重新放回边界，最多抓取max_attempts次。
+    """
+
+    def __init__(self, db_path="crawl.db", store=DETAILS_DIR, max_depth=2, weights=None,
+                 max_attempts=MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.store = as_store(store)
+        self.max_depth = max_depth
+        self.max_attempts = max_attempts
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS frontier ("
+            "id TEXT PRIMARY KEY, "
+            "depth INTEGER NOT NULL, "
+            "priority REAL NOT NULL, "
+            "parent TEXT, "
+            "state TEXT NOT NULL, "
+            "error TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "updated REAL NOT NULL)"
+        )
+        # 早期版本创建的边界表没有抓取次数
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(frontier)")}
+        if "attempts" not in columns:
+            self._conn.execute("ALTER TABLE frontier ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS frontier_state ON frontier (state, priority)")
+        self._conn.commit()
+        self._seed_tags = set()
+        self._seed_authors = set()
+        self._load_seed_profile()
+
+    @classmethod
+    def from_config(cls, conf, db_path="crawl.db", store=DETAILS_DIR):
+        return cls(db_path, store, max_depth=conf["max_depth"], weights=conf["weights"])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _load_seed_profile(self):
+        """种子的标签和作者用于计算后续作品的相关程度"""
+        with self._lock:
+            seeds = [row[0] for row in self._conn.execute(
+                "SELECT id FROM frontier WHERE depth = 0 AND state = ?", (CRAWL_DONE,))]
+        for seed in seeds:
+            self._add_to_profile(load_album_json(self.store, seed))
+
+    def _add_to_profile(self, data):
+        if not data:
+            return
+        self._seed_tags.update(data.get("tags") or [])
+        if data.get("author"):
+            self._seed_authors.add(data["author"])
+
+    def add_seeds(self, ids):
+        """加入种子ID，返回新加入的数量；已访问过的ID不会重复加入"""
+        now = get_time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO frontier (id, depth, priority, parent, state, updated) "
+                "VALUES (?, 0, ?, NULL, ?, ?)",
+                [(str(comic_id), SEED_PRIORITY, CRAWL_QUEUED, now) for comic_id in ids]
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def recover(self):
+        """上次中断时正在抓取的ID和可以重试的失败ID重新放回边界"""
+        with self._lock:
+            self._conn.execute("UPDATE frontier SET state = ? WHERE state = ?", (CRAWL_QUEUED, CRAWL_RUNNING))
+            self._conn.commit()
+        self.requeue_failed()
+
+    def requeue_failed(self):
+        """把因临时错误失败、且抓取次数未达到上限的ID重新放回边界，返回数量"""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, error FROM frontier WHERE state = ? AND attempts < ?",
+                                      (CRAWL_FAILED, self.max_attempts)).fetchall()
+            retry = [(CRAWL_QUEUED, comic_id) for comic_id, error in rows if is_transient_error(error or "")]
+            if retry:
+                self._conn.executemany("UPDATE frontier SET state = ? WHERE id = ?", retry)
+                self._conn.commit()
+        return len(retry)
+
+    def claim(self, limit):
+        """领取优先级最高的limit个待抓取ID，返回 [(id, depth)]"""
+        if limit <= 0:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, depth FROM frontier WHERE state = ? ORDER BY priority DESC, depth, rowid LIMIT ?",
+                (CRAWL_QUEUED, limit)
+            ).fetchall()
+            if rows:
+                now = get_time()
+                self._conn.executemany("UPDATE frontier SET state = ?, updated = ? WHERE id = ?",
+                                       [(CRAWL_RUNNING, now, comic_id) for comic_id, _ in rows])
+                self._conn.commit()
+        return rows
+
+    def priority(self, parent, work, depth):
+        """related_list中一项的优先级，parent为上游作品的album.json"""
+        w = self.weights
+        score = w["depth"] * depth
+        score += w["likes"] * math.log10(1 + parse_count(parent.get("likes")))
+        tags = set(parent.get("tags") or [])
+        if tags and self._seed_tags:
+            score += w["tag_overlap"] * len(tags & self._seed_tags) / len(tags)
+        author = work.get("author")
+        if author and (author == parent.get("author") or author in self._seed_authors):
+            score += w["same_author"]
+        return score
+
+    def expand(self, comic_id, depth):
+        """把已下载作品的related_list加入边界，返回新加入、提高了优先级或减小了深度的数量"""
+        data = load_album_json(self.store, comic_id)
+        if data is None:
+            return 0
+        if depth == 0:
+            self._add_to_profile(data)
+        if depth >= self.max_depth:
+            return 0
+
+        now = get_time()
+        rows = []
+        for work in data.get("related_list") or []:
+            work_id = str(work.get("id", "")) if isinstance(work, dict) else ""
+            if work_id:
+                rows.append({"id": work_id, "depth": depth + 1, "priority": self.priority(data, work, depth + 1),
+                             "parent": str(comic_id), "updated": now, "w_depth": self.weights["depth"],
+                             "queued": CRAWL_QUEUED, "done": CRAWL_DONE})
+        with self._lock:
+            before = self._conn.total_changes
+            # 边界按优先级而不是按层领取，同一ID可能先经较深的路径加入。已在边界中的ID取较高的优先级；
+            # 经更浅的路径再次遇到时改用较小的深度和新的上游，优先级按较小的深度重新计算；
+            # 已按较大深度访问过（因此可能未展开）的ID重新放回边界，本地已有详情，再次领取时直接展开
+            self._conn.executemany(
+                "INSERT INTO frontier (id, depth, priority, parent, state, updated) "
+                "VALUES (:id, :depth, :priority, :parent, :queued, :updated) "
+                "ON CONFLICT(id) DO UPDATE SET "
+                "priority = CASE WHEN excluded.depth < frontier.depth "
+                "THEN MAX(excluded.priority, frontier.priority + :w_depth * (excluded.depth - frontier.depth)) "
+                "ELSE MAX(frontier.priority, excluded.priority) END, "
+                "parent = CASE WHEN excluded.depth < frontier.depth THEN excluded.parent ELSE frontier.parent END, "
+                "depth = MIN(frontier.depth, excluded.depth), "
+                "state = :queued, "
+                "updated = CASE WHEN excluded.depth < frontier.depth THEN excluded.updated ELSE frontier.updated END "
+                "WHERE frontier.state = :queued OR (frontier.state = :done AND excluded.depth < frontier.depth)",
+                rows
+            )
+            added = self._conn.total_changes - before
+            self._conn.commit()
+        return added
+
+    def finish(self, comic_id, depth, success, error=""):
+        with self._lock:
+            # 跳过本地已有的详情不算一次抓取
+            self._conn.execute("UPDATE frontier SET state = ?, error = ?, updated = ?, "
+                               "attempts = attempts + ? WHERE id = ?",
+                               (CRAWL_DONE if success else CRAWL_FAILED, error or None, get_time(),
+                                0 if error == DETAIL_SKIPPED else 1, comic_id))
+            self._conn.commit()
+        if success:
+            self.expand(comic_id, depth)
+
+    def counts(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall()
+        counts = {CRAWL_QUEUED: 0, CRAWL_RUNNING: 0, CRAWL_DONE: 0, CRAWL_FAILED: 0}
+        counts.update(rows)
+        return counts
+
+    def run(self, fetch, workers=4, max_count=None, on_result=None, stop_event=None):
+        """抓取直到边界为空、成功下载数达到max_count或stop_event被设置
+
+        fetch(comic_id) 返回 (success, error)，与download_detail约定相同；
+        on_result(comic_id, depth, success, error) 在每个ID结束后调用。
+        失败和跳过的ID不计入max_count；边界领取完后，可以重试的失败ID重新放回边界。
+        返回本次成功下载的数量。
+        """
+        self.recover()
+        downloaded = 0
+        running = {}
+
+        def report(comic_id, depth, success, error):
+            self.finish(comic_id, depth, success, error)
+            if on_result is not None:
+                on_result(comic_id, depth, success, error)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                stopping = stop_event is not None and stop_event.is_set()
+                while not stopping and len(running) < workers:
+                    if max_count is not None and downloaded + len(running) >= max_count:
+                        break
+                    rows = self.claim(1)
+                    if not rows:
+                        # 边界领取完且没有进行中的抓取时，重试因临时错误失败的ID
+                        if not running and self.requeue_failed():
+                            continue
+                        break
+                    comic_id, depth = rows[0]
+                    # 本地已有的详情不消耗请求预算，直接展开
+                    if detail_is_fresh(self.store, comic_id, DETAIL_MODE_SKIP):
+                        report(comic_id, depth, True, DETAIL_SKIPPED)
+                        continue
+                    running[executor.submit(fetch, comic_id)] = (comic_id, depth)
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    comic_id, depth = running.pop(future)
+                    try:
+                        success, error = future.result()
+                    except Exception as e:
+                        success, error = False, str(e)
+                    if success and error != DETAIL_SKIPPED:
+                        downloaded += 1
+                    report(comic_id, depth, success, error)
+        logger.info(f"相关作品抓取结束: 下载 {downloaded} 本, 边界状态 {self.counts()}")
+        return downloaded
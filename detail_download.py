@@ -0,0 +1,143 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import time as get_time
+from typing import TYPE_CHECKING
+
+import metrics
+from storage import as_store
+
+if TYPE_CHECKING:
+    import jmcomic
+
+logger = logging.getLogger("ComicBrowser.download")
+
+# 详情下载模式
+DETAIL_MODE_FORCE = "force"      # 总是重新下载
+DETAIL_MODE_SKIP = "skip"        # album.json和封面都已存在时跳过
+DETAIL_MODE_REFRESH = "refresh"  # 已存在但早于max_age秒时重新下载
+# 跳过下载时download_detail返回的信息
+DETAIL_SKIPPED = "skipped"
+# 批量下载相关作品时使用的模式
+BATCH_DETAIL_MODE = DETAIL_MODE_SKIP
+# refresh模式下默认的过期时间（秒）
+DETAIL_MAX_AGE = 30 * 24 * 3600
+# 与详情并发下载封面的辅助线程数，应不少于详情下载的最大并发
+COVER_WORKERS = 16
+
+_cover_executor = None
+_cover_executor_lock = threading.Lock()
+
+def detail_is_fresh(path, id, mode=DETAIL_MODE_SKIP, max_age=DETAIL_MAX_AGE):
+    """判断本地详情是否可以跳过下载，path为详情目录或DetailStore"""
+    if mode == DETAIL_MODE_FORCE:
+        return False
+    store = as_store(path)
+    album_mtime = store.album_mtime(id)
+    if album_mtime is None or not store.has_cover(id):
+        return False
+    if mode == DETAIL_MODE_REFRESH:
+        return get_time() - album_mtime < max_age
+    return True
+
+def download_detail(client, id, album_id, path, mode=DETAIL_MODE_FORCE, max_age=DETAIL_MAX_AGE,
+                    cover_client=None):
+    """下载漫画详情和封面
+
+    path为详情目录或DetailStore；mode为skip或refresh时，本地已有（且未过期）的详情会被跳过，
+    返回 (True, DETAIL_SKIPPED)。
+    给出cover_client（另一个客户端）时封面在辅助线程中用它与详情同时下载，否则用client依次下载，
+    同一个客户端不会同时被两个线程使用。
+    """
+    try:
+        path = as_store(path)
+        if detail_is_fresh(path, id, mode, max_age):
+            metrics.incr("fetch.skipped")
+            return True, DETAIL_SKIPPED
+        
+        with metrics.timer("fetch.total"):
+            if cover_client is None:
+                download_detail_album(client, id, album_id, path)
+                download_detail_cover(client, id, album_id, path)
+            else:
+                # 详情和封面互不依赖，封面在辅助线程中与详情同时下载
+                cover_future = get_cover_executor().submit(download_detail_cover, cover_client, id, album_id, path)
+                try:
+                    download_detail_album(client, id, album_id, path)
+                finally:
+                    # 详情失败时也等待封面结束，避免遗留写到一半的文件
+                    cover_error = cover_future.exception()
+                if cover_error is not None:
+                    raise cover_error
+        
+        return True, ""
+    except Exception as e:
+        metrics.incr("fetch.failed")
+        return False, str(e)
+
+def download_detail_album(client, id, album_id, path):
+    """下载漫画详情数据"""
+    with metrics.timer("fetch.album"):
+        album: jmcomic.JmAlbumDetail = client.get_album_detail(album_id)
+    write_album_json(id, path, album_to_json(album))
+
+def album_to_json(album):
+    """提取album.json中保存的字段"""
+    return {
+        'id': album.album_id,
+        'title': album.title,
+        'author': album.author,
+        'description': album.description,
+        'tags': album.tags,
+        'comment_count': album.comment_count,
+        'likes': album.likes,
+        'works': album.works,
+        'related_list': album.related_list,
+    }
+
+def write_album_json(id, path, album_json):
+    as_store(path).write_album(id, album_json)
+
+def save_cover(path, id, write):
+    """write(cover_path) 把封面写入给定的文件，保存位置由存储决定"""
+    with as_store(path).cover_target(id) as cover_path:
+        write(cover_path)
+
+def get_cover_executor():
+    global _cover_executor
+    with _cover_executor_lock:
+        if _cover_executor is None:
+            _cover_executor = ThreadPoolExecutor(max_workers=COVER_WORKERS, thread_name_prefix="detail-cover")
+        return _cover_executor
+
+def album_cover_url(album_id):
+    """漫画封面的CDN地址，只需ID即可得到，无需先请求章节信息"""
+    from jmcomic import JmcomicText
+    return JmcomicText.get_album_cover_url(album_id)
+
+def download_detail_cover(client, id, album_id, path):
+    """下载漫画封面
+
+    优先直接下载封面图（一次请求）；客户端不支持或失败时退回读取章节第一页。
+    章节信息不再附带请求本子详情，详情已由download_detail_album单独获取。
+    """
+    def write(cover_path):
+        try:
+            with metrics.timer("fetch.image"):
+                client.download_album_cover(album_id, cover_path)
+        except Exception as e:
+            logger.debug(f"直接下载封面失败，改为读取章节第一页: {id}, {str(e)}")
+            metrics.incr("fetch.cover_fallback")
+            with metrics.timer("fetch.photo_detail"):
+                photo: jmcomic.JmPhotoDetail = client.get_photo_detail(album_id, fetch_album=False)
+            first_image: jmcomic.JmImageDetail = photo[0]
+            with metrics.timer("fetch.image"):
+                client.download_by_image_detail(first_image, cover_path)
+    
+    save_cover(path, id, write)
+    
+    # 下载完成后立即生成缩略图，失败时由浏览器按需重建
+    try:
+        as_store(path).ensure_thumbnail(id)
+    except Exception as e:
+        logger.warning(f"生成缩略图失败: {id}, {str(e)}")
@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import threading
+
+from list_io import LIST_FORMAT_JSON, iter_list, write_list
+
+logger = logging.getLogger("ComicBrowser.list")
+
+# 追加日志累计多少条后压缩为JSON
+COMPACT_EVERY = 50
+
+
+class DownloadListStore:
+    """下载列表（配套下载器读取的 [{"id", "title", "tags"}] JSON数组）
+
+    内存中保存ID集合，判断重复为O(1)；新增项以JSON Lines追加到旁边的日志文件，
+    一次添加多项只写一次。日志累计到一定数量、调用compact()或close()时，
+    整个列表以原子替换的方式写回JSON文件并清空日志。
+    启动时会重放上次未压缩的日志，日志末尾写了一半的行会被忽略。
+    """
+
+    def __init__(self, json_path, compact_every=COMPACT_EVERY):
+        self.json_path = json_path
+        self.log_path = json_path + ".log"
+        self.compact_every = compact_every
+        self.items = []
+        self.ids = set()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, comic_id):
+        return str(comic_id) in self.ids
+
+    def _append_item(self, item):
+        comic_id = str(item.get("id", ""))
+        if not comic_id or comic_id in self.ids:
+            return False
+        self.ids.add(comic_id)
+        self.items.append(item)
+        return True
+
+    def _load(self):
+        if os.path.exists(self.json_path):
+            for item in iter_list(self.json_path, LIST_FORMAT_JSON):
+                self._append_item(item)
+
+        if not os.path.exists(self.log_path):
+            return
+        replayed = 0
+        with open(self.log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    # 上次退出时写了一半的行
+                    logger.warning(f"忽略下载列表日志中损坏的行: {self.log_path}")
+                    continue
+                if self._append_item(item):
+                    replayed += 1
+        if replayed:
+            logger.info(f"从日志恢复 {replayed} 个未保存的列表项: {self.log_path}")
+        self._pending = replayed
+        self.compact()
+
+    def add(self, item):
+        """添加一项，已存在时返回False"""
+        return self.add_many([item]) == 1
+
+    def add_many(self, items):
+        """批量添加，重复的ID被忽略；所有新增项一次写入日志，返回新增数量"""
+        with self._lock:
+            added = [item for item in items if self._append_item(item)]
+            if not added:
+                return 0
+            lines = "".join(json.dumps(item, ensure_ascii=False) + "\n" for item in added)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending += len(added)
+            if self._pending >= self.compact_every:
+                self._compact()
+        return len(added)
+
+    @property
+    def dirty(self):
+        """是否有尚未写回JSON文件的新增项"""
+        return self._pending > 0
+
+    def compact(self):
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        if not self._pending and os.path.exists(self.json_path):
+            return
+        # 与配套下载器约定为JSON格式，无论文件扩展名
+        write_list(self.json_path, self.items, LIST_FORMAT_JSON)
+        # JSON已包含日志中的全部内容；若在删除日志前退出，下次重放时会按ID去重
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self._pending = 0
+        logger.debug(f"下载列表已保存: {self.json_path} ({len(self.items)} 项)")
+
+    def close(self):
+        if self.dirty:
+            self.compact()
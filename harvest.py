@@ -0,0 +1,309 @@
+"""命令行批量下载漫画详情，不依赖tkinter，可在无图形界面的服务器上运行
+
+用法: python -m load_detail fetch --ids-file ids.txt [--workers 8] [--mode skip] [--engine threads]
+      python -m load_detail crawl 123456 [--depth 2] [--max-count 500] [--workers 8]
+      python -m load_detail merge a.json b.txt -o merged.json
+
+stdout每行输出一个JSON对象：每个ID完成时一条 "result"，全部结束后一条 "summary"；
+日志（包括jmcomic自身的日志）输出到stderr和日志文件。
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from time import time as get_time
+
+from client_pool import ClientPool, jm_client_factory
+from config import load_config
+from crawler import RelatedCrawler
+from detail_download import (
+    DETAIL_MAX_AGE, DETAIL_MODE_FORCE, DETAIL_MODE_REFRESH, DETAIL_MODE_SKIP,
+    DETAIL_SKIPPED, detail_is_fresh, download_detail,
+)
+from list_io import iter_list, merge_lists, parse_id_line
+import metrics
+from rate_limit import RateLimitedClient, TokenBucket
+from storage import STORAGE_DIRECTORY, open_store
+
+logger = logging.getLogger("ComicBrowser.cli")
+
+# 单个ID的结果状态
+STATUS_DOWNLOADED = "downloaded"
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+
+
+def read_ids(ids_file=None, ids=()):
+    """从文件（txt每行一个ID，json为下载列表，"-"表示stdin）和参数中读取ID，去重并保持顺序
+
+    忽略空行和#开头的注释，允许带JM前缀
+    """
+    result = []
+    seen = set()
+
+    def add(comic_id):
+        if comic_id and comic_id not in seen:
+            seen.add(comic_id)
+            result.append(comic_id)
+
+    for line in ids:
+        add(parse_id_line(line))
+    if ids_file == "-":
+        for line in sys.stdin:
+            add(parse_id_line(line))
+    elif ids_file:
+        for item in iter_list(ids_file):
+            add(str(item["id"]))
+    return result
+
+
+class JsonLinesReporter:
+    """线程安全地把进度和汇总以JSON行写到stdout
+
+    counted为计入进度done的结果状态，默认全部计入；total是这些状态预计的数量。
+    """
+
+    def __init__(self, total, stream=None, counted=None):
+        self.total = total
+        self.stream = stream or sys.stdout
+        self.counted = counted or (STATUS_DOWNLOADED, STATUS_SKIPPED, STATUS_FAILED)
+        self.counts = {STATUS_DOWNLOADED: 0, STATUS_SKIPPED: 0, STATUS_FAILED: 0}
+        self.failed = []
+        self.start = get_time()
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+    def result(self, comic_id, success, error, **extra):
+        if not success:
+            status = STATUS_FAILED
+        elif error == DETAIL_SKIPPED:
+            status = STATUS_SKIPPED
+        else:
+            status = STATUS_DOWNLOADED
+        with self._lock:
+            self.counts[status] += 1
+            if status == STATUS_FAILED:
+                if comic_id in self.failed:
+                    # 同一ID再次失败（重试）只计一次
+                    self.counts[status] -= 1
+                else:
+                    self.failed.append(comic_id)
+                logger.warning(f"下载详情失败: {comic_id}, {error}")
+            elif comic_id in self.failed:
+                # 失败后重试成功
+                self.failed.remove(comic_id)
+                self.counts[STATUS_FAILED] -= 1
+            record = {"event": "result", "id": comic_id, "status": status,
+                      "done": sum(self.counts[counted] for counted in self.counted), "total": self.total, **extra}
+            if status == STATUS_FAILED:
+                record["error"] = error
+            self.emit(record)
+
+    def summary(self):
+        with self._lock:
+            record = {"event": "summary", "total": self.total, **self.counts,
+                      "elapsed_s": round(get_time() - self.start, 2), "failed_ids": self.failed}
+            self.emit(record)
+            return record
+
+
+def thread_fetcher(path, workers, mode, max_age, bucket):
+    """返回 fetch(comic_id) -> (success, error)，多个线程共享一个客户端池，与界面中的批量下载相同"""
+    create = jm_client_factory()
+    # 每个下载最多同时使用两个客户端（详情和封面）
+    pool = ClientPool(lambda: RateLimitedClient(create(), bucket), size=workers * 2)
+
+    def fetch(comic_id):
+        try:
+            # 无需下载时不借用客户端
+            if detail_is_fresh(path, comic_id, mode, max_age):
+                return True, DETAIL_SKIPPED
+            # 池中还有空闲客户端时借来并发下载封面，不等待
+            with pool.client() as client, pool.client(block=False) as cover_client:
+                success, error = download_detail(client, comic_id, comic_id, path, DETAIL_MODE_FORCE,
+                                                 cover_client=cover_client)
+                if not success:
+                    raise RuntimeError(error)
+            return True, ""
+        except Exception as e:
+            return False, str(e)
+
+    return fetch
+
+
+def fetch_with_threads(ids, path, workers, mode, max_age, bucket, reporter):
+    fetch = thread_fetcher(path, workers, mode, max_age, bucket)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(fetch, comic_id): comic_id for comic_id in ids}
+        for future in as_completed(futures):
+            reporter.result(futures[future], *future.result())
+
+
+def fetch_with_asyncio(ids, path, workers, mode, max_age, bucket, reporter):
+    """单事件循环的异步引擎，适合大批量"""
+    from async_fetch import AsyncDetailEngine
+
+    engine = AsyncDetailEngine(path, album_concurrency=workers, cover_concurrency=workers,
+                               mode=mode, max_age=max_age, bucket=bucket)
+    try:
+        futures = [engine.submit(comic_id, on_done=lambda comic_id, _title, success, error:
+                                 reporter.result(comic_id, success, error))
+                   for comic_id in ids]
+        for future in futures:
+            future.result()
+    finally:
+        engine.close()
+
+
+def _redirect_jm_log():
+    """jmcomic的日志默认写到stdout，改到stderr以免混入JSON行"""
+    import jmcomic  # noqa: F401  导入时才会创建jmcomic的日志处理器
+    for handler in logging.getLogger("jmcomic").handlers:
+        if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+            handler.setStream(sys.stderr)
+
+
+def open_args_store(args, conf):
+    """按配置打开存储；--details-dir指定时改为使用该目录，封面转码等其余配置不变"""
+    storage_conf = conf["storage"]
+    if args.details_dir:
+        storage_conf = dict(storage_conf, backend=STORAGE_DIRECTORY, details_dir=args.details_dir)
+    store = open_store(storage_conf)
+    if store.kind == STORAGE_DIRECTORY:
+        os.makedirs(store.location, exist_ok=True)
+    return store
+
+
+def cmd_fetch(args):
+    ids = read_ids(args.ids_file, args.ids)
+    if not ids:
+        logger.error("没有需要下载的ID")
+        return 2
+
+    config = load_config()
+    conf = config["download"]
+    workers = args.workers or conf["max_workers"]
+    rate = conf["rate_limit"] if args.rate is None else args.rate
+    bucket = TokenBucket(rate, conf["burst"])
+    store = open_args_store(args, config)
+    _redirect_jm_log()
+
+    logger.info(f"开始批量下载详情: {len(ids)} 个ID, 引擎: {args.engine}, 并发: {workers}, 模式: {args.mode}")
+    reporter = JsonLinesReporter(len(ids))
+    fetch = fetch_with_asyncio if args.engine == "asyncio" else fetch_with_threads
+    try:
+        fetch(ids, store, workers, args.mode, args.max_age * 24 * 3600, bucket, reporter)
+    except KeyboardInterrupt:
+        logger.warning("用户中断，已完成的结果已写入")
+    finally:
+        store.close()
+    summary = reporter.summary()
+    logger.info(f"批量下载结束: 下载 {summary[STATUS_DOWNLOADED]}, 跳过 {summary[STATUS_SKIPPED]}, "
+                f"失败 {summary[STATUS_FAILED]}")
+    return 1 if summary[STATUS_FAILED] else 0
+
+
+def cmd_crawl(args):
+    seeds = read_ids(args.ids_file, args.ids)
+    conf = load_config()
+    crawl_conf = conf["crawl"]
+    workers = args.workers or conf["download"]["max_workers"]
+    rate = conf["download"]["rate_limit"] if args.rate is None else args.rate
+    bucket = TokenBucket(rate, conf["download"]["burst"])
+    max_count = crawl_conf["max_count"] if args.max_count is None else args.max_count
+    store = open_args_store(args, conf)
+    _redirect_jm_log()
+
+    crawler = RelatedCrawler.from_config(crawl_conf, args.db, store)
+    if args.depth is not None:
+        crawler.max_depth = args.depth
+    added = crawler.add_seeds(seeds)
+    logger.info(f"开始抓取相关作品: 新种子 {added} 个, 最大深度 {crawler.max_depth}, "
+                f"最多下载 {max_count} 本, 并发: {workers}")
+
+    # 已在本地的详情会被跳过（不消耗预算），所以抓取详情时总是使用skip模式
+    fetch = thread_fetcher(store, workers, DETAIL_MODE_SKIP, DETAIL_MAX_AGE, bucket)
+    # 只有成功下载的计入max_count，进度也只按成功下载计算；失败的ID可能重试后再次报告
+    reporter = JsonLinesReporter(max_count, counted=(STATUS_DOWNLOADED,))
+    try:
+        crawler.run(fetch, workers, max_count,
+                    on_result=lambda comic_id, depth, success, error:
+                    reporter.result(comic_id, success, error, depth=depth))
+    except KeyboardInterrupt:
+        logger.warning("用户中断，下次运行将从中断处继续")
+    finally:
+        frontier = crawler.counts()
+        crawler.close()
+        store.close()
+    summary = reporter.summary()
+    reporter.emit({"event": "frontier", **frontier})
+    return 1 if summary[STATUS_FAILED] else 0
+
+
+def cmd_merge(args):
+    missing = [path for path in args.lists if not os.path.exists(path)]
+    if missing:
+        logger.error(f"列表文件不存在: {', '.join(missing)}")
+        return 2
+    read, written = merge_lists(args.lists, args.output, args.format)
+    JsonLinesReporter(written).emit({"event": "merge", "inputs": len(args.lists), "read": read,
+                                     "written": written, "output": args.output})
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m load_detail",
+                                     description="JMComic 漫画详情浏览器；不带参数时启动图形界面")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fetch = commands.add_parser("fetch", help="批量下载漫画详情到details目录")
+    fetch.add_argument("ids", nargs="*", help="漫画ID")
+    fetch.add_argument("--ids-file", help="每行一个ID的文本文件，- 表示从stdin读取")
+    fetch.add_argument("--workers", type=int, default=None, help="并发数，默认取配置中的max_workers")
+    fetch.add_argument("--mode", choices=(DETAIL_MODE_SKIP, DETAIL_MODE_REFRESH, DETAIL_MODE_FORCE),
+                       default=DETAIL_MODE_SKIP, help="已存在的详情如何处理")
+    fetch.add_argument("--max-age", type=float, default=DETAIL_MAX_AGE / 24 / 3600,
+                       help="refresh模式下的过期天数")
+    fetch.add_argument("--engine", choices=("threads", "asyncio"), default=None,
+                       help="下载引擎，默认取配置中的engine")
+    fetch.add_argument("--rate", type=float, default=None, help="每秒请求数上限，0为不限速")
+    fetch.add_argument("--details-dir", default=None, help="详情目录，默认按配置中的storage")
+    fetch.set_defaults(func=cmd_fetch)
+
+    crawl = commands.add_parser("crawl", help="从种子出发按相关作品逐层抓取详情，可中断后继续")
+    crawl.add_argument("ids", nargs="*", help="种子漫画ID；继续上次的抓取时可省略")
+    crawl.add_argument("--ids-file", help="每行一个种子ID的文本文件，- 表示从stdin读取")
+    crawl.add_argument("--depth", type=int, default=None, help="最多展开几层，默认取配置中的max_depth")
+    crawl.add_argument("--max-count", type=int, default=None,
+                       help="本次最多下载多少本，默认取配置中的max_count")
+    crawl.add_argument("--workers", type=int, default=None, help="并发数，默认取配置中的max_workers")
+    crawl.add_argument("--rate", type=float, default=None, help="每秒请求数上限，0为不限速")
+    crawl.add_argument("--db", default="crawl.db", help="保存抓取边界和已访问集合的数据库")
+    crawl.add_argument("--details-dir", default=None, help="详情目录，默认按配置中的storage")
+    crawl.set_defaults(func=cmd_crawl)
+
+    merge = commands.add_parser("merge", help="按ID合并多个下载列表并去重")
+    merge.add_argument("lists", nargs="+", help="txt或json格式的列表文件")
+    merge.add_argument("-o", "--output", required=True, help="输出文件，扩展名为.txt时输出txt格式")
+    merge.add_argument("--format", choices=("json", "txt"), default=None, help="输出格式，默认按扩展名判断")
+    merge.set_defaults(func=cmd_merge)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    config = load_config()
+    if getattr(args, "engine", "") is None:
+        args.engine = config["download"]["engine"]
+    writer = metrics.configure(config["metrics"])
+    try:
+        return args.func(args)
+    finally:
+        if writer is not None:
+            writer.stop()
@@ -0,0 +1,76 @@
+"""整本漫画下载的图片后处理进程池
+
+jmcomic默认在下载线程中解码、还原被切割打乱的图片并重新编码（如webp转png），这些CPU密集的
+工作与网络线程争用GIL。启用后下载线程只取回原始数据，解码、还原和编码在进程池中完成。
+进程池大小默认为CPU核数，在第一次使用时创建，所有下载共享。
+"""
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+logger = logging.getLogger("ComicBrowser.pipeline")
+
+
+def unscramble(img, num):
+    """还原按高度切成num段并倒序排列的图片，与jmcomic的JmImageTool.decode_and_save一致"""
+    if num == 0:
+        return img
+    width, height = img.size
+    decoded = Image.new("RGB", (width, height))
+    over = height % num
+    move = height // num
+    for i in range(num):
+        y_src = height - move * (i + 1) - over
+        y_dst = move * i
+        size = move
+        if i == 0:
+            size += over
+        else:
+            y_dst += over
+        decoded.paste(img.crop((0, y_src, width, y_src + size)), (0, y_dst, width, y_dst + size))
+    return decoded
+
+
+def process_image(data, num, path):
+    """进程池中执行：解码原始图片数据，还原后按path的扩展名编码保存，返回文件大小"""
+    base, ext = os.path.splitext(path)
+    # 先写临时文件再替换，避免中途失败留下的残缺文件被当作已下载
+    tmp_path = base + ".part" + ext
+    with Image.open(io.BytesIO(data)) as img:
+        unscramble(img, num).save(tmp_path)
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+class ImagePipeline:
+    """下载线程提交原始图片数据，进程池中解码、还原和编码，返回Future"""
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, conf):
+        """conf为配置中的download部分，未启用image_pipeline时返回None"""
+        if not conf.get("image_pipeline"):
+            return None
+        return cls(conf.get("image_processes") or None)
+
+    def submit(self, data, num, path):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                logger.info(f"图片处理进程池已启动: {self.workers} 个进程")
+            executor = self._executor
+        return executor.submit(process_image, data, num, path)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,183 @@
+import logging
+import random
+import sqlite3
+import threading
+from time import time as get_time
+
+import metrics
+from rate_limit import http_status
+
+logger = logging.getLogger("ComicBrowser.jobs")
+
+# 任务状态
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# 重试也不会成功的HTTP状态码
+PERMANENT_STATUS = (404, 410)
+# 重试也不会成功的异常类型（按类名比较，不必导入jmcomic）
+PERMANENT_EXCEPTIONS = ("MissingAlbumPhotoException",)
+# 没有状态码时，jmcomic等对资源不存在的说法（如"请求的本子不存在！"）；不含数字，不会与URL中的漫画ID混淆
+PERMANENT_ERROR_PHRASES = ("不存在！", "不存在!", "Not Found", "not found", "无法找到")
+
+
+def is_transient_error(error):
+    """判断是否为可重试的临时错误（网络、限流等）；error为异常或错误信息
+
+    优先按异常类型和HTTP状态码判断，取不到状态码时才查找表示资源不存在的说法。
+    """
+    if isinstance(error, BaseException) and any(cls.__name__ in PERMANENT_EXCEPTIONS for cls in type(error).__mro__):
+        return False
+    status = http_status(error)
+    if status is not None:
+        return status not in PERMANENT_STATUS
+    error = str(error)
+    return not any(phrase in error for phrase in PERMANENT_ERROR_PHRASES)
+
+
+class DownloadJobQueue:
+    """持久化的下载任务队列（SQLite），应用退出后未完成的任务可在下次启动时继续
+
+    临时错误按指数退避加随机抖动自动重试，超过最大次数或遇到永久错误后标记为失败。
+    同一ID已在队列中（等待或进行中）时重复提交不会产生新任务。
+    """
+
+    def __init__(self, db_path="download_jobs.db", max_attempts=5, base_delay=2.0, max_delay=300.0):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, "
+            "title TEXT, "
+            "state TEXT NOT NULL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "next_run REAL NOT NULL DEFAULT 0, "
+            "error TEXT, "
+            "updated REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, next_run)")
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def recover(self):
+        """启动时调用：上次退出时仍在进行的任务重新置为等待，返回未完成任务数"""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET state = ?, next_run = 0 WHERE state = ?",
+                               (JOB_PENDING, JOB_RUNNING))
+            self._conn.commit()
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE state = ?",
+                                          (JOB_PENDING,)).fetchone()
+        if count:
+            logger.info(f"恢复 {count} 个未完成的下载任务")
+        return count
+
+    def submit(self, tasks):
+        """提交任务 [{"id", "title"}]，返回新加入队列的数量
+
+        已在等待或进行中的ID保持不变；已完成或失败的ID重新置为等待。
+        """
+        now = get_time()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT INTO jobs (id, title, state, attempts, next_run, updated) "
+                "VALUES (?, ?, ?, 0, 0, ?) "
+                "ON CONFLICT(id) DO UPDATE SET state = excluded.state, attempts = 0, "
+                "next_run = 0, error = NULL, updated = excluded.updated "
+                "WHERE jobs.state IN (?, ?)",
+                [(task["id"], task.get("title", ""), JOB_PENDING, now, JOB_DONE, JOB_FAILED)
+                 for task in tasks]
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def claim(self, limit=1):
+        """领取最多limit个已到执行时间的任务并标记为进行中，返回 [(id, title)]"""
+        if limit <= 0:
+            return []
+        now = get_time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, title FROM jobs WHERE state = ? AND next_run <= ? "
+                "ORDER BY next_run, rowid LIMIT ?",
+                (JOB_PENDING, now, limit)
+            ).fetchall()
+            if rows:
+                self._conn.executemany("UPDATE jobs SET state = ?, updated = ? WHERE id = ?",
+                                       [(JOB_RUNNING, now, job_id) for job_id, _ in rows])
+                self._conn.commit()
+        return rows
+
+    def complete(self, job_id):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET state = ?, error = NULL, updated = ? WHERE id = ?",
+                               (JOB_DONE, get_time(), job_id))
+            self._conn.commit()
+        metrics.incr("jobs.done")
+
+    def fail(self, job_id, error):
+        """记录一次失败；可重试时安排下次执行并返回True，否则标记为失败并返回False"""
+        now = get_time()
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            retry = is_transient_error(error) and attempts < self.max_attempts
+            if retry:
+                delay = self.backoff(attempts)
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, attempts = ?, next_run = ?, error = ?, updated = ? "
+                    "WHERE id = ?",
+                    (JOB_PENDING, attempts, now + delay, str(error), now, job_id))
+                logger.info(f"任务 {job_id} 第 {attempts} 次失败，{delay:.1f} 秒后重试: {error}")
+                metrics.incr("jobs.retried")
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, attempts = ?, error = ?, updated = ? WHERE id = ?",
+                    (JOB_FAILED, attempts, str(error), now, job_id))
+                logger.warning(f"任务 {job_id} 失败: {error}")
+                metrics.incr("jobs.failed")
+            self._conn.commit()
+        return retry
+
+    def backoff(self, attempts):
+        """第attempts次失败后的等待时间：指数退避并乘以0.5~1.5的随机抖动"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.5)
+
+    def next_wakeup(self):
+        """距离下一个等待任务可执行还有多少秒；没有等待任务时返回None"""
+        with self._lock:
+            (next_run,) = self._conn.execute("SELECT MIN(next_run) FROM jobs WHERE state = ?",
+                                             (JOB_PENDING,)).fetchone()
+        if next_run is None:
+            return None
+        return max(0.0, next_run - get_time())
+
+    def counts(self):
+        """各状态的任务数量"""
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        counts = {JOB_PENDING: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        counts.update(rows)
+        return counts
+
+    def failed_jobs(self):
+        """返回 [(id, title, error)]"""
+        with self._lock:
+            return self._conn.execute("SELECT id, title, error FROM jobs WHERE state = ?",
+                                      (JOB_FAILED,)).fetchall()
+
+    def purge(self, states=(JOB_DONE, JOB_FAILED)):
+        """删除已结束的任务记录"""
+        with self._lock:
+            self._conn.executemany("DELETE FROM jobs WHERE state = ?", [(s,) for s in states])
+            self._conn.commit()
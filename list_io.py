@@ -0,0 +1,183 @@
+"""下载列表的流式读写
+
+列表有两种格式：
+- json: 配套下载器使用的 [{"id", "title", "tags"}, ...] 数组（indent=4）
+- txt: 每行一个ID，忽略空行和#之后的注释，允许带JM前缀
+
+读取时逐块解析、逐项产出，写入时逐项输出到临时文件再替换目标文件，
+数十万项的列表也不需要把整个文件或整个列表同时放在内存中。
+"""
+import json
+import logging
+import os
+import re
+
+logger = logging.getLogger("ComicBrowser.list")
+
+LIST_FORMAT_JSON = "json"
+LIST_FORMAT_TXT = "txt"
+# 每次从文件读取的字符数
+READ_CHUNK = 1 << 16
+
+_decoder = json.JSONDecoder()
+# 数组各项之间的空白和逗号
+_SEPARATOR = re.compile(r"[ \t\r\n,]*")
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+
+def list_format(path):
+    """按扩展名判断列表格式，.txt以外的都按json处理"""
+    return LIST_FORMAT_TXT if os.path.splitext(path)[1].lower() == ".txt" else LIST_FORMAT_JSON
+
+
+def parse_id_line(line):
+    """解析txt列表中的一行，返回ID，空行或注释返回空字符串"""
+    comic_id = line.split("#", 1)[0].strip()
+    if comic_id[:2].upper() == "JM":
+        comic_id = comic_id[2:]
+    return comic_id
+
+
+def iter_json_array(f, chunk_size=READ_CHUNK):
+    """从文本文件对象中逐项解析顶层JSON数组"""
+    buf = f.read(chunk_size)
+    pos = 0
+    eof = not buf
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip():
+        nonlocal pos
+        while True:
+            pos = _SEPARATOR.match(buf, pos).end()
+            if pos < len(buf) or not fill():
+                return
+
+    skip()
+    if pos >= len(buf) or buf[pos] != "[":
+        raise ValueError("列表文件不是JSON数组")
+    pos += 1
+    while True:
+        skip()
+        if pos >= len(buf):
+            raise ValueError("JSON数组不完整")
+        if buf[pos] == "]":
+            return
+        while True:
+            try:
+                item, end = _decoder.raw_decode(buf, pos)
+            except ValueError:
+                # 当前项跨越了块边界，读入下一块后重试
+                if eof or not fill():
+                    raise
+                continue
+            # 数字等标量在块边界被截断时可能解析出较短的前缀（如"15"、"1500."中的1500）：
+            # 其后在本块内不是逗号或"]"时读入下一块重试
+            after = _WHITESPACE.match(buf, end).end()
+            if (after == len(buf) or buf[after] not in ",]") and not eof and fill():
+                continue
+            break
+        pos = end
+        yield item
+
+
+def iter_list(path, fmt=None):
+    """逐项读取列表文件，产出 {"id", ...} 字典；txt格式只有id，fmt默认按扩展名判断"""
+    if (fmt or list_format(path)) == LIST_FORMAT_TXT:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                comic_id = parse_id_line(line)
+                if comic_id:
+                    yield {"id": comic_id}
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for item in iter_json_array(f):
+            if isinstance(item, dict) and item.get("id") not in (None, ""):
+                yield item
+            else:
+                logger.warning(f"忽略列表中无效的项: {path}, {item!r}")
+
+
+class ListWriter:
+    """逐项写入列表文件，输出与 json.dump(items, indent=4) 相同
+
+    写到临时文件，close()时落盘并替换目标文件；出错时丢弃临时文件，原文件不变。
+    """
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.format = fmt or list_format(path)
+        self.count = 0
+        self._tmp_path = path + ".tmp"
+        self._f = open(self._tmp_path, "w", encoding="utf-8")
+
+    def write(self, item):
+        if self.format == LIST_FORMAT_TXT:
+            self._f.write(f"{item['id']}\n")
+        else:
+            text = json.dumps(item, ensure_ascii=False, indent=4).replace("\n", "\n    ")
+            self._f.write(("[\n    " if self.count == 0 else ",\n    ") + text)
+        self.count += 1
+
+    def write_many(self, items):
+        for item in items:
+            self.write(item)
+
+    def close(self):
+        if self.format == LIST_FORMAT_JSON:
+            self._f.write("\n]" if self.count else "[]")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._f.close()
+        os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_list(path, items, fmt=None):
+    """把可迭代的列表项写入文件，返回写入数量"""
+    with ListWriter(path, fmt) as writer:
+        writer.write_many(items)
+    return writer.count
+
+
+def merge_lists(paths, out_path, fmt=None, on_progress=None):
+    """按ID合并多个列表并去重，保留每个ID第一次出现的项和原有顺序
+
+    一次遍历所有输入，只在内存中保存已出现的ID集合。返回 (读取数量, 写入数量)。
+    输出文件也可以是输入之一，写入完成后才会替换。
+    on_progress(read, written) 每读取一定数量后调用。
+    """
+    seen = set()
+    read = 0
+    with ListWriter(out_path, fmt) as writer:
+        for path in paths:
+            for item in iter_list(path):
+                read += 1
+                comic_id = str(item["id"])
+                if comic_id not in seen:
+                    seen.add(comic_id)
+                    writer.write(item)
+                if on_progress is not None and read % 10000 == 0:
+                    on_progress(read, writer.count)
+    logger.info(f"合并列表完成: {len(paths)} 个文件, 读取 {read} 项, 写入 {writer.count} 项 -> {out_path}")
+    return read, writer.count
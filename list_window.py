@@ -0,0 +1,170 @@
+import logging
+import os
+import queue
+import threading
+import tkinter as tk
+from tkinter import filedialog, messagebox, ttk
+
+from list_io import iter_list, write_list
+from virtual_list import VirtualList
+
+logger = logging.getLogger("ComicBrowser.list")
+
+# 后台线程每读取多少项交给界面一次
+IMPORT_BATCH = 2000
+# 界面取导入结果的间隔（毫秒）
+IMPORT_POLL_MS = 100
+LIST_FILETYPES = [("JSON文件", "*.json"), ("文本文件", "*.txt"), ("所有文件", "*.*")]
+
+
+class ListImportWindow:
+    """在单独窗口中逐步导入并显示txt/json下载列表
+
+    文件在后台线程中流式读取并按ID去重，每批结果放入队列，由主线程定时取出并追加到虚拟列表，
+    导入过程中窗口可以正常滚动和操作。导入的列表可以另存为txt/json，或一次添加到当前下载列表。
+    """
+
+    def __init__(self, master, path, on_add=None):
+        self.path = path
+        self.on_add = on_add
+        self.items = {}
+        self.failed = None
+        self._results = queue.Queue()
+        self._stop = threading.Event()
+        self._done = False
+
+        self.window = tk.Toplevel(master)
+        self.window.title(f"导入列表 - {os.path.basename(path)}")
+        self.window.geometry("720x560")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        toolbar = ttk.Frame(self.window)
+        toolbar.pack(fill=tk.X, padx=10, pady=(10, 5))
+        self.status_var = tk.StringVar(value="正在导入...")
+        ttk.Label(toolbar, textvariable=self.status_var).pack(side=tk.LEFT)
+        ttk.Button(toolbar, text="添加到下载列表", command=self.add_all).pack(side=tk.RIGHT)
+        ttk.Button(toolbar, text="导出列表", command=self.export).pack(side=tk.RIGHT, padx=5)
+        self.stop_button = ttk.Button(toolbar, text="停止", command=self._stop.set)
+        self.stop_button.pack(side=tk.RIGHT)
+
+        self.progress = ttk.Progressbar(self.window, mode="indeterminate")
+        self.progress.pack(fill=tk.X, padx=10)
+        self.progress.start(50)
+
+        container = ttk.Frame(self.window)
+        container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        scrollbar = ttk.Scrollbar(container)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree = ttk.Treeview(container, columns=("id", "title", "tags"), show="headings", selectmode="browse")
+        tree.heading("id", text="ID")
+        tree.heading("title", text="标题")
+        tree.heading("tags", text="标签")
+        tree.column("id", width=80, anchor=tk.CENTER)
+        tree.column("title", width=360, anchor=tk.W)
+        tree.column("tags", width=220, anchor=tk.W)
+        tree.pack(fill=tk.BOTH, expand=True)
+        self.view = VirtualList(tree, scrollbar, self._row_values)
+
+        threading.Thread(target=self._read, daemon=True).start()
+        self.window.after(IMPORT_POLL_MS, self._poll)
+
+    def _row_values(self, comic_id):
+        item = self.items[comic_id]
+        tags = item.get("tags") or ""
+        if isinstance(tags, list):
+            tags = ", ".join(str(tag) for tag in tags)
+        return (comic_id, item.get("title", ""), tags)
+
+    def _read(self):
+        """后台线程：逐批读取列表，按ID去重后放入队列"""
+        seen = set()
+        batch = []
+        try:
+            for item in iter_list(self.path):
+                if self._stop.is_set():
+                    break
+                comic_id = str(item["id"])
+                if comic_id in seen:
+                    continue
+                seen.add(comic_id)
+                batch.append((comic_id, item))
+                if len(batch) >= IMPORT_BATCH:
+                    self._results.put(batch)
+                    batch = []
+            self._results.put(batch)
+            self._results.put(None)
+        except Exception as e:
+            logger.error(f"导入列表失败: {self.path}, {str(e)}")
+            self._results.put(batch)
+            self._results.put(e)
+
+    def _poll(self):
+        if self._done:
+            return
+        try:
+            while True:
+                result = self._results.get_nowait()
+                if result is None or isinstance(result, Exception):
+                    self._finish(result)
+                    return
+                self.items.update(result)
+                self.view.append_rows([comic_id for comic_id, _ in result])
+        except queue.Empty:
+            pass
+        self.status_var.set(f"正在导入... {len(self.items)} 项")
+        self.window.after(IMPORT_POLL_MS, self._poll)
+
+    def _finish(self, error):
+        self._done = True
+        self.failed = error
+        self.progress.stop()
+        self.progress.pack_forget()
+        self.stop_button.config(state=tk.DISABLED)
+        if error is not None:
+            self.status_var.set(f"导入中断: 已导入 {len(self.items)} 项")
+            messagebox.showerror("导入失败", f"读取列表时出错:\n{str(error)}", parent=self.window)
+        elif self._stop.is_set():
+            self.status_var.set(f"已停止: 已导入 {len(self.items)} 项")
+        else:
+            self.status_var.set(f"导入完成: {len(self.items)} 项")
+        logger.info(f"导入列表 {self.path}: {len(self.items)} 项")
+
+    def export(self):
+        """把已导入的列表另存为txt或json，写入在后台线程中进行"""
+        file_path = filedialog.asksaveasfilename(
+            parent=self.window, title="导出列表", defaultextension=".json", filetypes=LIST_FILETYPES)
+        if not file_path:
+            return
+        # 复制当前顺序，导入仍在进行时也只导出已显示的部分
+        items = [self.items[comic_id] for comic_id in list(self.view.ids)]
+
+        def run():
+            try:
+                count = write_list(file_path, items)
+                self.window.after(0, self.status_var.set, f"已导出 {count} 项到 {file_path}")
+                logger.info(f"导出列表: {count} 项 -> {file_path}")
+            except Exception as e:
+                error_msg = str(e)
+                logger.error(f"导出列表失败: {file_path}, {error_msg}")
+                self.window.after(0, lambda: messagebox.showerror(
+                    "导出失败", f"导出列表时出错:\n{error_msg}", parent=self.window))
+
+        self.status_var.set("正在导出...")
+        threading.Thread(target=run, daemon=True).start()
+
+    def add_all(self):
+        if self.on_add is None or not self.items:
+            return
+        items = [self.items[comic_id] for comic_id in self.view.ids]
+        try:
+            added = self.on_add(items)
+        except Exception as e:
+            self.status_var.set(f"添加失败: {str(e)}")
+            messagebox.showerror("添加失败", f"添加到下载列表时出错:\n{str(e)}", parent=self.window)
+            return
+        self.status_var.set(f"已添加到下载列表: 新增 {added} 项, 跳过已存在的 {len(items) - added} 项")
+
+    def close(self):
+        self._stop.set()
+        self._done = True
+        self.window.destroy()
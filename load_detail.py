@@ -1,87 +1,60 @@
-import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, scrolledtext
-from PIL import Image, ImageTk
 import json
 import os
-import glob
 import logging
 import sys
 import traceback
-import jmcomic
+import atexit
 import threading
+import queue
+import multiprocessing
+import metrics
 
 from time import time as get_time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from catalog import CatalogIndex
+from search_index import SearchIndex
+from client_pool import ClientPool, jm_client_factory
+from job_queue import JOB_PENDING, JOB_RUNNING, DownloadJobQueue
+from rate_limit import AdaptiveLimiter, RateLimitedClient
+from config import load_config
+from log_setup import setup_logging
+from storage import STORAGE_DIRECTORY, open_store
+from download_list import DownloadListStore
+from list_io import merge_lists
+from album_download import ALBUM_DONE, ALBUM_FAILED, AlbumDownloadManager
+from image_pipeline import ImagePipeline
+from progress_channel import ProgressChannel
+from stats_refresh import refresh_album, select_for_refresh
+from detail_download import (
+    DETAIL_MODE_FORCE, DETAIL_SKIPPED, BATCH_DETAIL_MODE,
+    detail_is_fresh, download_detail,
+)
 
-def download_detail(client, id, album_id, path):
-    """下载漫画详情和封面"""
-    try:
-        # 创建目录
-        os.makedirs(f"{path}{id}", exist_ok=True)
-        
-        # 下载详情
-        download_detail_album(client, id, album_id, path)
-        
-        # 下载封面
-        download_detail_cover(client, id, album_id, path)
-        
-        return True, ""
-    except Exception as e:
-        return False, str(e)
-
-def download_detail_album(client, id, album_id, path):
-    """下载漫画详情数据"""
-    album: jmcomic.JmAlbumDetail = client.get_album_detail(album_id)
-    album_json = {
-        'id': album.album_id,
-        'title': album.title,
-        'author': album.author,
-        'description': album.description,
-        'tags': album.tags,
-        'comment_count': album.comment_count,
-        'likes': album.likes,
-        'works': album.works,
-        'related_list': album.related_list,
-    }
-    with open(f'{path}{id}\\album.json', 'w', encoding='utf-8') as f:
-        json.dump(album_json, f, ensure_ascii=False, indent=4)
+# 搜索输入防抖间隔（毫秒）
+FILTER_DEBOUNCE_MS = 250
+# 后台加载漫画数据时每批读取的数量和界面取结果的间隔（毫秒）
+CATALOG_CHUNK = 2000
+CATALOG_POLL_MS = 50
+# 最后一次添加后多久把下载列表日志压缩为JSON（毫秒）
+LIST_COMPACT_DELAY_MS = 2000
 
-def download_detail_cover(client, id, album_id, path):
-    """下载漫画封面"""
-    photo: jmcomic.JmPhotoDetail = client.get_photo_detail(album_id)
-    first_image: jmcomic.JmImageDetail = photo[0]
-    client.download_by_image_detail(first_image, f'{path}{id}\\cover.png')
+# 图形界面相关模块在启动界面时才导入，命令行模式不需要tkinter和显示环境
+tk = ttk = messagebox = filedialog = scrolledtext = None
+VirtualList = CoverLoader = ListImportWindow = StatsWindow = AlbumDownloadWindow = None
 
-# 配置日志系统
-def setup_logger():
-    # 创建日志目录
-    log_dir = "logs"
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    
-    # 配置日志
-    logger = logging.getLogger("ComicBrowser")
-    logger.setLevel(logging.DEBUG)
-    
-    # 文件日志处理器
-    file_handler = logging.FileHandler(os.path.join(log_dir, "comic_browser.log"), encoding='utf-8')
-    file_handler.setLevel(logging.DEBUG)
-    file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    file_handler.setFormatter(file_formatter)
-    
-    # 控制台日志处理器
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_formatter = logging.Formatter('%(levelname)s: %(message)s')
-    console_handler.setFormatter(console_formatter)
-    
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
+def import_gui():
+    global tk, ttk, messagebox, filedialog, scrolledtext, VirtualList, CoverLoader, ListImportWindow, StatsWindow
+    global AlbumDownloadWindow
+    import tkinter as tk
+    from tkinter import ttk, messagebox, filedialog, scrolledtext
+    from virtual_list import VirtualList
+    from cover_loader import CoverLoader
+    from list_window import ListImportWindow
+    from stats_window import StatsWindow
+    from album_window import AlbumDownloadWindow
 
-# 创建日志记录器
-logger = setup_logger()
+# 日志处理器在main()中配置，导入本模块不会创建日志文件
+logger = logging.getLogger("ComicBrowser")
 
 class ComicBrowser:
     def __init__(self, root):
@@ -91,6 +64,13 @@ class ComicBrowser:
         self.root.configure(bg="#ffffff")
         self.start_time=int(get_time())
         self.json_path=str(self.start_time)+'.json'
+        # 下载列表在第一次添加时才创建文件
+        self.download_list = None
+        self._list_compact_after_id = None
+        # 正在合并写入的下载列表文件（绝对路径），合并完成前不能修改该列表
+        self._list_merge_target = None
+        self.config = load_config()
+        self.metrics_writer = metrics.configure(self.config["metrics"])
         # 设置应用图标
         try:
             icon_path = os.path.join(os.path.dirname(__file__), "comic_icon.ico")
@@ -127,16 +107,70 @@ class ComicBrowser:
         self.status_bar = ttk.Label(root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
         self.status_var.set("就绪")
+        self.load_progress = ttk.Progressbar(self.status_bar, length=200, mode="determinate")
         
         # 加载漫画数据
         self.comics = []
         self.current_comic = None
+        self.catalog = None
+        self.comic_by_id = {}
+        self.search_index = None
+        self._loading = False
+        self._load_generation = 0
+        self._load_total = 0
+        self._load_callbacks = []
+        # 加载过程中下载完成的漫画，加载结束后再插入列表
+        self._pending_comics = []
+        self._filter_after_id = None
+        self.store = open_store(self.config["storage"])
+        self.cover_loader = CoverLoader(self.root, self.store)
+        self.client_pool = None
+        self._client_pool_lock = threading.Lock()
+        
+        # 所有下载路径共享的自适应并发与速率限制
+        self.limiter = AdaptiveLimiter.from_config(self.config["download"])
+        self.max_workers = self.config["download"]["max_workers"]
+        self.async_engine = None
+        # 整本漫画的下载队列，第一次下载漫画时创建
+        self.album_manager = None
+        self.album_window = None
+        
+        # 持久化的批量下载队列
+        self.job_queue = DownloadJobQueue()
+        self._job_lock = threading.Lock()
+        self._job_event = threading.Event()
+        self._job_thread = None
+        self._job_stats = {"done": 0, "skipped": 0}
+        
+        # 统计刷新（重新获取点赞、评论数等）的后台线程和定时器
+        self._stats_thread = None
+        self._stats_after_id = None
+        
+        # 后台线程的下载结果和状态只通过该通道交给界面，每个周期合并处理一次
+        self.progress = ProgressChannel(self.root)
+        self.progress.subscribe("status", lambda messages: self.status_var.set(messages[-1]))
+        self.progress.subscribe("job", self._apply_job_results)
+        self.progress.subscribe("batch_done", lambda payloads: self._finish_job_batch())
+        self.progress.subscribe("album", self._apply_album_updates)
+        self.progress.subscribe("stats", self._apply_stats_refresh)
+        self.progress.start()
+        
+        # 统计面板和快照中显示的队列深度与并发
+        metrics.set_gauge("jobs.pending", lambda: self.job_queue.counts()[JOB_PENDING])
+        metrics.set_gauge("jobs.running", lambda: self.job_queue.counts()[JOB_RUNNING])
+        metrics.set_gauge("download.concurrency_limit", lambda: self.limiter.limit)
+        metrics.set_gauge("download.in_flight", lambda: self.limiter.in_flight)
+        # 窗口先显示，漫画数据在后台加载，第一批读取后自动选中第一项
         self.load_comics()
+        if self.config["stats_refresh"]["enabled"]:
+            self.schedule_stats_refresh()
+        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
-        # 设置初始状态 - 修复选择逻辑
-        if self.comic_list.get_children():
-            self.comic_list.selection_set(self.comic_list.get_children()[0])
-            self.show_comic_details(0)
+        # 继续上次退出时未完成的批量下载
+        if self.job_queue.recover():
+            self.status_var.set("继续未完成的批量下载...")
+            self._start_job_dispatcher()
     
     def log_action(self, action, success=True, message=""):
         """记录操作日志"""
@@ -167,7 +201,7 @@ class ComicBrowser:
             self.search_var = tk.StringVar()
             search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=15)
             search_entry.pack(side=tk.LEFT, padx=(10, 0))
-            search_entry.bind("<KeyRelease>", self.filter_comics)
+            search_entry.bind("<KeyRelease>", self.schedule_filter)
             
             search_btn = ttk.Button(search_frame, text="搜索", width=6, command=self.filter_comics)
             search_btn.pack(side=tk.LEFT, padx=(5, 0))
@@ -186,8 +220,7 @@ class ComicBrowser:
                 list_container, 
                 columns=columns, 
                 show="headings", 
-                selectmode="browse",
-                yscrollcommand=scrollbar.set
+                selectmode="browse"
             )
             
             self.comic_list.heading("id", text="ID")
@@ -196,10 +229,14 @@ class ComicBrowser:
             self.comic_list.column("title", width=220, anchor=tk.W)
             
             self.comic_list.pack(fill=tk.BOTH, expand=True)
-            scrollbar.config(command=self.comic_list.yview)
             
-            # 绑定选择事件
-            self.comic_list.bind("<<TreeviewSelect>>", self.on_comic_select)
+            # 虚拟列表只实例化可见行，并负责滚动和选择事件
+            self.comic_view = VirtualList(
+                self.comic_list,
+                scrollbar,
+                self._comic_row_values,
+                on_select=self.on_comic_select
+            )
             
             logger.debug("左侧漫画列表面板创建完成")
         except Exception as e:
@@ -227,8 +264,14 @@ class ComicBrowser:
             ttk.Button(button_frame, text="删除详情", command=self.delete_comic).pack(side=tk.LEFT, padx=5)
             ttk.Button(button_frame, text="打开目录", command=self.open_directory).pack(side=tk.LEFT, padx=(0, 5))
             ttk.Button(button_frame, text="下载漫画", command=self.download_comic).pack(side=tk.LEFT, padx=(0, 5))
+            ttk.Button(button_frame, text="下载管理", command=self.open_album_window).pack(side=tk.LEFT, padx=(0, 5))
             ttk.Button(button_frame, text="添加下载列表", command=self.add_to_list).pack(side=tk.LEFT, padx=(0, 5))
+            ttk.Button(button_frame, text="添加筛选结果", command=self.add_filtered_to_list).pack(side=tk.LEFT, padx=(0, 5))
             ttk.Button(button_frame, text="切换下载列表", command=self.change_json).pack(side=tk.LEFT, padx=(0, 5))
+            ttk.Button(button_frame, text="导入列表", command=self.import_list).pack(side=tk.LEFT, padx=(0, 5))
+            ttk.Button(button_frame, text="合并列表", command=self.merge_list_files).pack(side=tk.LEFT, padx=(0, 5))
+            ttk.Button(button_frame, text="刷新统计", command=self.refresh_stats).pack(side=tk.LEFT, padx=(0, 5))
+            ttk.Button(button_frame, text="运行统计", command=lambda: StatsWindow(self.root)).pack(side=tk.LEFT, padx=(0, 5))
 
             # 详情内容区域
             detail_content = ttk.Frame(detail_frame)
@@ -319,153 +362,213 @@ class ComicBrowser:
             logger.error(f"创建右侧面板失败: {str(e)}")
             traceback.print_exc()
     
-    def load_comics(self):
-        """加载details文件夹下的所有漫画数据"""
-        try:
+    def load_comics(self, on_done=None):
+        """在后台线程加载details中的所有漫画，不阻塞界面
+
+        首次加载时分批显示到列表中；重新加载时在全部读取后一次替换，保持当前列表和选中项。
+        on_done() 在加载结束后于主线程调用。
+        """
+        if on_done is not None:
+            self._load_callbacks.append(on_done)
+        
+        # 检查details文件夹是否存在（打包存储在打开时已创建）
+        details_dir = self.store.location
+        if self.store.kind == STORAGE_DIRECTORY and not os.path.exists(details_dir):
+            logger.warning(f"漫画详情文件夹不存在: {details_dir}")
             self.comics = []
-            self.comic_list.delete(*self.comic_list.get_children())
-            
-            # 检查details文件夹是否存在
-            details_dir = "details"
-            if not os.path.exists(details_dir):
-                logger.warning(f"漫画详情文件夹不存在: {details_dir}")
-                self.comic_list.insert("", tk.END, values=("", "详情文件夹不存在"))
-                self.status_var.set(f"错误: 详情文件夹不存在 - {details_dir}")
-                return
-            
-            # 获取所有子文件夹
-            comic_dirs = glob.glob(os.path.join(details_dir, "*"))
-            logger.info(f"在 {details_dir} 中找到 {len(comic_dirs)} 个文件夹")
-            
-            if not comic_dirs:
-                self.comic_list.insert("", tk.END, values=("", "未找到漫画数据"))
-                self.status_var.set("未找到漫画数据")
+            self.comic_by_id = {}
+            self.search_index = None
+            self.comic_view.show_message("详情文件夹不存在")
+            self.status_var.set(f"错误: 详情文件夹不存在 - {details_dir}")
+            self._finish_catalog_load()
+            return
+        
+        if self.catalog is None:
+            self.catalog = CatalogIndex(self.store)
+        
+        # 新的加载开始后，旧加载线程的结果全部丢弃
+        self._load_generation += 1
+        generation = self._load_generation
+        progressive = not self.comics
+        results = queue.Queue()
+        self._loading = True
+        self.load_progress.config(value=0, maximum=1)
+        self.load_progress.pack(side=tk.RIGHT, padx=5)
+        threading.Thread(target=self._load_catalog_worker, args=(generation, progressive, results),
+                         name="catalog-load", daemon=True).start()
+        self.root.after(CATALOG_POLL_MS, self._poll_catalog_load, generation, progressive, results)
+    
+    def _load_catalog_worker(self, generation, progressive, results):
+        """后台线程：增量刷新索引，分批读取漫画并构建搜索索引"""
+        try:
+            # 增量刷新索引，只解析新增或变化的目录
+            stats = self.catalog.refresh(
+                on_progress=lambda done, total: results.put(("progress", "正在索引", done, total)))
+            results.put(("stats", stats))
+            if not stats["total"]:
+                results.put(("done", [], None))
                 return
             
-            loaded_count = 0
-            for dir_path in comic_dirs:
-                if os.path.isdir(dir_path):
-                    comic_id = os.path.basename(dir_path)
-                    json_path = os.path.join(dir_path, "album.json")
-                    
-                    if os.path.exists(json_path):
-                        try:
-                            with open(json_path, "r", encoding="utf-8") as f:
-                                comic_data = json.load(f)
-                            
-                            # 添加到漫画列表
-                            self.comics.append({
-                                "id": comic_id,
-                                "dir": dir_path,
-                                "data": comic_data
-                            })
-                            
-                            # 添加到列表视图
-                            self.comic_list.insert("", tk.END, values=(comic_id, comic_data.get("title", "无标题")))
-                            loaded_count += 1
-                        
-                        except Exception as e:
-                            logger.error(f"加载漫画数据出错: {json_path}, {str(e)}")
-                    else:
-                        logger.warning(f"在文件夹中未找到album.json: {dir_path}")
-            
-            # 更新状态
-            self.status_var.set(f"已加载 {loaded_count}/{len(comic_dirs)} 个漫画")
-            logger.info(f"成功加载 {loaded_count} 个漫画")
-            
-            # 如果没有漫画，显示提示信息
-            if not self.comics:
-                self.comic_list.insert("", tk.END, values=("", "请先下载漫画详情"))
-                self.status_var.set("未找到有效漫画数据")
-        
+            comics = []
+            for chunk in self.catalog.iter_chunks(CATALOG_CHUNK):
+                if generation != self._load_generation:
+                    return
+                comics.extend(chunk)
+                if progressive:
+                    results.put(("rows", chunk))
+                results.put(("progress", "正在加载", len(comics), stats["total"]))
+            results.put(("done", comics, SearchIndex(comics)))
         except Exception as e:
             logger.error(f"加载漫画数据失败: {str(e)}")
             traceback.print_exc()
-            self.status_var.set(f"错误: {str(e)}")
+            results.put(("error", str(e)))
+    
+    def _poll_catalog_load(self, generation, progressive, results):
+        """主线程中定时取出后台加载的结果更新列表"""
+        if generation != self._load_generation:
+            return
+        try:
+            while True:
+                kind, *payload = results.get_nowait()
+                if kind == "progress":
+                    action, done, total = payload
+                    self.load_progress.config(value=done, maximum=max(total, 1))
+                    self.status_var.set(f"{action}漫画数据... {done}/{total}")
+                elif kind == "stats":
+                    stats = payload[0]
+                    self._load_total = stats["total"]
+                    logger.info(f"在 {self.store.location} 中找到 {stats['total']} 个文件夹 "
+                                f"(新增 {stats['added']}, 更新 {stats['updated']}, 移除 {stats['removed']})")
+                    if progressive:
+                        self.comics = []
+                        self.comic_by_id = {}
+                        self.search_index = None
+                elif kind == "rows":
+                    self._show_loaded_rows(payload[0])
+                elif kind == "done":
+                    self._apply_loaded_comics(*payload, progressive)
+                    return
+                elif kind == "error":
+                    self.status_var.set(f"错误: {payload[0]}")
+                    self._finish_catalog_load()
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(CATALOG_POLL_MS, self._poll_catalog_load, generation, progressive, results)
+    
+    def _show_loaded_rows(self, chunk):
+        """首次加载时把一批漫画追加到列表末尾"""
+        self.comics.extend(chunk)
+        self.comic_by_id.update((comic["id"], comic) for comic in chunk)
+        # 搜索框有内容时等全部加载后再搜索
+        if not self.search_var.get().strip():
+            self.comic_view.append_rows([comic["id"] for comic in chunk])
+            if self.comic_view.selected_id is None and self.current_comic is None:
+                self.comic_view.select(chunk[0]["id"])
+    
+    def _apply_loaded_comics(self, comics, search_index, progressive):
+        self.comics = comics
+        self.comic_by_id = {comic["id"]: comic for comic in comics}
+        self.search_index = search_index
+        
+        if not comics:
+            self.comic_view.show_message("未找到漫画数据" if not self._load_total else "请先下载漫画详情")
+            self.status_var.set("未找到有效漫画数据" if self._load_total else "未找到漫画数据")
+        else:
+            if self.search_var.get().strip():
+                self.filter_comics()
+            elif not progressive:
+                # 重新加载时一次替换整个列表
+                self.comic_view.set_rows([comic["id"] for comic in comics])
+                if self.comic_view.selected_id is None:
+                    self.comic_view.select(comics[0]["id"])
+            self.status_var.set(f"已加载 {len(comics)}/{self._load_total} 个漫画")
+            logger.info(f"成功加载 {len(comics)} 个漫画")
+        self._finish_catalog_load()
+    
+    def _finish_catalog_load(self):
+        self._loading = False
+        self.load_progress.pack_forget()
+        pending, self._pending_comics = self._pending_comics, []
+        if pending:
+            self._insert_comics(pending)
+        callbacks, self._load_callbacks = self._load_callbacks, []
+        for callback in callbacks:
+            callback()
+    
+    def schedule_filter(self, event=None):
+        """输入时延迟执行过滤，连续按键只触发最后一次"""
+        if self._filter_after_id is not None:
+            self.root.after_cancel(self._filter_after_id)
+        self._filter_after_id = self.root.after(FILTER_DEBOUNCE_MS, self.filter_comics)
     
     def filter_comics(self, event=None):
-        """根据搜索框内容过滤漫画列表"""
+        """根据搜索框内容过滤漫画列表，支持 tag: author: title: id: 字段限定"""
         try:
-            search_term = self.search_var.get().lower()
+            self._filter_after_id = None
+            search_term = self.search_var.get()
             
-            # 清空当前列表
-            self.comic_list.delete(*self.comic_list.get_children())
+            # 加载完成后会按搜索框内容重新过滤
+            if self._loading:
+                self.status_var.set("正在加载漫画数据，完成后自动搜索...")
+                return
             
             # 如果没有漫画数据
-            if not self.comics:
-                self.comic_list.insert("", tk.END, values=("", "无漫画数据"))
+            if not self.comics or self.search_index is None:
+                self.comic_view.show_message("无漫画数据")
                 return
             
-            # 重新添加匹配的漫画
-            matched = 0
-            for comic in self.comics:
-                title = comic["data"].get("title", "").lower()
-                if search_term in comic["id"].lower() or search_term in title:
-                    self.comic_list.insert("", tk.END, values=(comic["id"], title))
-                    matched += 1
+            # 虚拟列表只更新内容有变化的可见行
+            matched_ids = [self.comics[i]["id"] for i in self.search_index.search(search_term)]
+            self.comic_view.set_rows(matched_ids)
+            matched = len(matched_ids)
             
             # 更新状态
             self.status_var.set(f"找到 {matched}/{len(self.comics)} 个匹配的漫画")
-            logger.info(f"搜索 '{search_term}' - 找到 {matched} 个结果")
+            logger.debug(f"搜索 '{search_term}' - 找到 {matched} 个结果")
             
             # 如果没有匹配项
             if matched == 0:
-                self.comic_list.insert("", tk.END, values=("", "未找到匹配的漫画"))
+                self.comic_view.show_message("未找到匹配的漫画")
+                return
             
-            # 自动选择第一个匹配项
-            if matched > 0:
-                self.comic_list.selection_set(self.comic_list.get_children()[0])
-                self.show_comic_details(0)
+            # 当前选中项不在结果中时自动选择第一个匹配项
+            if self.comic_view.selected_id is None:
+                self.comic_view.select(matched_ids[0])
         
         except Exception as e:
             logger.error(f"过滤漫画列表失败: {str(e)}")
             self.status_var.set(f"错误: {str(e)}")
     
-    def on_comic_select(self, event):
+    def _comic_row_values(self, comic_id):
+        """虚拟列表中一行的显示内容"""
+        comic = self.comic_by_id[comic_id]
+        return (comic_id, comic["data"].get("title", "无标题"))
+    
+    def on_comic_select(self, comic_id):
         """当用户选择一个漫画时显示详情"""
         try:
-            selection = self.comic_list.selection()
-            if selection:
-                # 获取选中项的索引
-                selected_index = self.comic_list.index(selection[0])
-                self.show_comic_details(selected_index)
+            self.show_comic_details(comic_id)
         except Exception as e:
             logger.error(f"选择漫画失败: {str(e)}")
             self.status_var.set(f"错误: {str(e)}")
     
-    def show_comic_details(self, index):
-        """显示指定索引的漫画详情"""
+    def show_comic_details(self, comic_id):
+        """显示指定ID的漫画详情"""
         try:
-            if index < 0 or index >= len(self.comics):
-                logger.warning(f"无效的漫画索引: {index}")
-                self.status_var.set("错误: 无效的漫画索引")
+            comic = self.comic_by_id.get(comic_id)
+            if comic is None:
+                logger.warning(f"无效的漫画ID: {comic_id}")
+                self.status_var.set("错误: 无效的漫画ID")
                 return
                 
-            comic = self.comics[index]
             self.current_comic = comic
             data = comic["data"]
-            
-            # 更新标题
             title = data.get("title", "无标题")
-            self.title_label.config(text=title)
-            
-            # 更新作者信息
-            author = data.get("author", "未知")
-            self.author_label.config(text=author)
-            
-            # 更新标签信息
-            tags = data.get("tags", [])
-            self.tags_label.config(text=", ".join(tags) if tags else "无标签")
-            
-            # 更新统计信息
-            likes = data.get("likes", 0)
-            comments = data.get("comment_count", 0)
-            self.likes_label.config(text=str(likes))
-            self.comments_label.config(text=str(comments))
+            self._show_detail_meta(data)
             
-            # 加载封面图片
-            cover_path = os.path.join(comic["dir"], "cover.png")
-            self.load_cover_image(cover_path)
+            # 加载封面图片（后台解码）
+            self.load_cover_image(comic)
             
             # 更新作品列表 - 使用Treeview显示
             self.works_tree.delete(*self.works_tree.get_children())
@@ -486,61 +589,67 @@ class ComicBrowser:
             
             # 更新状态
             self.status_var.set(f"正在显示: {title}")
-            logger.info(f"显示漫画详情: {title} (ID: {comic['id']})")
+            logger.debug(f"显示漫画详情: {title} (ID: {comic['id']})")
         
         except Exception as e:
             logger.error(f"显示漫画详情失败: {str(e)}")
             self.status_var.set(f"错误: 显示详情失败")
     
-    def load_cover_image(self, path):
-        """加载并显示封面图片"""
-        try:
-            if os.path.exists(path):
-                # 使用PIL打开图片并调整大小
-                img = Image.open(path)
-                # 计算保持宽高比的缩放比例
-                max_width, max_height = 200, 300
-                width, height = img.size
-                
-                # 计算新尺寸
-                ratio = min(max_width / width, max_height / height)
-                new_width = int(width * ratio)
-                new_height = int(height * ratio)
-                
-                img = img.resize((new_width, new_height), Image.LANCZOS)
-                photo = ImageTk.PhotoImage(img)
-                
-                # 更新标签图片
-                self.cover_label.config(image=photo)
-                self.cover_label.image = photo
-                logger.debug(f"封面图片加载成功: {path}")
-            else:
-                self.cover_label.config(image="", text="封面不存在")
-                logger.warning(f"封面图片不存在: {path}")
-        except Exception as e:
-            self.cover_label.config(image="", text="封面加载失败")
-            logger.error(f"加载封面图片出错: {path}, {str(e)}")
+    def _show_detail_meta(self, data):
+        """更新详情面板中的标题、作者、标签和统计信息（统计刷新后也只更新这些）"""
+        # 更新标题
+        self.title_label.config(text=data.get("title", "无标题"))
+        
+        # 更新作者信息
+        self.author_label.config(text=data.get("author", "未知"))
+        
+        # 更新标签信息
+        tags = data.get("tags", [])
+        self.tags_label.config(text=", ".join(tags) if tags else "无标签")
+        
+        # 更新统计信息
+        likes = data.get("likes", 0)
+        comments = data.get("comment_count", 0)
+        self.likes_label.config(text=str(likes))
+        self.comments_label.config(text=str(comments))
+    
+    def load_cover_image(self, comic):
+        """在后台解码封面并显示，同时预加载列表中相邻漫画的封面"""
+        if not self.cover_loader.is_cached(comic["id"]):
+            self.cover_label.config(image="", text="封面加载中...")
+        self.cover_loader.load(comic["id"], self._show_cover)
+        
+        index = self.comic_view.index_of(comic["id"])
+        if index is not None:
+            rows = self.comic_view.ids
+            neighbours = [rows[i] for i in (index + 1, index - 1, index + 2, index - 2)
+                          if 0 <= i < len(rows)]
+            self.cover_loader.preload([self.comic_by_id[cid] for cid in neighbours])
+    
+    def _show_cover(self, photo, error):
+        """封面解码完成后在主线程中更新标签图片"""
+        if photo is not None:
+            self.cover_label.config(image=photo, text="")
+            self.cover_label.image = photo
+        else:
+            self.cover_label.config(image="", text=error or "封面加载失败")
+            self.cover_label.image = None
     
     def reload_comics(self):
-        """重新加载漫画数据"""
+        """重新加载漫画数据（后台进行）"""
         try:
-            self.load_comics()
-            
-            # 尝试重新选择当前漫画
-            if self.current_comic and self.comics:
-                for i, comic in enumerate(self.comics):
-                    if comic["id"] == self.current_comic["id"]:
-                        children = self.comic_list.get_children()
-                        if i < len(children):
-                            self.comic_list.selection_set(children[i])
-                            self.show_comic_details(i)
-                        break
-            
-            self.log_action("刷新漫画数据", True, f"已加载 {len(self.comics)} 个漫画")
+            self.load_comics(on_done=self._after_reload)
         except Exception as e:
             self.log_action("刷新漫画数据", False, str(e))
             logger.error(f"刷新漫画数据失败: {str(e)}")
     
+    def _after_reload(self):
+        # 尝试重新选择当前漫画
+        if self.current_comic and self.current_comic["id"] in self.comic_by_id:
+            self.comic_view.select(self.current_comic["id"])
+        
+        self.log_action("刷新漫画数据", True, f"已加载 {len(self.comics)} 个漫画")
+    
     def download_selected_comic_detail(self):
         """下载选中的相关作品详情（非阻塞）"""
         selection = self.works_tree.selection()
@@ -576,20 +685,12 @@ class ComicBrowser:
     def _download_comic_detail(self, comic_id, comic_title):
         """后台线程执行下载任务"""
         try:
-            option = jmcomic.JmOption.default()
-            client = option.new_jm_client()
-            details_path = "details\\"
-            
-            # 调用下载函数
-            success, error = download_detail(client, comic_id, comic_id, details_path)
-            
-            if success:
-                self.root.after(0, lambda: self.status_var.set(f"下载成功: {comic_title}"))
-                self.root.after(0, self.reload_comics)  # 重新加载列表
-            else:
-                self.root.after(0, lambda: self.status_var.set(f"下载失败: {comic_title} - {error}"))
+            # 调用下载函数；成功后只把这一个漫画插入列表，不重新扫描全部详情
+            success, error = self._download_single_comic(comic_id, comic_title)
+            comic = self._index_downloaded(comic_id, success, error)
+            self.progress.post("job", (comic_id, comic_title, success, error, False, comic))
         except Exception as e:
-            self.root.after(0, lambda: self.status_var.set(f"下载异常: {str(e)}"))
+            self.progress.post("status", f"下载异常: {str(e)}")
         finally:
             # 重新启用按钮
             self.root.after(0, lambda: [
@@ -598,7 +699,7 @@ class ComicBrowser:
             ])
     
     def download_all_related_comics(self):
-        """下载所有相关作品详情（15线程并发）"""
+        """下载所有相关作品详情（并发数由自适应限制器控制）"""
         if not self.current_comic:
             messagebox.showwarning("下载失败", "请先选择一个漫画以获取相关作品列表")
             return
@@ -624,104 +725,319 @@ class ComicBrowser:
             return
         
         # 确认下载
+        existing = sum(1 for task in tasks if detail_is_fresh(self.store, task["id"], BATCH_DETAIL_MODE))
         confirm = messagebox.askyesno(
             "确认下载", 
-            f"确定要下载所有相关作品详情吗？\n\n共 {len(tasks)} 个作品"
+            f"确定要下载所有相关作品详情吗？\n\n共 {len(tasks)} 个作品，其中 {existing} 个已存在将跳过"
         )
         if not confirm:
             return
         
-        # 禁用按钮防止重复点击
-        self.download_selected_btn.config(state=tk.DISABLED)
-        self.download_all_btn.config(state=tk.DISABLED)
-        self.status_var.set(f"开始批量下载: {len(tasks)} 个作品...")
-        
-        # 创建新线程执行批量下载
-        threading.Thread(
-            target=self._download_all_comics, 
-            args=(tasks,),
-            daemon=True
-        ).start()
+        self._download_all_comics(tasks)
     
     def _download_all_comics(self, tasks):
-        """后台线程执行批量下载任务（15线程并发）"""
+        """将批量下载任务加入持久化队列，由后台调度线程执行"""
+        # 本地已有的详情直接跳过，不进入队列
+        pending = [task for task in tasks
+                   if not detail_is_fresh(self.store, task["id"], BATCH_DETAIL_MODE)]
+        skipped = len(tasks) - len(pending)
+        added = self.job_queue.submit(pending)
+        with self._job_lock:
+            self._job_stats["skipped"] += skipped
+        
+        self.status_var.set(f"开始批量下载: 新增 {added} 个任务, 跳过 {skipped} 个, "
+                            f"{len(pending) - added} 个已在队列中")
+        logger.info(f"批量下载: 新增 {added}, 跳过 {skipped}")
+        self._start_job_dispatcher()
+    
+    def _start_job_dispatcher(self):
+        """启动队列调度线程；已在运行时只唤醒它"""
+        with self._job_lock:
+            if self._job_thread is not None:
+                self._job_event.set()
+                return
+            self._job_thread = threading.Thread(target=self._run_job_dispatcher, daemon=True)
+            self._job_thread.start()
+    
+    def _run_job_dispatcher(self):
+        """后台线程：从队列领取任务交给线程池或异步引擎执行，队列清空后退出"""
+        running = set()
+        use_async = self.config["download"]["engine"] == "asyncio"
+        concurrency = self._get_async_engine().concurrency if use_async else self.max_workers
         try:
-            # 创建线程池（最大15个线程）
-            with ThreadPoolExecutor(max_workers=15) as executor:
-                futures = {}
-                
-                # 提交所有任务到线程池
-                for task in tasks:
-                    future = executor.submit(
-                        self._download_single_comic, 
-                        task["id"], 
-                        task["title"]
-                    )
-                    futures[future] = task
-                
-                # 跟踪进度
-                completed = 0
-                total = len(tasks)
-                failed = []
-                
-                # 等待任务完成并更新状态
-                for future in as_completed(futures):
-                    task = futures[future]
-                    comic_id, comic_title = task["id"], task["title"]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while True:
+                    self._job_event.clear()
+                    running = {f for f in running if not f.done()}
                     
-                    try:
-                        success, error = future.result()
-                        if success:
-                            self.root.after(0, lambda cid=comic_id, ct=comic_title: 
-                                self.status_var.set(f"完成: {ct} (ID: {cid})"))
+                    for comic_id, comic_title in self.job_queue.claim(concurrency - len(running)):
+                        if use_async:
+                            future = self.async_engine.submit(comic_id, comic_title,
+                                                              on_done=self._record_job_result)
                         else:
-                            failed.append((comic_id, comic_title, error))
-                            self.root.after(0, lambda cid=comic_id, ct=comic_title, e=error: 
-                                self.status_var.set(f"失败: {ct} - {e}"))
-                    except Exception as e:
-                        failed.append((comic_id, comic_title, str(e)))
-                        self.root.after(0, lambda cid=comic_id, ct=comic_title, e=str(e): 
-                            self.status_var.set(f"异常: {ct} - {e}"))
+                            future = executor.submit(self._run_job, comic_id, comic_title)
+                        future.add_done_callback(lambda f: self._job_event.set())
+                        running.add(future)
+                    
+                    with self._job_lock:
+                        wakeup = self.job_queue.next_wakeup()
+                        if wakeup is None and not running:
+                            self._job_thread = None
+                            break
                     
-                    completed += 1
-                    self.root.after(0, lambda c=completed, t=total: 
-                        self.status_var.set(f"批量下载中: {c}/{t} 已完成"))
+                    # 等待任务完成或下一个重试任务到期；并发已满时只等待任务完成
+                    if len(running) >= concurrency:
+                        wakeup = None
+                    self._job_event.wait(timeout=wakeup)
+        except Exception as e:
+            logger.error(f"下载队列调度失败: {str(e)}")
+            with self._job_lock:
+                self._job_thread = None
+            self.progress.post("status", f"批量下载异常: {str(e)}")
+            return
+        
+        self.progress.post("batch_done")
+    
+    def _run_job(self, comic_id, comic_title):
+        """线程池模式下执行单个队列任务并记录结果"""
+        try:
+            success, error = self._download_single_comic(comic_id, comic_title, BATCH_DETAIL_MODE)
+        except Exception as e:
+            success, error = False, str(e)
+        
+        self._record_job_result(comic_id, comic_title, success, error)
+    
+    def _record_job_result(self, comic_id, comic_title, success, error):
+        """在工作线程中登记任务结果：更新持久化队列和本批统计，再交给界面"""
+        if success:
+            self.job_queue.complete(comic_id)
+            with self._job_lock:
+                key = "skipped" if error == DETAIL_SKIPPED else "done"
+                self._job_stats[key] += 1
+        else:
+            self.job_queue.fail(comic_id, error)
+        comic = self._index_downloaded(comic_id, success, error)
+        self.progress.post("job", (comic_id, comic_title, success, error, True, comic))
+    
+    def _index_downloaded(self, comic_id, success, error):
+        """在工作线程中读取新下载的详情并写入索引，返回要并入列表的漫画；跳过或失败时返回None
+        
+        索引写入可能等待正在进行的刷新，不放在主线程中执行
+        """
+        catalog = self.catalog
+        if not success or error == DETAIL_SKIPPED or catalog is None:
+            return None
+        comics = catalog.upsert([comic_id])
+        return comics[0] if comics else None
+    
+    def _apply_job_results(self, results):
+        """在主线程中合并处理一个周期内的全部下载结果：刷新封面缓存、插入新漫画、更新一次状态栏"""
+        comics = []
+        batch = False
+        for comic_id, comic_title, success, error, from_batch, comic in results:
+            batch = batch or from_batch
+            if success:
+                self.cover_loader.invalidate(comic_id)
+            if comic is not None:
+                comics.append(comic)
+        if comics:
+            if self._loading:
+                self._pending_comics.extend(comics)
+            else:
+                self._insert_comics(comics)
+        
+        if batch:
+            self._show_job_progress()
+        else:
+            comic_id, comic_title, success, error = results[-1][:4]
+            if success:
+                self.status_var.set(f"下载成功: {comic_title}")
+            else:
+                self.status_var.set(f"下载失败: {comic_title} - {error}")
+    
+    def _insert_comics(self, comics):
+        """把新下载或更新的漫画并入列表和搜索索引，不重新加载全部数据"""
+        new_ids = []
+        updated = False
+        for comic in comics:
+            old = self.comic_by_id.get(comic["id"])
+            if old is None:
+                index = len(self.comics)
+                self.comics.append(comic)
+                new_ids.append(comic["id"])
+            else:
+                index = next(i for i, c in enumerate(self.comics) if c is old)
+                self.comics[index] = comic
+                updated = True
+            self.comic_by_id[comic["id"]] = comic
+            if self.search_index is not None:
+                self.search_index.set(index, comic)
+        if self.search_index is None and self.comics:
+            self.search_index = SearchIndex(self.comics)
+        
+        if self.search_var.get().strip():
+            self.filter_comics()
+        elif new_ids:
+            self.comic_view.append_rows(new_ids)
+        if updated:
+            self.comic_view.refresh()
+            if self.current_comic is not None and self.current_comic["id"] in self.comic_by_id:
+                self.current_comic = self.comic_by_id[self.current_comic["id"]]
+        logger.debug(f"插入列表: 新增 {len(new_ids)}, 更新 {len(comics) - len(new_ids)}")
+    
+    def _show_job_progress(self):
+        counts = self.job_queue.counts()
+        self.status_var.set(
+            f"批量下载中: 完成 {counts['done']}, 进行中 {counts['running']}, "
+            f"等待 {counts['pending']}, 失败 {counts['failed']}")
+    
+    def _get_async_engine(self):
+        """获取异步下载引擎，首次使用时创建并开始定时取结果"""
+        with self._client_pool_lock:
+            if self.async_engine is None:
+                # asyncio只在使用异步引擎时导入
+                from async_fetch import AsyncDetailEngine
+                conf = self.config["download"]
+                self.async_engine = AsyncDetailEngine(
+                    path=self.store,
+                    album_concurrency=conf["async_concurrency"],
+                    cover_concurrency=conf["async_cover_concurrency"],
+                    mode=BATCH_DETAIL_MODE,
+                    limiter=self.limiter
+                )
+                self.async_engine.start()
+            return self.async_engine
+    
+    def _finish_job_batch(self):
+        """队列清空后在主线程中汇总结果并刷新列表"""
+        failed = self.job_queue.failed_jobs()
+        with self._job_lock:
+            stats = self._job_stats
+            self._job_stats = {"done": 0, "skipped": 0}
+        self.job_queue.purge()
+        
+        self.status_var.set(f"批量下载完成! 成功: {stats['done']}, "
+                            f"跳过: {stats['skipped']}, 失败: {len(failed)}")
+        logger.info(f"批量下载完成: 成功 {stats['done']}, 跳过 {stats['skipped']}, 失败 {len(failed)}")
+        
+        # 如果有失败的任务，显示错误报告
+        if failed:
+            error_report = "\n".join([f"ID: {f[0]}, 标题: {f[1]}, 错误: {f[2]}" for f in failed])
+            messagebox.showwarning(
+                "部分下载失败", 
+                f"以下 {len(failed)} 个作品下载失败:\n\n{error_report}"
+            )
+    
+    def schedule_stats_refresh(self):
+        """按配置的间隔定时刷新统计"""
+        interval_ms = int(self.config["stats_refresh"]["interval_minutes"] * 60 * 1000)
+        self._stats_after_id = self.root.after(max(interval_ms, 1000), self._scheduled_stats_refresh)
+    
+    def _scheduled_stats_refresh(self):
+        self._stats_after_id = None
+        self.refresh_stats(scheduled=True)
+        self.schedule_stats_refresh()
+    
+    def refresh_stats(self, scheduled=False):
+        """在后台重新获取一批漫画的详情，更新点赞、评论数等有变化的数据，不下载封面"""
+        if self._stats_thread is not None:
+            if not scheduled:
+                self.status_var.set("统计刷新进行中...")
+            return
+        if self.catalog is None or self._loading:
+            if not scheduled:
+                self.status_var.set("正在加载漫画数据，请稍后再刷新统计")
+            return
+        self._stats_thread = threading.Thread(target=self._run_stats_refresh, daemon=True)
+        self._stats_thread.start()
+        if not scheduled:
+            self.status_var.set("正在刷新统计...")
+    
+    def _run_stats_refresh(self):
+        """后台线程：按策略选出一批漫画重新获取详情，只重写有变化的album.json并更新索引"""
+        conf = self.config["stats_refresh"]
+        ids, changed, unchanged, failed = [], [], [], []
+        try:
+            ids = select_for_refresh(self.catalog.refresh_candidates(), conf["order"], conf["batch_size"],
+                                     conf["min_age_hours"] * 3600)
             
-            # 全部完成
-            self.root.after(0, lambda: [
-                self.status_var.set(f"批量下载完成! 成功: {total - len(failed)}, 失败: {len(failed)}"),
-                self.reload_comics()
-            ])
+            def refresh(comic_id):
+                with self.limiter.slot(), self._get_client_pool().client() as client:
+                    return refresh_album(client, self.store, comic_id)
             
-            # 如果有失败的任务，显示错误报告
-            if failed:
-                error_report = "\n".join([f"ID: {f[0]}, 标题: {f[1]}, 错误: {f[2]}" for f in failed])
-                self.root.after(0, lambda: messagebox.showwarning(
-                    "部分下载失败", 
-                    f"以下 {len(failed)} 个作品下载失败:\n\n{error_report}"
-                ))
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {executor.submit(refresh, comic_id): comic_id for comic_id in ids}
+                for future in as_completed(futures):
+                    comic_id = futures[future]
+                    try:
+                        (changed if future.result() else unchanged).append(comic_id)
+                    except Exception as e:
+                        failed.append(comic_id)
+                        logger.warning(f"刷新统计失败: {comic_id}, {str(e)}")
+            
+            # 没有变化的只记录检查时间，下次按最久未检查排序时排到后面；
+            # 失败的同样记录，否则每次都会最先选中它们，挤占其他漫画的刷新
+            self.catalog.mark_checked(unchanged + failed)
+            comics = self.catalog.upsert(changed)
         except Exception as e:
-            self.root.after(0, lambda: self.status_var.set(f"批量下载异常: {str(e)}"))
-        finally:
-            # 重新启用按钮
-            self.root.after(0, lambda: [
-                self.download_selected_btn.config(state=tk.NORMAL),
-                self.download_all_btn.config(state=tk.NORMAL)
-            ])
+            logger.error(f"刷新统计失败: {str(e)}")
+            self.progress.post("stats", ([], len(ids), len(failed), str(e)))
+            return
+        logger.info(f"统计刷新完成: 检查 {len(ids)}, 更新 {len(comics)}, 失败 {len(failed)}")
+        self.progress.post("stats", (comics, len(ids), len(failed), ""))
+    
+    def _apply_stats_refresh(self, results):
+        """在主线程中把有变化的漫画并入列表和搜索索引，当前显示的漫画只更新文字信息"""
+        self._stats_thread = None
+        for comics, total, failed, error in results:
+            if error:
+                self.log_action("刷新统计", False, error)
+                continue
+            if comics:
+                if self._loading:
+                    self._pending_comics.extend(comics)
+                else:
+                    self._insert_comics(comics)
+                    current = self.current_comic
+                    if current is not None and current["id"] in {comic["id"] for comic in comics}:
+                        self._show_detail_meta(current["data"])
+            self.status_var.set(f"统计刷新完成: 检查 {total} 本, 更新 {len(comics)} 本, 失败 {failed} 本")
     
-    def _download_single_comic(self, comic_id, comic_title):
-        """下载单个漫画详情（供线程池使用）"""
+    def _download_single_comic(self, comic_id, comic_title, mode=DETAIL_MODE_FORCE):
+        """下载单个漫画详情（供线程池使用），从共享客户端池借用客户端"""
         try:
-            option = jmcomic.JmOption.default()
-            client = option.new_jm_client()
-            details_path = "details\\"
-            os.makedirs(details_path, exist_ok=True)
-            
-            # 调用下载函数
-            return download_detail(client, comic_id, comic_id, details_path)
+            details_path = self.store
+            if details_path.kind == STORAGE_DIRECTORY:
+                os.makedirs(details_path.location, exist_ok=True)
+            
+            # 无需下载时不借用客户端
+            if detail_is_fresh(details_path, comic_id, mode):
+                return True, DETAIL_SKIPPED
+            
+            # 调用下载函数，失败时抛出异常以便限制器和客户端池统计失败
+            # 池中还有空闲客户端时借来并发下载封面，不等待
+            pool = self._get_client_pool()
+            with self.limiter.slot(), pool.client() as client, pool.client(block=False) as cover_client:
+                success, error = download_detail(client, comic_id, comic_id, details_path,
+                                                 cover_client=cover_client)
+                if not success:
+                    raise RuntimeError(error)
+            return True, ""
         except Exception as e:
             return False, str(e)
     
+    def _get_client_pool(self):
+        """获取共享的jmcomic客户端池，首次使用时创建"""
+        with self._client_pool_lock:
+            if self.client_pool is None:
+                # 每个请求都先经过全局令牌桶；每个下载最多同时使用两个客户端（详情和封面）
+                create = jm_client_factory()
+                self.client_pool = ClientPool(
+                    lambda: RateLimitedClient(create(), self.limiter.bucket),
+                    size=self.max_workers * 2
+                )
+            return self.client_pool
+    
     def delete_comic(self):
         """删除当前选中的漫画详情"""
         try:
@@ -732,7 +1048,7 @@ class ComicBrowser:
                 
             comic_id = self.current_comic["id"]
             comic_title = self.current_comic["data"].get("title", "无标题")
-            comic_dir = self.current_comic["dir"]
+            comic_dir = self.current_comic["dir"] or self.store.location
             
             # 确认删除
             #confirm = messagebox.askyesno(
@@ -745,31 +1061,29 @@ class ComicBrowser:
                 self.log_action("删除详情", False, "用户取消操作")
                 return
                 
-            # 删除目录及其中所有文件
-            if os.path.exists(comic_dir):
-                import shutil
+            # 删除目录及其中所有文件（打包存储中删除对应记录）
+            if self.store.album_mtime(comic_id) is not None or os.path.exists(comic_dir):
                 try:
-                    shutil.rmtree(comic_dir)
+                    self.store.delete(comic_id)
+                    self.cover_loader.invalidate(comic_id)
                     self.log_action("删除详情", True, f"已删除 {comic_dir}")
                     #messagebox.showinfo("删除成功", f"已成功删除漫画详情:\n{comic_title}")
                     
                     # 重新加载漫画列表
-                    current_selection = self.comic_list.selection()
-                    current_index = self.comic_list.index(current_selection[0]) if current_selection else 0
+                    current_index = self.comic_view.index_of(comic_id)
                     
-                    self.load_comics()
+                    def select_nearby():
+                        # 尝试保持相近位置的选择
+                        rows = self.comic_view.ids
+                        if rows:
+                            # 如果原来有选择项且不是最后一项，则选择相同位置的项
+                            if current_index is not None and current_index < len(rows):
+                                self.comic_view.select(rows[current_index])
+                            else:
+                                # 否则选择第一项
+                                self.comic_view.select(rows[0])
                     
-                    # 尝试保持相近位置的选择
-                    children = self.comic_list.get_children()
-                    if children:
-                        # 如果原来有选择项且不是最后一项，则选择相同索引项
-                        if current_selection and current_index < len(children):
-                            self.comic_list.selection_set(children[current_index])
-                            self.show_comic_details(current_index)
-                        else:
-                            # 否则选择第一项
-                            self.comic_list.selection_set(children[0])
-                            self.show_comic_details(0)
+                    self.load_comics(on_done=select_nearby)
                             
                 except Exception as e:
                     self.log_action("删除详情", False, str(e))
@@ -821,7 +1135,8 @@ class ComicBrowser:
                 self.log_action("打开目录", False, "未选择漫画")
                 return
                 
-            dir_path = self.current_comic["dir"]
+            # 打包存储中没有单独的目录，打开存储文件所在的目录
+            dir_path = self.current_comic["dir"] or os.path.dirname(os.path.abspath(self.store.location))
             if os.path.exists(dir_path):
                 try:
                     if sys.platform == "win32":
@@ -841,21 +1156,13 @@ class ComicBrowser:
             self.log_action("打开目录", False, str(e))
             logger.error(f"打开目录失败: {str(e)}")
     def download_comic(self):
-        """下载当前选中的漫画"""
+        """把当前选中的漫画加入整本下载队列"""
         try:
             # 检查是否选择了漫画
             if not self.current_comic:
                 messagebox.showwarning("下载失败", "请先选择一个漫画")
                 self.log_action("下载漫画", False, "未选择漫画")
                 return
-                
-            # 检查是否存在setting.yml配置文件
-            if not os.path.exists('setting.yml'):
-                # 如果不存在，则创建默认配置文件
-                jmcomic.JmOption.default().to_file('setting.yml')
-                
-            # 从配置文件创建选项对象
-            option = jmcomic.create_option_by_file('setting.yml')
             
             # 获取当前选中漫画的ID
             comic_id = self.current_comic["id"]
@@ -870,51 +1177,83 @@ class ComicBrowser:
             if not confirm:
                 self.log_action("下载漫画", False, "用户取消操作")
                 return
-                
-            # 禁用下载按钮防止重复点击
-            # 注意：这里需要找到下载按钮并禁用，根据UI代码，应该是找到"下载漫画"按钮
-            self.status_var.set(f"开始下载: {comic_title} (ID: {comic_id})")
             
-            # 创建新线程执行下载任务
-            threading.Thread(
-                target=self._download_comic_thread, 
-                args=(comic_id, comic_title, option),
-                daemon=True
-            ).start()
+            # 同时下载的漫画数和带宽由下载管理器统一限制，超出的在队列中等待
+            self.get_album_manager().submit(comic_id, comic_title)
+            self.status_var.set(f"已加入下载队列: {comic_title} (ID: {comic_id})")
+            self.open_album_window()
             
         except Exception as e:
             self.log_action("下载漫画", False, str(e))
             logger.error(f"下载漫画失败: {str(e)}")
             messagebox.showerror("下载失败", f"下载过程中出错:\n{str(e)}")
+    
+    def get_album_manager(self):
+        """整本漫画的下载管理器，首次下载时创建"""
+        if self.album_manager is None:
+            conf = self.config["download"]
+            self.album_manager = AlbumDownloadManager(
+                max_albums=conf["max_albums"],
+                bandwidth=conf["bandwidth_limit"] * 1024,
+                bucket=self.limiter.bucket,
+                on_update=lambda task: self.progress.post("album", task),
+                pipeline=ImagePipeline.from_config(conf)
+            )
+        return self.album_manager
+    
+    def open_album_window(self):
+        # 已打开时只把窗口提到前面
+        if self.album_window is not None and self.album_window.window.winfo_exists():
+            self.album_window.window.lift()
+            return
+        self.album_window = AlbumDownloadWindow(self.root, self.get_album_manager())
+    
+    def _apply_album_updates(self, tasks):
+        """下载管理器的进度事件；进度由下载管理窗口定时显示，这里只报告结束的任务"""
+        finished = {task.id: task for task in tasks if task.finished}
+        for task in finished.values():
+            if task.state == ALBUM_DONE:
+                self.log_action("下载漫画", True, f"已下载 {task.title} (ID: {task.id}), {task.images_done} 张图片")
+            elif task.state == ALBUM_FAILED:
+                self.log_action("下载漫画", False, f"{task.title} (ID: {task.id}): {task.error}")
+                messagebox.showerror("下载失败", f"下载过程中出错:\n{task.title}\n{task.error}")
+            else:
+                self.status_var.set(f"已取消下载: {task.title}")
+    
+    def get_download_list(self):
+        """当前下载列表，切换列表后重新打开；合并结果正在写入该列表时抛出RuntimeError"""
+        if self._list_merge_target is not None and os.path.abspath(self.json_path) == self._list_merge_target:
+            raise RuntimeError("正在把合并结果写入当前下载列表，请在合并完成后再修改")
+        if self.download_list is None or self.download_list.json_path != self.json_path:
+            if self.download_list is not None:
+                self.download_list.close()
+            if os.path.exists(self.json_path):
+                logger.info(f"获取列表{self.json_path}")
+            else:
+                logger.info(f"创建列表{self.json_path}")
+            self.download_list = DownloadListStore(self.json_path)
+        return self.download_list
+
+    def list_item(self, comic):
+        return {"id": comic["id"], "title": comic["data"].get("title", "未知标题"),
+                "tags": comic["data"].get("tags", "")}
+
+    def schedule_list_compact(self):
+        """连续添加时只在停下来之后写一次JSON，其余时间只追加日志"""
+        if self._list_compact_after_id is not None:
+            self.root.after_cancel(self._list_compact_after_id)
+        self._list_compact_after_id = self.root.after(LIST_COMPACT_DELAY_MS, self.compact_download_list)
 
-    def _download_comic_thread(self, comic_id, comic_title, option):
-        """后台线程执行漫画下载任务"""
+    def compact_download_list(self):
+        self._list_compact_after_id = None
         try:
-            # 使用jmcomic下载漫画
-            #client = option.new_jm_client()
-            #album_detail = client.get_album_detail(comic_id)
-            
-            # 执行下载
-            jmcomic.download_album(comic_id, option)
-            
-            # 在主线程中更新UI
-            self.root.after(0, lambda: [
-                self.status_var.set(f"下载完成: {comic_title}"),
-                messagebox.showinfo("下载完成", f"漫画下载完成:\n{comic_title}")
-            ])
-            
-            self.log_action("下载漫画", True, f"已下载 {comic_title} (ID: {comic_id})")
-            
+            if self.download_list is not None:
+                self.download_list.compact()
         except Exception as e:
-            error_msg = str(e)
-            self.root.after(0, lambda: [
-                self.status_var.set(f"下载失败: {comic_title}"),
-                messagebox.showerror("下载失败", f"下载过程中出错:\n{error_msg}")
-            ])
-            self.log_action("下载漫画", False, error_msg)
-            logger.error(f"下载漫画失败: {error_msg}")
+            logger.error(f"保存下载列表失败: {str(e)}")
+
     def add_to_list(self):
-        """下载当前选中的漫画"""
+        """把当前选中的漫画添加到下载列表"""
         try:
             # 检查是否选择了漫画
             if not self.current_comic:
@@ -922,46 +1261,154 @@ class ComicBrowser:
                 self.log_action("添加漫画", False, "未选择漫画")
                 return
 
-            
-            # 获取当前选中漫画的ID
-            comic_id = self.current_comic["id"]
             comic_title = self.current_comic["data"].get("title", "未知标题")
-            comic_tag = self.current_comic["data"].get("tags", "")
-            if os.path.exists(self.json_path):
-                logging.info(f"获取列表{self.json_path}")
-                with open(self.json_path,'r',encoding='utf-8')as f:
-                    json_data = json.load(f)
-                    already_downloaded=False
-                    for i in json_data:
-                        if i["id"] == comic_id:
-                            already_downloaded = True
-                            break
-                    if not already_downloaded:
-                        json_data.append({"id": comic_id, "title": comic_title,'tags':comic_tag})
+            if self.get_download_list().add(self.list_item(self.current_comic)):
+                self.log_action("添加下载列表", True, comic_title)
+                self.schedule_list_compact()
             else:
-                logging.info(f"创建列表{self.json_path}")
-                json_data = [{"id": comic_id, "title": comic_title,'tags':comic_tag}]
-            json.dump(json_data, open(self.json_path, 'w', encoding='utf-8'), ensure_ascii=False, indent=4)
+                self.status_var.set(f"已在下载列表中: {comic_title}")
         except Exception as e:
-            self.log_action("下载漫画", False, str(e))
-            logger.error(f"下载漫画失败: {str(e)}")
-            messagebox.showerror("下载失败", f"下载过程中出错:\n{str(e)}")
+            self.log_action("添加下载列表", False, str(e))
+            logger.error(f"添加下载列表失败: {str(e)}")
+            messagebox.showerror("添加失败", f"添加到下载列表时出错:\n{str(e)}")
+
+    def add_filtered_to_list(self):
+        """把列表中当前显示的全部漫画（搜索结果）一次添加到下载列表"""
+        try:
+            ids = self.comic_view.ids
+            if not ids:
+                messagebox.showwarning("添加失败", "当前列表为空")
+                return
+            if not messagebox.askyesno("添加下载列表", f"确定把当前列表中的 {len(ids)} 本漫画添加到下载列表吗？"):
+                return
+            items = [self.list_item(self.comic_by_id[comic_id]) for comic_id in ids if comic_id in self.comic_by_id]
+            download_list = self.get_download_list()
+            added = download_list.add_many(items)
+            self.log_action("添加下载列表", True, f"新增 {added} 本, 跳过已存在的 {len(items) - added} 本")
+            if added:
+                self.schedule_list_compact()
+        except Exception as e:
+            self.log_action("添加下载列表", False, str(e))
+            logger.error(f"添加下载列表失败: {str(e)}")
+            messagebox.showerror("添加失败", f"添加到下载列表时出错:\n{str(e)}")
+
     def change_json(self):
         json_path=self.select_json_file()
         try:
             if os.path.exists(json_path):
+                # 切换前把当前列表写回JSON
+                if self._list_compact_after_id is not None:
+                    self.root.after_cancel(self._list_compact_after_id)
+                self.compact_download_list()
                 self.json_path = json_path
-                logging.info(f"已选择JSON文件: {json_path}")
+                logger.info(f"已选择JSON文件: {json_path}")
             else:
-                logging.error(f"JSON文件不存在: {json_path}")
-        except:
-            logging.error("选择JSON文件时出错")
+                logger.error(f"JSON文件不存在: {json_path}")
+        except Exception as e:
+            logger.error(f"选择JSON文件时出错: {str(e)}")
+
+    def complete_list_item(self, item):
+        """txt列表导入的项只有ID：按本地详情补全标题和标签，没有详情时使用默认值"""
+        comic = self.comic_by_id.get(str(item["id"]))
+        base = self.list_item(comic) if comic is not None else {"id": str(item["id"]), "title": "未知标题", "tags": ""}
+        return {**base, **item}
+
+    def add_items_to_list(self, items):
+        """导入窗口中的列表一次添加到当前下载列表，返回新增数量"""
+        added = self.get_download_list().add_many([self.complete_list_item(item) for item in items])
+        self.log_action("添加下载列表", True, f"新增 {added} 本")
+        if added:
+            self.schedule_list_compact()
+        return added
+
+    def import_list(self):
+        """在新窗口中逐步导入txt/json列表，不阻塞主窗口"""
+        file_path = filedialog.askopenfilename(
+            title="导入列表",
+            filetypes=[("JSON文件", "*.json"), ("文本文件", "*.txt"), ("所有文件", "*.*")]
+        )
+        if not file_path:
+            return
+        logger.info(f"导入列表: {file_path}")
+        ListImportWindow(self.root, file_path, on_add=self.add_items_to_list)
+
+    def merge_list_files(self):
+        """按ID合并多个txt/json列表并去重，在后台线程中流式处理"""
+        paths = filedialog.askopenfilenames(
+            title="选择要合并的列表",
+            filetypes=[("JSON文件", "*.json"), ("文本文件", "*.txt"), ("所有文件", "*.*")]
+        )
+        if not paths:
+            return
+        out_path = filedialog.asksaveasfilename(
+            title="保存合并结果", defaultextension=".json",
+            filetypes=[("JSON文件", "*.json"), ("文本文件", "*.txt")]
+        )
+        if not out_path:
+            return
+        if self._list_merge_target is not None:
+            messagebox.showwarning("合并列表", "上一次合并仍在写入当前下载列表，请稍后再试")
+            return
+        # 合并结果覆盖当前下载列表时，先把未写回的新增项保存，合并完成前不允许修改该列表
+        if os.path.abspath(out_path) == os.path.abspath(self.json_path):
+            if self._list_compact_after_id is not None:
+                self.root.after_cancel(self._list_compact_after_id)
+            self.compact_download_list()
+            if self.download_list is not None:
+                self.download_list.close()
+                self.download_list = None
+            self._list_merge_target = os.path.abspath(out_path)
+
+        def run():
+            try:
+                read, written = merge_lists(
+                    paths, out_path,
+                    on_progress=lambda read, written: self.root.after(
+                        0, self.status_var.set, f"正在合并列表: 已读取 {read} 项, 写入 {written} 项"))
+                self.root.after(0, self._finish_list_merge)
+                self.root.after(0, self.log_action, "合并列表", True,
+                                f"读取 {read} 项, 去重后 {written} 项 -> {out_path}")
+            except Exception as e:
+                error_msg = str(e)
+                logger.error(f"合并列表失败: {error_msg}")
+                self.root.after(0, lambda: [
+                    self._finish_list_merge(),
+                    self.log_action("合并列表", False, error_msg),
+                    messagebox.showerror("合并失败", f"合并列表时出错:\n{error_msg}")
+                ])
+
+        self.status_var.set("正在合并列表...")
+        threading.Thread(target=run, daemon=True).start()
+
+    def _finish_list_merge(self):
+        """合并结束后允许修改下载列表；合并写入的是当前列表时重新打开，读取合并结果"""
+        target, self._list_merge_target = self._list_merge_target, None
+        if target is not None and target == os.path.abspath(self.json_path):
+            try:
+                self.get_download_list()
+            except Exception as e:
+                logger.error(f"重新打开下载列表失败: {str(e)}")
+
+    def on_close(self):
+        """关闭窗口前把下载列表写回JSON，并写入最后一次统计快照"""
+        if self._list_compact_after_id is not None:
+            self.root.after_cancel(self._list_compact_after_id)
+        self.compact_download_list()
+        if self._stats_after_id is not None:
+            self.root.after_cancel(self._stats_after_id)
+        if self.album_manager is not None:
+            self.album_manager.shutdown()
+        self.progress.stop()
+        if self.metrics_writer is not None:
+            self.metrics_writer.stop()
+        self.root.destroy()
+
     def select_json_file(self):
         """
         弹出文件选择窗口，选择JSON文件并返回文件路径
         """
         try:
-            logging.info("选择JSON文件")
+            logger.debug("选择JSON文件")
             # 弹出文件选择对话框，只允许选择JSON文件
             file_path = filedialog.askopenfilename(
                 title="选择JSON文件",
@@ -984,7 +1431,19 @@ class ComicBrowser:
             logger.error(error_msg)
             messagebox.showerror("错误", f"选择文件时发生错误:\n{str(e)}")
             return None
-if __name__ == "__main__":
+def main(argv=None):
+    # 封面转码使用进程池，打包为exe后需要
+    multiprocessing.freeze_support()
+    argv = sys.argv[1:] if argv is None else argv
+    # 日志在后台线程写入，退出时写完队列中剩余的记录
+    atexit.register(setup_logging(load_config()["logging"]).stop)
+    
+    # 带子命令时以命令行模式运行，不创建窗口
+    if argv:
+        from harvest import main as harvest_main
+        return harvest_main(argv)
+    
+    import_gui()
     try:
         root = tk.Tk()
         app = ComicBrowser(root)
@@ -992,4 +1451,8 @@ if __name__ == "__main__":
     except Exception as e:
         logger.critical(f"应用程序崩溃: {str(e)}")
         traceback.print_exc()
-        messagebox.showerror("应用程序错误", f"程序遇到严重错误:\n{str(e)}\n\n请查看日志文件获取详细信息。")
\ No newline at end of file
+        messagebox.showerror("应用程序错误", f"程序遇到严重错误:\n{str(e)}\n\n请查看日志文件获取详细信息。")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
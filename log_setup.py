@@ -0,0 +1,77 @@
+"""日志配置：写日志不阻塞界面线程和下载线程
+
+各模块的日志记录只放入内存队列（QueueHandler），由QueueListener的后台线程写入控制台和日志文件。
+日志文件按大小或时间轮转，旧文件压缩为.gz；各子系统（ComicBrowser.search、ComicBrowser.cover等）
+的级别由配置文件中logging.levels指定，无需修改代码。
+"""
+import gzip
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+
+ROTATE_SIZE = "size"
+ROTATE_TIME = "time"
+
+FILE_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+CONSOLE_FORMAT = "%(levelname)s: %(message)s"
+
+
+def _gzip_namer(name):
+    return name + ".gz"
+
+
+def _gzip_rotator(source, dest):
+    """把轮转出的日志文件压缩后删除原文件"""
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def file_handler(path, conf):
+    """按配置创建轮转的文件处理器；compress为真时旧文件压缩为.gz"""
+    if conf["rotate"] == ROTATE_TIME:
+        handler = logging.handlers.TimedRotatingFileHandler(
+            path, when=conf["when"], backupCount=conf["backup_count"], encoding="utf-8")
+    else:
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=conf["max_bytes"], backupCount=conf["backup_count"], encoding="utf-8")
+    if conf["compress"]:
+        handler.namer = _gzip_namer
+        handler.rotator = _gzip_rotator
+    return handler
+
+
+def setup_logging(conf):
+    """按配置文件中的logging一节配置"ComicBrowser"日志，返回已启动的QueueListener
+
+    程序退出前调用listener.stop()，把队列中剩余的记录写完。
+    """
+    os.makedirs(conf["dir"], exist_ok=True)
+
+    to_file = file_handler(os.path.join(conf["dir"], conf["file"]), conf)
+    to_file.setLevel(conf["file_level"])
+    to_file.setFormatter(logging.Formatter(FILE_FORMAT))
+
+    console = logging.StreamHandler()
+    console.setLevel(conf["console_level"])
+    console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+
+    records = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(records, to_file, console, respect_handler_level=True)
+
+    logger = logging.getLogger("ComicBrowser")
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    logger.setLevel(logging.DEBUG)
+
+    for name, level in conf["levels"].items():
+        try:
+            logging.getLogger(name).setLevel(level.upper() if isinstance(level, str) else level)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"无效的日志级别: {name}={level}, {str(e)}")
+
+    listener.start()
+    return listener
@@ -0,0 +1,221 @@
+"""热点路径的耗时与计数统计
+
+各模块通过 timer()/observe()/incr() 记录，统计关闭时 timer() 返回共享的空上下文，
+incr() 只做一次全局变量判断，几乎没有开销。snapshot() 汇总当前数据，
+SnapshotWriter 定期把快照以JSON或Prometheus文本格式写入文件。
+
+名称用点分隔，如 fetch.album、cover.decode；耗时统计为次数、总计、最小、最大值。
+"""
+import json
+import logging
+import os
+import threading
+from time import perf_counter, time as get_time
+
+logger = logging.getLogger("ComicBrowser.metrics")
+
+METRICS_FORMAT_JSON = "json"
+METRICS_FORMAT_PROMETHEUS = "prometheus"
+# Prometheus指标名前缀
+PROMETHEUS_PREFIX = "comicbrowser_"
+
+_enabled = False
+_lock = threading.Lock()
+# 名称 -> [次数, 总耗时, 最小, 最大]
+_timers = {}
+_counters = {}
+# 名称 -> 数值或无参函数（生成快照时调用）
+_gauges = {}
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, perf_counter() - self.start)
+        return False
+
+
+def enabled():
+    return _enabled
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = bool(on)
+
+
+def timer(name):
+    """with metrics.timer("fetch.album"): ... 记录代码块耗时，异常时也会记录"""
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+
+def observe(name, seconds):
+    if not _enabled:
+        return
+    with _lock:
+        stat = _timers.get(name)
+        if stat is None:
+            _timers[name] = [1, seconds, seconds, seconds]
+        else:
+            stat[0] += 1
+            stat[1] += seconds
+            if seconds < stat[2]:
+                stat[2] = seconds
+            if seconds > stat[3]:
+                stat[3] = seconds
+
+
+def incr(name, n=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def set_gauge(name, value):
+    """记录当前值；value也可以是无参函数，在生成快照时才调用（如队列深度）"""
+    with _lock:
+        _gauges[name] = value
+
+
+def remove_gauge(name):
+    with _lock:
+        _gauges.pop(name, None)
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def snapshot():
+    """返回当前统计的字典：timers、counters、gauges"""
+    with _lock:
+        timers = {name: list(stat) for name, stat in _timers.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+    gauge_values = {}
+    for name, value in gauges.items():
+        if callable(value):
+            try:
+                value = value()
+            except Exception as e:
+                logger.debug(f"读取统计值失败: {name}, {str(e)}")
+                continue
+        gauge_values[name] = value
+    return {
+        "time": round(get_time(), 3),
+        "enabled": _enabled,
+        "timers": {
+            name: {
+                "count": count,
+                "total_s": round(total, 6),
+                "mean_ms": round(total / count * 1000, 3),
+                "min_ms": round(low * 1000, 3),
+                "max_ms": round(high * 1000, 3),
+            }
+            for name, (count, total, low, high) in sorted(timers.items())
+        },
+        "counters": dict(sorted(counters.items())),
+        "gauges": dict(sorted(gauge_values.items())),
+    }
+
+
+def _prometheus_name(name):
+    return PROMETHEUS_PREFIX + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def to_prometheus(snap):
+    """把快照转为Prometheus文本格式；耗时统计输出为summary的_count/_sum，另附_max"""
+    lines = []
+    for name, stat in snap["timers"].items():
+        metric = _prometheus_name(name) + "_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        lines.append(f"{metric}_count {stat['count']}")
+        lines.append(f"{metric}_sum {stat['total_s']}")
+        lines.append(f"# TYPE {metric}_max gauge")
+        lines.append(f"{metric}_max {round(stat['max_ms'] / 1000, 6)}")
+    for name, value in snap["counters"].items():
+        metric = _prometheus_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+    for name, value in snap["gauges"].items():
+        metric = _prometheus_name(name)
+        lines.append(f"# TYPE {metric} gauge")
+        lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot(path, fmt=METRICS_FORMAT_JSON):
+    """把当前快照写入文件（先写临时文件再替换，读取方不会看到写了一半的内容）"""
+    snap = snapshot()
+    text = to_prometheus(snap) if fmt == METRICS_FORMAT_PROMETHEUS else json.dumps(snap, ensure_ascii=False, indent=2)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class SnapshotWriter:
+    """后台线程每interval秒写一次快照，stop()时再写最后一次"""
+
+    def __init__(self, path, fmt=METRICS_FORMAT_JSON, interval=30):
+        self.path = path
+        self.format = fmt
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+            self._thread.start()
+        return self
+
+    def _write(self):
+        try:
+            write_snapshot(self.path, self.format)
+        except Exception as e:
+            logger.warning(f"写入统计快照失败: {self.path}, {str(e)}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._write()
+
+
+def configure(conf):
+    """按配置文件中的metrics一节开启统计，需要写快照时返回已启动的SnapshotWriter"""
+    enable(conf["enabled"])
+    if not conf["enabled"] or not conf["snapshot_path"]:
+        return None
+    logger.info(f"统计已开启，每 {conf['interval']} 秒写入 {conf['snapshot_path']}")
+    return SnapshotWriter(conf["snapshot_path"], conf["format"], conf["interval"]).start()
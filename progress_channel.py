@@ -0,0 +1,75 @@
+import logging
+import queue
+
+import metrics
+
+logger = logging.getLogger("ComicBrowser.progress")
+
+# 界面取后台事件的间隔（毫秒），即界面因后台进度刷新的最高频率
+UI_TICK_MS = 100
+
+
+class ProgressChannel:
+    """后台线程向界面汇报进度的唯一通道
+
+    任意线程调用 post(kind, payload) 放入线程安全的队列，不直接调用root.after；
+    主线程中一个固定间隔的after定时器一次取出全部事件，按类型合并后每种类型只调用一次处理函数
+    handler(payloads)，payloads为本次收到的该类型事件列表。不同类型按首次出现的顺序处理，
+    因此批量结束等事件总在它之前的进度事件之后处理。
+    """
+
+    def __init__(self, root, interval_ms=UI_TICK_MS):
+        self.root = root
+        self.interval_ms = interval_ms
+        self._events = queue.Queue()
+        self._handlers = {}
+        self._after_id = None
+
+    def subscribe(self, kind, handler):
+        self._handlers[kind] = handler
+
+    def post(self, kind, payload=None):
+        """可在任意线程调用"""
+        self._events.put((kind, payload))
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._tick)
+        return self
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def flush(self):
+        """立即处理已收到的全部事件，返回事件数"""
+        grouped = {}
+        count = 0
+        try:
+            while True:
+                kind, payload = self._events.get_nowait()
+                grouped.setdefault(kind, []).append(payload)
+                count += 1
+        except queue.Empty:
+            pass
+        if not count:
+            return 0
+
+        metrics.incr("ui.events", count)
+        with metrics.timer("ui.tick"):
+            for kind, payloads in grouped.items():
+                handler = self._handlers.get(kind)
+                if handler is None:
+                    logger.warning(f"未处理的界面事件: {kind}")
+                    continue
+                try:
+                    handler(payloads)
+                except Exception as e:
+                    logger.error(f"处理界面事件失败: {kind}, {str(e)}")
+        return count
+
+    def _tick(self):
+        self._after_id = None
+        self.flush()
+        self.start()
@@ -0,0 +1,245 @@
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("ComicBrowser.limiter")
+
+# 请求结果
+OUTCOME_OK = "ok"
+OUTCOME_ERROR = "error"
+OUTCOME_THROTTLED = "throttled"
+
+# 视为被站点限流的HTTP状态码
+THROTTLE_STATUS = (429, 503)
+# 没有状态码时（如接口返回的提示文字），出现这些说法的错误视为被限流；不含数字，不会与URL中的漫画ID混淆
+THROTTLE_PHRASES = ("Too Many Requests", "too many requests", "rate limit", "频繁", "限流")
+# 错误信息中状态码的固定写法："响应状态码为429"、"HTTP状态码: 503"、"http状态码=429"、"HTTP 429"
+_STATUS_IN_MESSAGE = re.compile(r"状态码(?:为|\s*[=:：])\s*(\d{3})(?!\d)|\bHTTP (\d{3})(?!\d)")
+
+
+def http_status(error):
+    """取异常或错误信息对应的HTTP状态码，取不到时返回None
+
+    依次查看异常携带的响应（jmcomic异常的context、requests/curl_cffi的response）、aiohttp/urllib
+    异常的status、重试全部失败时最后一次的异常和引发它的异常，最后才在错误信息中按状态码的固定写法查找，
+    不在整条信息中匹配数字（信息中的URL含有漫画ID）。
+    """
+    if isinstance(error, BaseException):
+        resp = getattr(error, "response", None)
+        context = getattr(error, "context", None)
+        if resp is None and isinstance(context, dict):
+            resp = context.get("resp")
+        for code in (getattr(resp, "status_code", None), getattr(resp, "http_code", None),
+                     getattr(error, "status", None)):
+            if isinstance(code, int):
+                return code
+        # jmcomic的RequestRetryAllFailException记录了每次重试的异常
+        errors = getattr(error, "errors", None)
+        if isinstance(errors, list) and errors and isinstance(errors[-1], dict):
+            code = http_status(errors[-1].get("error"))
+            if code is not None:
+                return code
+        if error.__cause__ is not None:
+            code = http_status(error.__cause__)
+            if code is not None:
+                return code
+    if error is None:
+        return None
+    match = _STATUS_IN_MESSAGE.search(str(error))
+    if match:
+        return int(match.group(1) or match.group(2))
+    return None
+
+
+def is_throttle_error(error):
+    """按HTTP状态码判断是否被站点限流；error为异常或错误信息"""
+    status = http_status(error)
+    if status is not None:
+        return status in THROTTLE_STATUS
+    text = str(error)
+    return any(phrase in text for phrase in THROTTLE_PHRASES)
+
+
+class TokenBucket:
+    """令牌桶：平均每秒最多rate个请求，允许burst个的突发；rate<=0表示不限速"""
+
+    def __init__(self, rate=0, burst=None):
+        self._lock = threading.Lock()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate, burst=None):
+        with self._lock:
+            self.rate = float(rate)
+            self.burst = float(burst if burst else max(1.0, self.rate))
+            self._tokens = self.burst
+            self._stamp = time.monotonic()
+
+    def acquire(self, tokens=1):
+        """取出tokens个令牌，不足时阻塞等待"""
+        while True:
+            with self._lock:
+                if self.rate <= 0:
+                    return
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def consume(self, tokens):
+        """用于事先不知道大小的传输：先扣除tokens（余额可以为负），再等到余额恢复为非负
+
+        例如图片下载完成后按字节数扣除，平均速率不超过rate。
+        """
+        with self._lock:
+            if self.rate <= 0:
+                return
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate) - tokens
+            self._stamp = now
+            wait = -self._tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class RateLimitedClient:
+    """为客户端的每次方法调用先从令牌桶取令牌，使限速作用于单个请求而不是整本漫画"""
+
+    def __init__(self, client, bucket):
+        self._client = client
+        self._bucket = bucket
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        def call(*args, **kwargs):
+            self._bucket.acquire()
+            return attr(*args, **kwargs)
+
+        return call
+
+
+class AdaptiveLimiter:
+    """AIMD自适应并发限制器，所有下载路径共享
+
+    请求成功且延迟正常时并发上限缓慢增加（每轮+1），
+    遇到限流、错误或延迟明显升高时按比例减小；bucket为全局共享的请求速率令牌桶。
+    """
+
+    def __init__(self, min_limit=1, max_limit=15, initial=4, latency_target=0,
+                 rate=0, burst=None, throttle_factor=0.5, error_factor=0.8, latency_factor=0.9):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.throttle_factor = throttle_factor
+        self.error_factor = error_factor
+        self.latency_factor = latency_factor
+        self.bucket = TokenBucket(rate, burst)
+
+        self._limit = float(max(min_limit, min(max_limit, initial)))
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        # 无延迟目标时以观测到的最小延迟作为基线
+        self._min_latency = None
+        self._last_decrease = 0.0
+        # try_acquire未取到名额时登记的回调，下次归还名额时调用
+        self._release_callbacks = []
+
+    @classmethod
+    def from_config(cls, conf):
+        return cls(
+            min_limit=conf["min_workers"],
+            max_limit=conf["max_workers"],
+            initial=conf["initial_workers"],
+            latency_target=conf["latency_target"],
+            rate=conf["rate_limit"],
+            burst=conf["burst"],
+        )
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def acquire(self):
+        """等待空闲的并发名额；速率令牌由各个请求自行从bucket中获取"""
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+
+    def try_acquire(self, on_release=None):
+        """不阻塞地取一个并发名额，成功返回True
+
+        名额已满时登记on_release，下次有名额归还时在归还的线程中调用一次（如唤醒事件循环中等待的协程）。
+        """
+        with self._cond:
+            if self._in_flight < int(self._limit):
+                self._in_flight += 1
+                return True
+            if on_release is not None:
+                self._release_callbacks.append(on_release)
+            return False
+
+    def release(self, latency, outcome=OUTCOME_OK):
+        """归还名额并根据本次结果调整并发上限；latency为None时成功结果不参与调整"""
+        with self._cond:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if outcome == OUTCOME_OK and latency is None:
+                pass
+            elif outcome == OUTCOME_OK:
+                if self._min_latency is None or latency < self._min_latency:
+                    self._min_latency = latency
+                target = self.latency_target or (self._min_latency * 3)
+                if latency > target and target > 0:
+                    self._decrease(self.latency_factor, now, latency)
+                else:
+                    # 加性增加：每完成一轮(约limit个请求)上限+1
+                    self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            elif outcome == OUTCOME_THROTTLED:
+                self._decrease(self.throttle_factor, now, latency or 0)
+            else:
+                self._decrease(self.error_factor, now, latency or 0)
+            self._cond.notify_all()
+            callbacks, self._release_callbacks = self._release_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def _decrease(self, factor, now, latency):
+        # 同一批并发请求的失败只减一次，避免上限瞬间降到最低
+        if now - self._last_decrease < max(latency, 0.1):
+            return
+        self._last_decrease = now
+        old = self._limit
+        self._limit = max(float(self.min_limit), self._limit * factor)
+        if int(old) != int(self._limit):
+            logger.info(f"下载并发上限调整: {int(old)} -> {int(self._limit)}")
+
+    @contextmanager
+    def slot(self, track_latency=True):
+        """在限制器控制下执行一次任务，异常按限流或错误计入
+
+        耗时与单次请求不可比的任务（如下载整本漫画）应传入track_latency=False
+        """
+        self.acquire()
+        start = time.monotonic()
+        outcome = OUTCOME_OK
+        try:
+            yield
+        except Exception as e:
+            outcome = OUTCOME_THROTTLED if is_throttle_error(e) else OUTCOME_ERROR
+            raise
+        finally:
+            latency = time.monotonic() - start
+            self.release(latency if track_latency or outcome != OUTCOME_OK else None, outcome)
@@ -0,0 +1,136 @@
+import logging
+
+import metrics
+
+logger = logging.getLogger("ComicBrowser.search")
+
+# 支持的字段限定前缀，如 tag:纯爱 author:xxx
+SEARCH_FIELDS = ("id", "title", "author", "tag")
+FIELD_ALIASES = {
+    "id": "id",
+    "title": "title",
+    "author": "author",
+    "tag": "tag",
+    "tags": "tag",
+}
+
+# 标签之间的分隔符，保证子串匹配不会跨越两个标签
+TAG_SEPARATOR = "\x00"
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def parse_query(query):
+    """将搜索字符串解析为 [(字段, 关键字)]，字段为None表示匹配任意字段"""
+    terms = []
+    for token in query.lower().split():
+        field = None
+        if ":" in token:
+            prefix, value = token.split(":", 1)
+            if prefix in FIELD_ALIASES:
+                field = FIELD_ALIASES[prefix]
+                token = value
+        if token:
+            terms.append((field, token))
+    return terms
+
+
+def _implies(new_terms, old_terms):
+    """新查询的结果是否必然是旧查询结果的子集（用于增量缩小结果集）"""
+    for old_field, old_text in old_terms:
+        if not any(new_field == old_field and old_text in new_text
+                   for new_field, new_text in new_terms):
+            return False
+    return True
+
+
+def _field_texts(comic):
+    data = comic["data"]
+    tags = data.get("tags") or []
+    return {
+        "id": str(comic["id"]).lower(),
+        "title": str(data.get("title", "")).lower(),
+        "author": str(data.get("author", "")).lower(),
+        "tag": TAG_SEPARATOR.join(str(tag).lower() for tag in tags),
+    }
+
+
+class SearchIndex:
+    """基于三元组(trigram)倒排表的漫画搜索索引，覆盖ID、标题、作者和标签"""
+
+    def __init__(self, comics):
+        self.size = len(comics)
+        # 每个字段预先转为小写的文本，按漫画在列表中的位置存储
+        self._texts = {field: [] for field in SEARCH_FIELDS}
+        self._postings = {field: {} for field in SEARCH_FIELDS}
+
+        for index, comic in enumerate(comics):
+            for field, text in _field_texts(comic).items():
+                self._texts[field].append(text)
+                postings = self._postings[field]
+                for gram in _trigrams(text):
+                    postings.setdefault(gram, set()).add(index)
+
+        # 上一次查询及其结果，用于输入追加字符时直接在旧结果上过滤
+        self._last_terms = None
+        self._last_result = None
+        logger.debug(f"搜索索引构建完成: {self.size} 个漫画")
+
+    def set(self, index, comic):
+        """替换列表中第index个漫画的索引；index等于size时追加到末尾"""
+        if index == self.size:
+            for field in SEARCH_FIELDS:
+                self._texts[field].append("")
+            self.size += 1
+        for field, text in _field_texts(comic).items():
+            postings = self._postings[field]
+            for gram in _trigrams(self._texts[field][index]):
+                postings[gram].discard(index)
+            self._texts[field][index] = text
+            for gram in _trigrams(text):
+                postings.setdefault(gram, set()).add(index)
+        self._last_terms, self._last_result = None, None
+
+    def _match_term(self, field, text, candidates):
+        """返回candidates中在field字段包含text的漫画位置集合"""
+        fields = SEARCH_FIELDS if field is None else (field,)
+        matched = set()
+        for f in fields:
+            pool = candidates
+            if len(text) >= 3:
+                postings = self._postings[f]
+                grams = sorted(_trigrams(text), key=lambda g: len(postings.get(g, ())))
+                for gram in grams:
+                    hits = postings.get(gram)
+                    if not hits:
+                        pool = set()
+                        break
+                    pool = hits if pool is None else pool & hits
+            if pool is None:
+                pool = range(self.size)
+            # 三元组只能缩小候选集，最终仍需确认子串匹配
+            texts = self._texts[f]
+            matched.update(i for i in pool if i not in matched and text in texts[i])
+        return matched
+
+    def search(self, query):
+        """执行查询，返回按原列表顺序排列的漫画位置列表；空查询返回全部"""
+        with metrics.timer("search.query"):
+            terms = parse_query(query)
+            if not terms:
+                self._last_terms, self._last_result = None, None
+                return list(range(self.size))
+
+            candidates = None
+            if self._last_terms is not None and _implies(terms, self._last_terms):
+                candidates = self._last_result
+
+            for field, text in terms:
+                candidates = self._match_term(field, text, candidates)
+                if not candidates:
+                    break
+
+            self._last_terms, self._last_result = terms, candidates
+            return sorted(candidates)
@@ -0,0 +1,56 @@
+"""定时刷新已下载漫画的统计数据（点赞、评论数等）
+
+album.json中的数据停留在下载时。刷新只重新请求漫画详情（不下载封面），与本地详情逐字段比较，
+只有内容变化的漫画才重写album.json；没有变化的只在索引中记录检查时间。
+每次按策略从全部漫画中选出一批：最久未获取（或检查）的，或点赞最多的。
+"""
+import json
+import logging
+from time import time as get_time
+
+import metrics
+from crawler import parse_count
+from detail_download import album_to_json
+
+logger = logging.getLogger("ComicBrowser.stats")
+
+# 选择刷新对象的策略
+REFRESH_OLDEST = "oldest"  # 最久未获取或检查的优先
+REFRESH_LIKES = "likes"    # 点赞最多的优先
+REFRESH_ORDERS = (REFRESH_OLDEST, REFRESH_LIKES)
+
+
+def select_for_refresh(candidates, order=REFRESH_OLDEST, limit=50, min_age=0, now=None):
+    """从 [(漫画ID, 最近获取或检查的时间, 点赞数)] 中选出最多limit本，跳过min_age秒内获取或检查过的"""
+    if order not in REFRESH_ORDERS:
+        raise ValueError(f"不支持的刷新策略: {order}")
+    now = get_time() if now is None else now
+    due = [row for row in candidates if now - row[1] >= min_age]
+    if order == REFRESH_LIKES:
+        due.sort(key=lambda row: (-parse_count(row[2]), row[1]))
+    else:
+        due.sort(key=lambda row: row[1])
+    return [row[0] for row in due[:limit]]
+
+
+def diff_album(old, new):
+    """逐字段比较本地详情和新获取的详情，返回 {字段: (旧值, 新值)}，只包含有变化的字段"""
+    # 新数据先按album.json的方式序列化，元组与列表等差异不算作变化
+    new = json.loads(json.dumps(new, ensure_ascii=False))
+    return {field: (old.get(field), value) for field, value in new.items() if old.get(field) != value}
+
+
+def refresh_album(client, store, comic_id):
+    """重新获取一本漫画的详情，有变化时只重写album.json，返回变化的字段（见diff_album）"""
+    old = store.read_album(comic_id)
+    with metrics.timer("stats.fetch"):
+        album = client.get_album_detail(comic_id)
+    changes = diff_album(old, album_to_json(album))
+    if changes:
+        # 保留本地详情中新数据没有的字段
+        store.write_album(comic_id, {**old, **{field: new for field, (_, new) in changes.items()}})
+        metrics.incr("stats.changed")
+        logger.debug(f"详情已更新: {comic_id}, 变化字段: {', '.join(changes)}")
+    else:
+        metrics.incr("stats.unchanged")
+    return changes
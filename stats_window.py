@@ -0,0 +1,74 @@
+import tkinter as tk
+from tkinter import ttk
+
+import metrics
+
+# 统计面板的刷新间隔（毫秒）
+STATS_REFRESH_MS = 1000
+
+
+class StatsWindow:
+    """显示metrics中的耗时、计数和当前值，每秒刷新一次"""
+
+    def __init__(self, master):
+        self.window = tk.Toplevel(master)
+        self.window.title("运行统计")
+        self.window.geometry("760x480")
+        self._after_id = None
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        toolbar = ttk.Frame(self.window)
+        toolbar.pack(fill=tk.X, padx=10, pady=(10, 5))
+        self.enabled_var = tk.BooleanVar(value=metrics.enabled())
+        ttk.Checkbutton(toolbar, text="开启统计", variable=self.enabled_var,
+                        command=lambda: metrics.enable(self.enabled_var.get())).pack(side=tk.LEFT)
+        ttk.Button(toolbar, text="清零", command=self.reset).pack(side=tk.RIGHT)
+
+        container = ttk.Frame(self.window)
+        container.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        scrollbar = ttk.Scrollbar(container)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        columns = ("count", "mean", "min", "max", "total")
+        self.tree = ttk.Treeview(container, columns=columns, yscrollcommand=scrollbar.set)
+        scrollbar.config(command=self.tree.yview)
+        self.tree.heading("#0", text="名称")
+        self.tree.column("#0", width=220, anchor=tk.W)
+        for column, text in zip(columns, ("次数/值", "平均(ms)", "最小(ms)", "最大(ms)", "总计(s)")):
+            self.tree.heading(column, text=text)
+            self.tree.column(column, width=100, anchor=tk.E)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.groups = {}
+        for group, text in (("timers", "耗时"), ("counters", "计数"), ("gauges", "当前值")):
+            self.groups[group] = self.tree.insert("", tk.END, text=text, open=True)
+        self.refresh()
+
+    def refresh(self):
+        snap = metrics.snapshot()
+        self.enabled_var.set(snap["enabled"])
+        rows = {
+            "timers": [(name, (stat["count"], stat["mean_ms"], stat["min_ms"], stat["max_ms"], stat["total_s"]))
+                       for name, stat in snap["timers"].items()],
+            "counters": [(name, (value, "", "", "", "")) for name, value in snap["counters"].items()],
+            "gauges": [(name, (value, "", "", "", "")) for name, value in snap["gauges"].items()],
+        }
+        for group, items in rows.items():
+            parent = self.groups[group]
+            # 已有的行只更新数值，保持滚动位置和展开状态
+            for name, values in items:
+                iid = f"{group}:{name}"
+                if self.tree.exists(iid):
+                    self.tree.item(iid, values=values)
+                else:
+                    self.tree.insert(parent, tk.END, iid=iid, text=name, values=values)
+        self._after_id = self.window.after(STATS_REFRESH_MS, self.refresh)
+
+    def reset(self):
+        metrics.reset()
+        for parent in (self.groups["timers"], self.groups["counters"]):
+            self.tree.delete(*self.tree.get_children(parent))
+
+    def close(self):
+        if self._after_id is not None:
+            self.window.after_cancel(self._after_id)
+        self.window.destroy()
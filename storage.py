@@ -0,0 +1,420 @@
+import argparse
+import io
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from time import time as get_time
+
+from thumbnails import (
+    COVER_NAME, CoverTranscoder, build_thumbnail, cover_name_for, ensure_thumbnail, find_cover,
+    remove_other_covers, render_thumbnail,
+)
+
+logger = logging.getLogger("ComicBrowser.storage")
+
+# 详情保存目录，每本漫画一个子目录
+DETAILS_DIR = "details"
+ALBUM_JSON_NAME = "album.json"
+# 下载中的封面，完成后转码或改名为正式的封面文件
+COVER_DOWNLOAD_NAME = "cover.download.png"
+# 打包存储的数据库文件
+PACKED_DB = "details.db"
+
+STORAGE_DIRECTORY = "directory"
+STORAGE_PACKED = "packed"
+
+# 打包存储中图片的种类
+IMAGE_COVER = "cover"
+IMAGE_THUMB = "thumb"
+
+
+def comic_dir(path, id):
+    return os.path.join(path, str(id))
+
+
+class DetailStore(ABC):
+    """漫画详情存储的公共接口
+
+    下载、索引和封面显示都通过存储读写，不直接访问文件，
+    以便在每本漫画一个目录（DirectoryStore）和单文件打包（PackedStore）之间切换。
+    """
+
+    kind = None
+    # 用于显示的存储位置
+    location = None
+    # 下载封面后的转码器，为None时保留原图
+    transcoder = None
+
+    @abstractmethod
+    def scan(self):
+        """返回 ({漫画ID: 修改时间}, [缺少详情的条目])"""
+
+    @abstractmethod
+    def album_mtime(self, id):
+        """album详情的修改时间，不存在时返回None"""
+
+    @abstractmethod
+    def has_cover(self, id):
+        """是否已有封面"""
+
+    @abstractmethod
+    def read_album(self, id):
+        """读取album详情，不存在时抛出异常"""
+
+    @abstractmethod
+    def write_album(self, id, album_json, mtime=None):
+        """mtime为None时取当前时间；迁移时传入原修改时间"""
+
+    @abstractmethod
+    def cover_target(self, id):
+        """上下文管理器：提供一个文件路径供下载器写入封面，正常退出后封面即保存到存储中"""
+
+    @abstractmethod
+    def read_cover_bytes(self, id):
+        """原始封面数据，不存在时返回None"""
+
+    @abstractmethod
+    def write_cover_bytes(self, id, data, mtime=None):
+        """写入原始封面数据，mtime含义同write_album"""
+
+    @abstractmethod
+    def build_thumbnail(self, id):
+        """由封面生成缩略图"""
+
+    @abstractmethod
+    def ensure_thumbnail(self, id):
+        """缩略图缺失或早于封面时重新生成"""
+
+    @abstractmethod
+    def cover_source(self, id):
+        """用于显示的封面（路径或文件对象），优先使用缩略图，缺失或过期时重新生成；没有封面时返回None"""
+
+    def comic_path(self, id):
+        """漫画在文件系统中的目录，打包存储时返回None"""
+        return None
+
+    @abstractmethod
+    def delete(self, id):
+        """删除漫画的所有数据，返回是否存在"""
+
+    def close(self):
+        if self.transcoder is not None:
+            self.transcoder.shutdown()
+
+
+class DirectoryStore(DetailStore):
+    """原有布局：details/<id>/album.json、封面（cover.png或转码后的cover.webp/cover.jpg）、thumb.webp"""
+
+    kind = STORAGE_DIRECTORY
+
+    def __init__(self, details_dir=DETAILS_DIR, transcoder=None):
+        self.details_dir = details_dir
+        self.location = details_dir
+        self.transcoder = transcoder
+
+    def _path(self, id, name):
+        return os.path.join(comic_dir(self.details_dir, id), name)
+
+    def scan(self):
+        found = {}
+        missing = []
+        with os.scandir(self.details_dir) as it:
+            for entry in it:
+                if not entry.is_dir():
+                    continue
+                json_path = os.path.join(entry.path, ALBUM_JSON_NAME)
+                try:
+                    json_mtime = os.stat(json_path).st_mtime
+                except OSError:
+                    missing.append(entry.path)
+                    continue
+                # album.json原地重写不一定改变目录的mtime，因此取两者较大值
+                found[entry.name] = max(entry.stat().st_mtime, json_mtime)
+        return found, missing
+
+    def album_mtime(self, id):
+        try:
+            return os.stat(self._path(id, ALBUM_JSON_NAME)).st_mtime
+        except OSError:
+            return None
+
+    def has_cover(self, id):
+        return find_cover(comic_dir(self.details_dir, id)) is not None
+
+    def read_album(self, id):
+        with open(self._path(id, ALBUM_JSON_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def write_album(self, id, album_json, mtime=None):
+        os.makedirs(comic_dir(self.details_dir, id), exist_ok=True)
+        path = self._path(id, ALBUM_JSON_NAME)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(album_json, f, ensure_ascii=False, indent=4)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    @contextmanager
+    def cover_target(self, id):
+        path = comic_dir(self.details_dir, id)
+        os.makedirs(path, exist_ok=True)
+        # 先下载到临时文件，完成后再转码或改名，避免留下写了一半的封面
+        raw_path = os.path.join(path, COVER_DOWNLOAD_NAME)
+        try:
+            yield raw_path
+            if self.transcoder is not None:
+                self.transcoder.transcode_file(raw_path, path)
+            else:
+                cover_path = os.path.join(path, COVER_NAME)
+                os.replace(raw_path, cover_path)
+                remove_other_covers(path, cover_path)
+        finally:
+            if os.path.exists(raw_path):
+                os.remove(raw_path)
+
+    def read_cover_bytes(self, id):
+        cover_path = find_cover(comic_dir(self.details_dir, id))
+        if cover_path is None:
+            return None
+        with open(cover_path, "rb") as f:
+            return f.read()
+
+    def write_cover_bytes(self, id, data, mtime=None):
+        path = comic_dir(self.details_dir, id)
+        os.makedirs(path, exist_ok=True)
+        # 文件名与数据的实际格式一致
+        cover_path = os.path.join(path, cover_name_for(data))
+        with open(cover_path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(cover_path + ".tmp", cover_path)
+        remove_other_covers(path, cover_path)
+        if mtime is not None:
+            os.utime(cover_path, (mtime, mtime))
+
+    def build_thumbnail(self, id):
+        build_thumbnail(comic_dir(self.details_dir, id))
+
+    def ensure_thumbnail(self, id):
+        ensure_thumbnail(comic_dir(self.details_dir, id))
+
+    def cover_source(self, id):
+        path = comic_dir(self.details_dir, id)
+        return ensure_thumbnail(path) or find_cover(path)
+
+    def comic_path(self, id):
+        return comic_dir(self.details_dir, id)
+
+    def delete(self, id):
+        path = comic_dir(self.details_dir, id)
+        if not os.path.exists(path):
+            return False
+        shutil.rmtree(path)
+        return True
+
+
+class PackedStore(DetailStore):
+    """单文件打包存储（SQLite）：详情和封面图片都保存在一个数据库中
+
+    详情以紧凑JSON保存，封面和缩略图以BLOB保存；读取时通过mmap访问数据库文件，
+    避免大量小文件带来的目录遍历、备份和杀毒扫描开销。
+    """
+
+    kind = STORAGE_PACKED
+
+    def __init__(self, db_path=PACKED_DB, mmap_size=256 * 1024 * 1024, transcoder=None):
+        self.db_path = db_path
+        self.location = db_path
+        self.transcoder = transcoder
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA mmap_size={int(mmap_size)}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS albums ("
+            "id TEXT PRIMARY KEY, "
+            "mtime REAL NOT NULL, "
+            "data TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            "id TEXT NOT NULL, "
+            "kind TEXT NOT NULL, "
+            "mtime REAL NOT NULL, "
+            "data BLOB NOT NULL, "
+            "PRIMARY KEY (id, kind))"
+        )
+        self._conn.commit()
+
+    def close(self):
+        super().close()
+        with self._lock:
+            self._conn.close()
+
+    def scan(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT id, mtime FROM albums")), []
+
+    def album_mtime(self, id):
+        with self._lock:
+            row = self._conn.execute("SELECT mtime FROM albums WHERE id = ?", (str(id),)).fetchone()
+        return row[0] if row else None
+
+    def _image(self, id, kind):
+        """返回 (mtime, data)，不存在时返回None"""
+        with self._lock:
+            return self._conn.execute("SELECT mtime, data FROM images WHERE id = ? AND kind = ?",
+                                      (str(id), kind)).fetchone()
+
+    def _put_image(self, id, kind, data, mtime=None):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO images (id, kind, mtime, data) VALUES (?, ?, ?, ?)",
+                               (str(id), kind, mtime or get_time(), sqlite3.Binary(data)))
+            self._conn.commit()
+
+    def has_cover(self, id):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM images WHERE id = ? AND kind = ?",
+                                      (str(id), IMAGE_COVER)).fetchone() is not None
+
+    def read_album(self, id):
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM albums WHERE id = ?", (str(id),)).fetchone()
+        if row is None:
+            raise KeyError(f"详情不存在: {id}")
+        return json.loads(row[0])
+
+    def write_album(self, id, album_json, mtime=None):
+        data = json.dumps(album_json, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO albums (id, mtime, data) VALUES (?, ?, ?)",
+                               (str(id), mtime or get_time(), data))
+            self._conn.commit()
+
+    @contextmanager
+    def cover_target(self, id):
+        # 下载器只能写文件，先写到临时文件再存入数据库
+        fd, path = tempfile.mkstemp(suffix=".png", prefix=f"cover_{id}_")
+        os.close(fd)
+        try:
+            yield path
+            with open(path, "rb") as f:
+                data = f.read()
+            if self.transcoder is not None:
+                cover, thumb = self.transcoder.transcode_bytes(data)
+                now = get_time()
+                self._put_image(id, IMAGE_COVER, cover, now)
+                self._put_image(id, IMAGE_THUMB, thumb, now)
+            else:
+                self.write_cover_bytes(id, data)
+        finally:
+            os.remove(path)
+
+    def read_cover_bytes(self, id):
+        row = self._image(id, IMAGE_COVER)
+        return bytes(row[1]) if row else None
+
+    def write_cover_bytes(self, id, data, mtime=None):
+        self._put_image(id, IMAGE_COVER, data, mtime)
+
+    def build_thumbnail(self, id):
+        data = self.read_cover_bytes(id)
+        if data is None:
+            raise KeyError(f"封面不存在: {id}")
+        buf = io.BytesIO()
+        render_thumbnail(io.BytesIO(data), buf)
+        self._put_image(id, IMAGE_THUMB, buf.getvalue())
+        return buf.getvalue()
+
+    def ensure_thumbnail(self, id):
+        """返回最新的缩略图数据，没有封面时返回None"""
+        cover = self._image(id, IMAGE_COVER)
+        if cover is None:
+            return None
+        thumb = self._image(id, IMAGE_THUMB)
+        if thumb is not None and thumb[0] >= cover[0]:
+            return thumb[1]
+        return self.build_thumbnail(id)
+
+    def cover_source(self, id):
+        try:
+            thumb = self.ensure_thumbnail(id)
+        except Exception as e:
+            logger.error(f"生成缩略图失败: {id}, {str(e)}")
+            cover = self.read_cover_bytes(id)
+            return io.BytesIO(cover) if cover is not None else None
+        return io.BytesIO(thumb) if thumb is not None else None
+
+    def delete(self, id):
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM albums WHERE id = ?", (str(id),)).rowcount
+            deleted += self._conn.execute("DELETE FROM images WHERE id = ?", (str(id),)).rowcount
+            self._conn.commit()
+        return deleted > 0
+
+
+def as_store(path_or_store):
+    """兼容以目录路径调用的旧接口：字符串按目录布局处理"""
+    if isinstance(path_or_store, DetailStore):
+        return path_or_store
+    return DirectoryStore(path_or_store)
+
+
+def open_store(conf):
+    """按配置中的storage部分打开存储"""
+    transcoder = CoverTranscoder.from_config(conf)
+    if conf.get("backend") == STORAGE_PACKED:
+        return PackedStore(conf.get("packed_path") or PACKED_DB, transcoder=transcoder)
+    return DirectoryStore(conf.get("details_dir") or DETAILS_DIR, transcoder=transcoder)
+
+
+def migrate(src, dst, on_progress=None):
+    """把src中的全部详情和封面复制到dst，保留修改时间，返回 (复制数量, 失败列表)
+
+    缩略图不复制，由目标存储按需重新生成。
+    """
+    found, missing = src.scan()
+    for item in missing:
+        logger.warning(f"跳过缺少详情的条目: {item}")
+    copied = 0
+    failed = []
+    for index, comic_id in enumerate(sorted(found)):
+        try:
+            album_json = src.read_album(comic_id)
+            cover = src.read_cover_bytes(comic_id)
+            dst.write_album(comic_id, album_json, mtime=found[comic_id])
+            if cover is not None:
+                dst.write_cover_bytes(comic_id, cover, mtime=found[comic_id])
+            copied += 1
+        except Exception as e:
+            failed.append((comic_id, str(e)))
+            logger.error(f"迁移失败: {comic_id}, {str(e)}")
+        if on_progress is not None:
+            on_progress(index + 1, len(found))
+    logger.info(f"迁移完成: {src.location} -> {dst.location}, 成功 {copied}, 失败 {len(failed)}")
+    return copied, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="在目录布局和单文件打包存储之间迁移漫画详情")
+    parser.add_argument("direction", choices=("pack", "unpack"),
+                        help="pack: 目录 -> 打包文件; unpack: 打包文件 -> 目录")
+    parser.add_argument("--details-dir", default=DETAILS_DIR)
+    parser.add_argument("--packed-path", default=PACKED_DB)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    directory = DirectoryStore(args.details_dir)
+    packed = PackedStore(args.packed_path)
+    if args.direction == "pack":
+        copied, failed = migrate(directory, packed)
+    else:
+        os.makedirs(args.details_dir, exist_ok=True)
+        copied, failed = migrate(packed, directory)
+    packed.close()
+    print(f"成功: {copied}, 失败: {len(failed)}")
@@ -0,0 +1,156 @@
+import asyncio
+import io
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from async_fetch import AsyncDetailEngine
+from rate_limit import AdaptiveLimiter
+from storage import DirectoryStore
+
+
+def cover_bytes():
+    buf = io.BytesIO()
+    Image.new("RGB", (36, 50), (200, 120, 40)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+class StandInServer(ThreadingHTTPServer):
+    """/album/<id> 返回详情，/image/<id> 返回封面；前throttled个详情请求返回429，并记录最大并发请求数"""
+    daemon_threads = True
+
+    def __init__(self, latency=0.05, throttled=0):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.latency = latency
+        self.throttled = throttled
+        self.cover = cover_bytes()
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            throttled = self.path.startswith("/album/") and server.throttled > 0
+            if throttled:
+                server.throttled -= 1
+        try:
+            time.sleep(server.latency)
+            kind, album_id = self.path.strip("/").split("/")
+            if throttled:
+                status, body = 429, b"Too Many Requests"
+            elif kind == "album":
+                status, body = 200, json.dumps({"id": album_id, "title": f"标题 {album_id}"}).encode("utf-8")
+            else:
+                status, body = 200, server.cover
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class ImageResp:
+    def __init__(self, content):
+        self.content = content
+
+    def require_success(self):
+        pass
+
+    def transfer_to(self, path, scramble_id, decode_image=True, img_url=None):
+        with open(path, "wb") as f:
+            f.write(self.content)
+
+
+class AsyncHttpClient:
+    """基于asyncio流的最小HTTP/1.0客户端，非200响应按jmcomic的写法报告状态码"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    async def _get(self, path):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write(f"GET {path} HTTP/1.0\r\nHost: {self.host}\r\n\r\n".encode())
+        await writer.drain()
+        data = await reader.read()
+        writer.close()
+        head, body = data.split(b"\r\n\r\n", 1)
+        status = int(head.split(b" ", 2)[1])
+        if status != 200:
+            raise RuntimeError(f"请求失败，响应状态码为{status}: {path}")
+        return body
+
+    async def get_album_detail(self, album_id):
+        data = json.loads(await self._get(f"/album/{album_id}"))
+        return SimpleNamespace(album_id=data["id"], title=data["title"], author="", description="", tags=[],
+                               comment_count=0, likes="0", works=[], related_list=[])
+
+    async def get_jm_image(self, url):
+        # 封面直链 .../media/albums/<id>.jpg
+        return ImageResp(await self._get("/image/" + url.rsplit("/", 1)[1].split(".")[0]))
+
+
+@pytest.fixture
+def engine_for(tmp_path):
+    engines = []
+
+    def create(server, limiter, concurrency=16):
+        host, port = server.server_address
+        engine = AsyncDetailEngine(DirectoryStore(str(tmp_path)), client_factory=lambda: AsyncHttpClient(host, port),
+                                   album_concurrency=concurrency, cover_concurrency=concurrency, limiter=limiter)
+        engines.append(engine)
+        return engine
+
+    yield create
+    for engine in engines:
+        engine.close()
+
+
+def test_engine_requests_share_limiter(tmp_path, engine_for):
+    limiter = AdaptiveLimiter(min_limit=1, max_limit=3, initial=3)
+    ids = [str(350300 + i) for i in range(12)]
+    with StandInServer() as server:
+        results = engine_for(server, limiter).fetch_many(ids)
+    assert all(success for success, _ in results.values()), results
+    # 详情和封面请求共用限制器的并发名额
+    assert server.max_in_flight <= 3
+    assert limiter.in_flight == 0
+    store = DirectoryStore(str(tmp_path))
+    assert store.read_album(ids[0])["title"] == f"标题 {ids[0]}"
+    assert all(store.has_cover(comic_id) for comic_id in ids)
+
+
+def test_engine_throttling_lowers_limit(engine_for):
+    limiter = AdaptiveLimiter(min_limit=1, max_limit=8, initial=8)
+    ids = [str(350300 + i) for i in range(8)]
+    with StandInServer(throttled=8) as server:
+        results = engine_for(server, limiter).fetch_many(ids)
+    assert not any(success for success, _ in results.values())
+    assert all("429" in error for _, error in results.values())
+    assert limiter.limit < 8
+    assert limiter.in_flight == 0
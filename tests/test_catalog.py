@@ -0,0 +1,45 @@
+import threading
+import time
+
+from catalog import CatalogIndex
+from storage import DirectoryStore
+
+
+def test_upsert_during_refresh_is_not_blocked_or_overwritten(tmp_path):
+    store = DirectoryStore(str(tmp_path / "details"))
+    for comic_id in ("350301", "350302", "350303"):
+        store.write_album(comic_id, {"id": comic_id, "title": f"旧标题 {comic_id}"})
+    catalog = CatalogIndex(store, db_path=str(tmp_path / "catalog.db"))
+    upserted = threading.Event()
+
+    def on_progress(done, total):
+        # 解析期间下载完成一本新的详情并写入索引
+        def download():
+            store.write_album("350302", {"id": "350302", "title": "新标题"}, mtime=time.time() + 100)
+            catalog.upsert(["350302"])
+            upserted.set()
+
+        thread = threading.Thread(target=download)
+        thread.start()
+        thread.join(timeout=5)
+
+    stats = catalog.refresh(on_progress)
+    assert upserted.is_set()
+    assert stats["added"] == 3
+    titles = {comic["id"]: comic["data"]["title"] for comic in catalog.load_all()}
+    assert titles == {"350301": "旧标题 350301", "350302": "新标题", "350303": "旧标题 350303"}
+    catalog.close()
+
+
+def test_refresh_removes_deleted_albums(tmp_path):
+    store = DirectoryStore(str(tmp_path / "details"))
+    for comic_id in ("350301", "350302"):
+        store.write_album(comic_id, {"id": comic_id, "title": comic_id})
+    catalog = CatalogIndex(store, db_path=str(tmp_path / "catalog.db"))
+    catalog.refresh()
+    catalog.mark_checked(["350302"])
+    store.delete("350302")
+    assert catalog.refresh()["removed"] == 1
+    assert [comic["id"] for comic in catalog.load_all()] == ["350301"]
+    assert [row[0] for row in catalog.refresh_candidates()] == ["350301"]
+    catalog.close()
@@ -0,0 +1,59 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from client_pool import ClientPool, jm_client_factory
+
+
+class FakeOption:
+    """记录new_jm_client调用的JmOption替身，未给出域名时模拟耗时的域名探测"""
+
+    def __init__(self):
+        self.client = SimpleNamespace(postman=SimpleNamespace(src_dict={"type": "curl_cffi"}))
+        self.calls = []
+        self.probing = 0
+        self.overlapped_probe = False
+        self._lock = threading.Lock()
+
+    def new_jm_client(self, domain_list=None):
+        with self._lock:
+            self.calls.append(domain_list)
+            if domain_list is None:
+                self.probing += 1
+                self.overlapped_probe = self.overlapped_probe or self.probing > 1
+        if domain_list is None:
+            time.sleep(0.05)
+            with self._lock:
+                self.probing -= 1
+            domain_list = ["example.com"]
+        return SimpleNamespace(get_domain_list=lambda: list(domain_list))
+
+
+def test_factory_probes_domains_once_across_threads():
+    option = FakeOption()
+    pool = ClientPool(jm_client_factory(option), size=8)
+    barrier = threading.Barrier(8)
+
+    def borrow(_):
+        barrier.wait()
+        with pool.client() as client:
+            time.sleep(0.01)
+            return client.get_domain_list()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        domains = list(executor.map(borrow, range(8)))
+    assert domains == [["example.com"]] * 8
+    assert not option.overlapped_probe
+    assert option.calls.count(None) == 1
+    assert option.calls[1:] == [["example.com"]] * (len(option.calls) - 1)
+    assert option.client.postman.src_dict["type"] == "curl_cffi_session"
+
+
+def test_client_pool_non_blocking_borrow():
+    pool = ClientPool(object, size=1)
+    with pool.client() as first:
+        with pool.client(block=False) as second:
+            assert first is not None and second is None
+    with pool.client(block=False) as again:
+        assert again is first
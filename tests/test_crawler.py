@@ -0,0 +1,100 @@
+from crawler import CRAWL_DONE, CRAWL_FAILED, CRAWL_QUEUED, RelatedCrawler
+from storage import DirectoryStore
+
+
+def album(comic_id, related):
+    return {"id": comic_id, "title": comic_id, "author": "", "tags": [], "likes": "0",
+            "related_list": [{"id": work_id, "name": work_id, "author": ""} for work_id in related]}
+
+
+def make_crawler(tmp_path):
+    store = DirectoryStore(str(tmp_path / "details"))
+    # 两个种子共享相关作品X：S1 -> W -> X，S2 -> X，X -> Y
+    for comic_id, related in (("S1", ["W"]), ("S2", ["X"]), ("W", ["X"]), ("X", ["Y"]), ("Y", [])):
+        store.write_album(comic_id, album(comic_id, related))
+    crawler = RelatedCrawler(str(tmp_path / "crawl.db"), store, max_depth=2)
+    crawler.add_seeds(["S1", "S2"])
+    return crawler
+
+
+def row(crawler, comic_id):
+    return crawler._conn.execute(
+        "SELECT depth, parent, state, priority FROM frontier WHERE id = ?", (comic_id,)).fetchone()
+
+
+def test_shared_related_id_takes_shallower_depth(tmp_path):
+    crawler = make_crawler(tmp_path)
+    crawler.finish("S1", 0, True)
+    crawler.finish("W", 1, True)
+    deep_priority = row(crawler, "X")[3]
+    assert row(crawler, "X")[:3] == (2, "W", CRAWL_QUEUED)
+
+    crawler.finish("S2", 0, True)
+    depth, parent, state, priority = row(crawler, "X")
+    assert (depth, parent, state) == (1, "S2", CRAWL_QUEUED)
+    # 深度权重为负，深度减小后优先级提高
+    assert priority > deep_priority
+
+    crawler.finish("X", 1, True)
+    assert row(crawler, "Y")[:2] == (2, "X")
+    crawler.close()
+
+
+def test_visited_deeper_id_is_requeued_and_expanded(tmp_path):
+    crawler = make_crawler(tmp_path)
+    crawler.finish("S1", 0, True)
+    crawler.finish("W", 1, True)
+    # X已按深度2访问，达到max_depth未展开
+    crawler.finish("X", 2, True)
+    assert row(crawler, "Y") is None
+
+    crawler.finish("S2", 0, True)
+    assert row(crawler, "X")[:3] == (1, "S2", CRAWL_QUEUED)
+    assert crawler.claim(5) == [("X", 1)]
+    crawler.finish("X", 1, True)
+    assert row(crawler, "Y")[:2] == (2, "X")
+    assert row(crawler, "X")[2] == CRAWL_DONE
+
+    # 更深的路径不会把已访问的ID放回边界
+    crawler.finish("W", 1, True)
+    assert row(crawler, "X")[:3] == (1, "S2", CRAWL_DONE)
+    crawler.close()
+
+
+def test_only_successful_downloads_count_toward_budget(tmp_path):
+    store = DirectoryStore(str(tmp_path / "details"))
+    crawler = RelatedCrawler(str(tmp_path / "crawl.db"), store, max_depth=1, max_attempts=3)
+    crawler.add_seeds(["A", "B", "C", "D"])
+    calls = []
+
+    def fetch(comic_id):
+        calls.append(comic_id)
+        if comic_id == "A" and calls.count("A") == 1:
+            return False, "请求失败，响应状态码为429"
+        if comic_id == "B":
+            return False, "请求的本子不存在！"
+        store.write_album(comic_id, album(comic_id, []))
+        return True, ""
+
+    assert crawler.run(fetch, workers=1, max_count=3) == 3
+    # A临时失败后重试成功；B永久失败，不再重试
+    assert sorted(calls) == ["A", "A", "B", "C", "D"]
+    assert row(crawler, "A")[2] == CRAWL_DONE
+    assert row(crawler, "B")[2] == CRAWL_FAILED
+    crawler.close()
+
+
+def test_transient_failures_retry_up_to_max_attempts(tmp_path):
+    store = DirectoryStore(str(tmp_path / "details"))
+    crawler = RelatedCrawler(str(tmp_path / "crawl.db"), store, max_depth=1, max_attempts=3)
+    crawler.add_seeds(["A"])
+    calls = []
+
+    def fetch(comic_id):
+        calls.append(comic_id)
+        return False, "Read timed out"
+
+    assert crawler.run(fetch, workers=2, max_count=10) == 0
+    assert calls == ["A", "A", "A"]
+    assert row(crawler, "A")[2] == CRAWL_FAILED
+    crawler.close()
@@ -0,0 +1,66 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from PIL import Image
+
+from client_pool import ClientPool
+from detail_download import download_detail
+from storage import DirectoryStore
+
+
+class ExclusiveClient:
+    """同一时间被两个线程使用时记录冲突的客户端替身"""
+
+    def __init__(self, latency=0.02):
+        self.latency = latency
+        self.overlaps = 0
+        self._busy = threading.Lock()
+
+    def _request(self):
+        if not self._busy.acquire(blocking=False):
+            self.overlaps += 1
+            return
+        try:
+            time.sleep(self.latency)
+        finally:
+            self._busy.release()
+
+    def get_album_detail(self, album_id):
+        self._request()
+        return SimpleNamespace(album_id=album_id, title=f"标题 {album_id}", author="", description="", tags=[],
+                               comment_count=0, likes="0", works=[], related_list=[])
+
+    def download_album_cover(self, album_id, save_path, size=""):
+        self._request()
+        Image.new("RGB", (36, 50)).save(save_path, "PNG")
+
+
+def test_download_detail_without_cover_client_is_sequential(tmp_path):
+    client = ExclusiveClient()
+    assert download_detail(client, "350312", "350312", DirectoryStore(str(tmp_path))) == (True, "")
+    assert client.overlaps == 0
+    assert DirectoryStore(str(tmp_path)).has_cover("350312")
+
+
+def test_pooled_clients_are_not_shared_between_threads(tmp_path):
+    clients = []
+
+    def factory():
+        clients.append(ExclusiveClient())
+        return clients[-1]
+
+    pool = ClientPool(factory, size=6)
+    store = DirectoryStore(str(tmp_path))
+
+    def fetch(comic_id):
+        with pool.client() as client, pool.client(block=False) as cover_client:
+            return download_detail(client, comic_id, comic_id, store, cover_client=cover_client)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(fetch, [str(350300 + i) for i in range(40)]))
+    assert all(success for success, _ in results), results
+    assert len(clients) <= 6
+    assert sum(client.overlaps for client in clients) == 0
+
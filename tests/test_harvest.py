@@ -0,0 +1,20 @@
+import io
+import json
+
+from detail_download import DETAIL_SKIPPED
+from harvest import STATUS_DOWNLOADED, JsonLinesReporter
+
+
+def test_reporter_counts_only_counted_statuses_and_retries():
+    stream = io.StringIO()
+    reporter = JsonLinesReporter(2, stream, counted=(STATUS_DOWNLOADED,))
+    reporter.result("350301", True, DETAIL_SKIPPED)
+    reporter.result("350302", False, "Read timed out")
+    reporter.result("350302", False, "Read timed out")
+    reporter.result("350302", True, "")
+    reporter.result("350303", True, "")
+    summary = reporter.summary()
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [record["done"] for record in records[:-1]] == [0, 0, 0, 1, 2]
+    assert all(record["done"] <= record["total"] for record in records[:-1])
+    assert summary["failed"] == 0 and summary["failed_ids"] == []
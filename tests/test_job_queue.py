@@ -0,0 +1,26 @@
+import pytest
+from jmcomic.jm_exception import MissingAlbumPhotoException
+
+from job_queue import is_transient_error
+
+
+class FakeResp:
+    status_code = 200
+
+
+@pytest.mark.parametrize("error, transient", [
+    # URL中的漫画ID不是状态码
+    ("请求失败: https://example.com/album/140404", True),
+    ("HTTP状态码: 429, url=https://example.com/album/140404", True),
+    ("响应状态码为404", False),
+    ("HTTP 410", False),
+    ("请求的本子不存在！(https://example.com/album/350312)", False),
+    ("Read timed out", True),
+])
+def test_is_transient_error_message(error, transient):
+    assert is_transient_error(error) is transient
+
+
+def test_is_transient_error_missing_album_exception():
+    error = MissingAlbumPhotoException("album missing", {"resp": FakeResp()})
+    assert not is_transient_error(error)
@@ -0,0 +1,31 @@
+import io
+import json
+
+import pytest
+
+from list_io import iter_json_array
+
+ITEMS = [
+    15000000000.0, 1.5e-7, -12, 0, 3, 123456789, 2.5E+10, "", "a,b]", "15000000000.0",
+    {"id": "350234", "title": "标题", "tags": ["x"]}, [1, [2.25]], True, None, "末尾",
+]
+
+
+@pytest.mark.parametrize("indent", [None, 4])
+def test_iter_json_array_across_chunk_boundaries(indent):
+    text = json.dumps(ITEMS, ensure_ascii=False, indent=indent)
+    for chunk_size in range(1, len(text) + 2):
+        assert list(iter_json_array(io.StringIO(text), chunk_size)) == ITEMS, chunk_size
+
+
+def test_iter_json_array_number_cut_inside_exponent():
+    # 在"."、"e"和数字之间截断
+    text = "[15000000000.0, 1e+30, 42]"
+    for chunk_size in range(1, len(text) + 1):
+        assert list(iter_json_array(io.StringIO(text), chunk_size)) == [15000000000.0, 1e+30, 42], chunk_size
+
+
+def test_iter_json_array_rejects_incomplete_array():
+    for chunk_size in (1, 3, 64):
+        with pytest.raises(ValueError):
+            list(iter_json_array(io.StringIO("[1, 2"), chunk_size))
@@ -0,0 +1,168 @@
+import pytest
+from jmcomic.jm_exception import RequestRetryAllFailException, ResponseUnexpectedException
+
+import rate_limit
+from rate_limit import OUTCOME_THROTTLED, AdaptiveLimiter, TokenBucket, http_status, is_throttle_error
+
+
+class FakeResp:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+@pytest.mark.parametrize("error, status, throttled", [
+    ("响应状态码为429", 429, True),
+    ("HTTP状态码: 503", 503, True),
+    ("http状态码=429", 429, True),
+    ("HTTP 429", 429, True),
+    ("HTTP状态码: 404, url=https://example.com/album/140429", 404, False),
+    # URL中的漫画ID不是状态码
+    ("请求失败: https://example.com/album/350312", None, False),
+    ("请求失败: https://example.com/album/429503", None, False),
+    ("请求过于频繁，请稍后再试", None, True),
+])
+def test_classify_error_message(error, status, throttled):
+    assert http_status(error) == status
+    assert is_throttle_error(error) is throttled
+
+
+def test_classify_exception_response():
+    error = ResponseUnexpectedException("请求失败: album/350312", {"resp": FakeResp(429)})
+    assert http_status(error) == 429
+    assert is_throttle_error(error)
+    assert not is_throttle_error(ResponseUnexpectedException("album/350429", {"resp": FakeResp(200)}))
+
+
+def test_classify_retry_all_failed_uses_last_error():
+    errors = [{"error": RuntimeError("HTTP 429")}, {"error": RuntimeError("HTTP 404")}]
+    error = RequestRetryAllFailException("请求重试全部失败", {"retry_errors": errors})
+    assert http_status(error) == 404
+    assert not is_throttle_error(error)
+
+
+class FakeClock:
+    """替换rate_limit中的time：sleep只推进时钟，不真正等待"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        # 与真实的sleep一样至少推进一点，避免极小的等待时间在浮点加法中被舍去
+        self.now += max(seconds, 1e-6)
+
+
+class ThrottlingClient:
+    """前throttled次请求返回429，之后每次请求耗时latency秒"""
+
+    def __init__(self, clock, throttled, latency=0.05):
+        self.clock = clock
+        self.throttled = throttled
+        self.latency = latency
+
+    def get_album_detail(self, album_id):
+        self.clock.sleep(self.latency)
+        if self.throttled > 0:
+            self.throttled -= 1
+            raise RuntimeError(f"HTTP状态码: 429, url=https://example.com/album/{album_id}")
+        return {"id": album_id}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def test_token_bucket_rate(clock):
+    bucket = TokenBucket(rate=10, burst=5)
+    start = clock.now
+    for _ in range(5):
+        bucket.acquire()
+    # 突发额度内不等待
+    assert clock.now == start
+    for _ in range(20):
+        bucket.acquire()
+    assert clock.now - start == pytest.approx(2.0)
+
+
+def test_token_bucket_consume_keeps_average_rate(clock):
+    bucket = TokenBucket(rate=1000, burst=1000)
+    start = clock.now
+    for _ in range(5):
+        bucket.consume(600)
+    # 3000个令牌减去初始的1000个突发额度
+    assert clock.now - start == pytest.approx(2.0)
+
+
+def test_token_bucket_unlimited(clock):
+    bucket = TokenBucket(rate=0)
+    for _ in range(100):
+        bucket.acquire()
+    assert clock.now == 1000.0
+
+
+def test_aimd_additive_increase(clock):
+    limiter = AdaptiveLimiter(min_limit=1, max_limit=6, initial=4)
+    client = ThrottlingClient(clock, throttled=0)
+    for i in range(4):
+        with limiter.slot():
+            client.get_album_detail(i)
+    # 每完成约limit个请求上限+1
+    assert limiter.limit == 4
+    for i in range(2):
+        with limiter.slot():
+            client.get_album_detail(i)
+    assert limiter.limit == 5
+    for i in range(100):
+        with limiter.slot():
+            client.get_album_detail(i)
+    assert limiter.limit == 6
+    assert limiter.in_flight == 0
+
+
+def test_aimd_multiplicative_decrease_on_throttle(clock):
+    limiter = AdaptiveLimiter(min_limit=1, max_limit=16, initial=16)
+    client = ThrottlingClient(clock, throttled=3)
+    with pytest.raises(RuntimeError):
+        with limiter.slot():
+            client.get_album_detail(350312)
+    assert limiter.limit == 8
+    # 同一批并发请求的失败只减一次
+    with pytest.raises(RuntimeError):
+        with limiter.slot():
+            client.get_album_detail(350312)
+    assert limiter.limit == 8
+    clock.sleep(1)
+    with pytest.raises(RuntimeError):
+        with limiter.slot():
+            client.get_album_detail(350312)
+    assert limiter.limit == 4
+    # 限流结束后逐渐恢复
+    for i in range(30):
+        with limiter.slot():
+            client.get_album_detail(i)
+    assert limiter.limit > 4
+    assert limiter.in_flight == 0
+
+
+def test_aimd_decrease_on_error_and_latency(clock):
+    limiter = AdaptiveLimiter(min_limit=2, max_limit=10, initial=10, latency_target=0.5)
+    with pytest.raises(ValueError):
+        with limiter.slot():
+            raise ValueError("请求失败: https://example.com/album/429429")
+    # 非限流错误按error_factor减小
+    assert limiter.limit == 8
+    clock.sleep(1)
+    with limiter.slot():
+        clock.sleep(2)
+    # 延迟超过目标按latency_factor减小
+    assert limiter.limit == 7
+    for _ in range(20):
+        clock.sleep(3)
+        limiter.acquire()
+        limiter.release(0.01, OUTCOME_THROTTLED)
+    assert limiter.limit == 2
@@ -0,0 +1,21 @@
+import time
+
+from catalog import CatalogIndex
+from stats_refresh import REFRESH_LIKES, select_for_refresh
+from storage import DirectoryStore
+
+
+def test_checked_ids_rotate_to_the_back(tmp_path):
+    store = DirectoryStore(str(tmp_path / "details"))
+    for i, comic_id in enumerate(("350301", "350302", "350303")):
+        store.write_album(comic_id, {"id": comic_id, "likes": str(100 - i)})
+    catalog = CatalogIndex(store, db_path=str(tmp_path / "catalog.db"))
+    catalog.refresh()
+    now = time.time() + 24 * 3600
+    assert sorted(select_for_refresh(catalog.refresh_candidates(), now=now)) == ["350301", "350302", "350303"]
+    # 检查过（包括刷新失败）的漫画下次排到后面
+    catalog.mark_checked(["350301", "350302"], when=now - 60)
+    assert select_for_refresh(catalog.refresh_candidates(), limit=1, now=now) == ["350303"]
+    # 按点赞排序时，min_age内检查过的不会被再次选中
+    assert select_for_refresh(catalog.refresh_candidates(), REFRESH_LIKES, min_age=3600, now=now) == ["350303"]
+    catalog.close()
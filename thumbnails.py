@@ -0,0 +1,278 @@
+import argparse
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image
+
+logger = logging.getLogger("ComicBrowser.thumbnails")
+
+# 下载器写出的原始封面
+COVER_NAME = "cover.png"
+THUMB_NAME = "thumb.webp"
+# 与详情面板封面区域一致的最大尺寸
+THUMB_SIZE = (200, 300)
+THUMB_QUALITY = 85
+
+# 封面转码格式: 配置名 -> (PIL格式, 文件名)；original表示保留下载的原图
+COVER_FORMAT_ORIGINAL = "original"
+COVER_FORMATS = {
+    "webp": ("WEBP", "cover.webp"),
+    "jpeg": ("JPEG", "cover.jpg"),
+    "png": ("PNG", COVER_NAME),
+}
+# 查找封面时依次尝试的文件名，转码后的封面优先
+COVER_NAMES = ("cover.webp", "cover.jpg", COVER_NAME)
+
+
+def thumb_path(comic_dir):
+    return os.path.join(comic_dir, THUMB_NAME)
+
+
+def find_cover(comic_dir):
+    """返回目录中的封面路径（任意格式），没有封面时返回None"""
+    for name in COVER_NAMES:
+        path = os.path.join(comic_dir, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def cover_name_for(data):
+    """按文件头判断封面数据的格式，返回对应的文件名"""
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "cover.webp"
+    if data[:3] == b"\xff\xd8\xff":
+        return "cover.jpg"
+    return COVER_NAME
+
+
+def remove_other_covers(comic_dir, keep):
+    """删除与keep不同格式的旧封面，避免旧文件遮住新封面"""
+    for name in COVER_NAMES:
+        path = os.path.join(comic_dir, name)
+        if path != keep and os.path.exists(path):
+            os.remove(path)
+
+
+def needs_rebuild(comic_dir):
+    """缩略图不存在或早于封面时需要重新生成；没有封面时返回False"""
+    cover_path = find_cover(comic_dir)
+    if cover_path is None:
+        return False
+    try:
+        cover_mtime = os.stat(cover_path).st_mtime
+    except OSError:
+        return False
+    try:
+        return os.stat(thumb_path(comic_dir)).st_mtime < cover_mtime
+    except OSError:
+        return True
+
+
+def _fit(img, max_size):
+    """按比例缩小到max_size以内，不放大"""
+    max_width, max_height = max_size
+    width, height = img.size
+    ratio = min(max_width / width, max_height / height, 1.0)
+    if ratio >= 1.0:
+        return img
+    new_size = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+    return img.resize(new_size, Image.LANCZOS)
+
+
+def render_thumbnail(source, target):
+    """把source（路径或文件对象）中的封面缩放后以WebP写入target（路径或文件对象）"""
+    with Image.open(source) as img:
+        max_width, max_height = THUMB_SIZE
+        width, height = img.size
+        ratio = min(max_width / width, max_height / height)
+        new_size = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        img = img.resize(new_size, Image.LANCZOS)
+        img.save(target, "WEBP", quality=THUMB_QUALITY)
+
+
+def build_thumbnail(comic_dir):
+    """由封面生成缩放后的thumb.webp，返回缩略图路径"""
+    cover_path = find_cover(comic_dir)
+    if cover_path is None:
+        raise FileNotFoundError(os.path.join(comic_dir, COVER_NAME))
+    target = thumb_path(comic_dir)
+    # 先写临时文件再替换，避免读到写了一半的缩略图
+    tmp_path = target + ".tmp"
+    render_thumbnail(cover_path, tmp_path)
+    os.replace(tmp_path, target)
+    return target
+
+
+def transcode_cover(source, cover_target, thumb_target, fmt="webp", quality=85, max_size=None):
+    """解码一次原图，同时写出转码（并限制尺寸）后的封面和缩略图；source和target可为路径或文件对象"""
+    pil_format = COVER_FORMATS[fmt][0]
+    with Image.open(source) as img:
+        # JPEG不支持透明通道
+        has_alpha = "A" in img.getbands() and pil_format != "JPEG"
+        img = img.convert("RGBA" if has_alpha else "RGB")
+        cover = _fit(img, max_size) if max_size else img
+        options = {"quality": quality} if pil_format in ("WEBP", "JPEG") else {"optimize": True}
+        cover.save(cover_target, pil_format, **options)
+        _fit(img, THUMB_SIZE).save(thumb_target, "WEBP", quality=THUMB_QUALITY)
+
+
+def transcode_cover_file(source, comic_dir, fmt="webp", quality=85, max_size=None):
+    """进程池中执行：把source转码为comic_dir中的封面和缩略图，返回封面路径"""
+    cover_path = os.path.join(comic_dir, COVER_FORMATS[fmt][1])
+    thumb = thumb_path(comic_dir)
+    # 先写临时文件再替换
+    transcode_cover(source, cover_path + ".tmp", thumb + ".tmp", fmt, quality, max_size)
+    os.replace(cover_path + ".tmp", cover_path)
+    os.replace(thumb + ".tmp", thumb)
+    remove_other_covers(comic_dir, cover_path)
+    return cover_path
+
+
+def transcode_cover_bytes(data, fmt="webp", quality=85, max_size=None):
+    """进程池中执行：返回 (封面数据, 缩略图数据)"""
+    cover, thumb = io.BytesIO(), io.BytesIO()
+    transcode_cover(io.BytesIO(data), cover, thumb, fmt, quality, max_size)
+    return cover.getvalue(), thumb.getvalue()
+
+
+class CoverTranscoder:
+    """下载封面后在进程池中转码和缩小，避免图片编码与下载线程争用GIL
+
+    进程池在第一次使用时创建，所有下载线程共享。
+    """
+
+    def __init__(self, fmt="webp", quality=85, max_size=(600, 900), workers=None):
+        if fmt not in COVER_FORMATS:
+            raise ValueError(f"不支持的封面格式: {fmt}")
+        self.fmt = fmt
+        self.quality = quality
+        self.max_size = tuple(max_size) if max_size else None
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, conf):
+        """conf为配置中的storage部分，cover_format为original时返回None"""
+        fmt = conf.get("cover_format", COVER_FORMAT_ORIGINAL)
+        if fmt == COVER_FORMAT_ORIGINAL:
+            return None
+        return cls(fmt, conf.get("cover_quality", 85), conf.get("cover_max_size"), conf.get("cover_workers"))
+
+    def _submit(self, func, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            executor = self._executor
+        return executor.submit(func, *args, self.fmt, self.quality, self.max_size)
+
+    def transcode_file(self, source, comic_dir):
+        """阻塞等待转码完成，返回封面路径"""
+        return self._submit(transcode_cover_file, source, comic_dir).result()
+
+    def transcode_bytes(self, data):
+        return self._submit(transcode_cover_bytes, data).result()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+def ensure_thumbnail(comic_dir):
+    """返回可用的缩略图路径，缺失或过期时重新生成；没有封面时返回None"""
+    if needs_rebuild(comic_dir):
+        try:
+            return build_thumbnail(comic_dir)
+        except Exception as e:
+            logger.error(f"生成缩略图失败: {comic_dir}, {str(e)}")
+            return None
+    path = thumb_path(comic_dir)
+    return path if os.path.exists(path) else None
+
+
+def build_all_thumbnails(details_dir="details", workers=None, force=False):
+    """多进程批量为已有的漫画详情生成缩略图，返回 (生成数量, 失败列表)"""
+    comic_dirs = []
+    with os.scandir(details_dir) as it:
+        for entry in it:
+            if not entry.is_dir():
+                continue
+            if force and find_cover(entry.path) is not None:
+                comic_dirs.append(entry.path)
+            elif needs_rebuild(entry.path):
+                comic_dirs.append(entry.path)
+
+    built = 0
+    failed = []
+    if not comic_dirs:
+        return built, failed
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(build_thumbnail, d): d for d in comic_dirs}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                built += 1
+            except Exception as e:
+                failed.append((futures[future], str(e)))
+                logger.error(f"生成缩略图失败: {futures[future]}, {str(e)}")
+    logger.info(f"缩略图生成完成: 成功 {built}, 失败 {len(failed)}")
+    return built, failed
+
+
+def transcode_all_covers(details_dir="details", fmt="webp", quality=85, max_size=None, workers=None):
+    """多进程把已有的封面转码为fmt格式（同时重建缩略图），返回 (转码数量, 失败列表)"""
+    target_name = COVER_FORMATS[fmt][1]
+    jobs = []
+    with os.scandir(details_dir) as it:
+        for entry in it:
+            if not entry.is_dir():
+                continue
+            cover_path = find_cover(entry.path)
+            if cover_path is not None and os.path.basename(cover_path) != target_name:
+                jobs.append((cover_path, entry.path))
+
+    done = 0
+    failed = []
+    if not jobs:
+        return done, failed
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(transcode_cover_file, src, d, fmt, quality, max_size): d for src, d in jobs}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                done += 1
+            except Exception as e:
+                failed.append((futures[future], str(e)))
+                logger.error(f"封面转码失败: {futures[future]}, {str(e)}")
+    logger.info(f"封面转码完成: 成功 {done}, 失败 {len(failed)}")
+    return done, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="为details目录下的漫画批量生成封面缩略图")
+    parser.add_argument("details_dir", nargs="?", default="details")
+    parser.add_argument("--workers", type=int, default=None, help="进程数，默认为CPU核数")
+    parser.add_argument("--force", action="store_true", help="重新生成所有缩略图")
+    parser.add_argument("--transcode", choices=sorted(COVER_FORMATS), default=None,
+                        help="把已有封面转码为指定格式（同时重建缩略图）")
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--max-size", type=int, nargs=2, default=None, metavar=("W", "H"),
+                        help="转码时封面的最大尺寸")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    if args.transcode:
+        built, failed = transcode_all_covers(args.details_dir, args.transcode, args.quality,
+                                             args.max_size, args.workers)
+    else:
+        built, failed = build_all_thumbnails(args.details_dir, args.workers, args.force)
+    print(f"成功: {built}, 失败: {len(failed)}")
@@ -0,0 +1,209 @@
+import tkinter as tk
+from tkinter import ttk
+
+# 状态提示行（如“未找到漫画数据”）使用的固定iid
+MESSAGE_IID = "__message__"
+
+
+class VirtualList:
+    """Treeview虚拟列表：数据模型保存在Python中，只实例化可见区域加少量缓冲的行
+
+    Treeview中的行是固定数量的“槽位”，滚动时只更新槽位的内容；
+    选中状态按模型中的ID记录，与行在Treeview中的位置无关。
+    """
+
+    def __init__(self, tree, scrollbar, get_values, on_select=None, buffer=3):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.get_values = get_values
+        self.on_select = on_select
+        self.buffer = buffer
+
+        self.rows = []
+        self._positions = {}
+        self.top = 0
+        self.visible = 1
+        self.selected_id = None
+        # 槽位iid及其当前显示的模型ID
+        self._slots = []
+        self._slot_rows = []
+
+        # 由虚拟列表自行管理滚动条
+        self.tree.config(yscrollcommand="")
+        self.scrollbar.config(command=self._on_scrollbar)
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", self._on_wheel)
+        self.tree.bind("<Button-5>", self._on_wheel)
+        self.tree.bind("<Up>", lambda e: self._move(-1))
+        self.tree.bind("<Down>", lambda e: self._move(1))
+        self.tree.bind("<Prior>", lambda e: self._move(-self.visible))
+        self.tree.bind("<Next>", lambda e: self._move(self.visible))
+        self.tree.bind("<Home>", lambda e: self._move(-len(self.rows)))
+        self.tree.bind("<End>", lambda e: self._move(len(self.rows)))
+
+    @property
+    def ids(self):
+        return self.rows
+
+    def index_of(self, item_id):
+        """返回ID在当前模型中的位置，不存在时返回None"""
+        return self._positions.get(item_id)
+
+    def set_rows(self, ids):
+        """替换模型数据；若原选中项仍在新数据中则保持选中"""
+        self._clear_message()
+        self.rows = list(ids)
+        self._positions = {item_id: i for i, item_id in enumerate(self.rows)}
+        if self.selected_id not in self._positions:
+            self.selected_id = None
+        self.top = 0
+        self._ensure_visible()
+        self._refill()
+
+    def append_rows(self, ids):
+        """在末尾追加行，不改变滚动位置和选中项；只有可见区域未填满时才更新槽位"""
+        self._clear_message()
+        start = len(self.rows)
+        self.rows.extend(ids)
+        for i in range(start, len(self.rows)):
+            self._positions[self.rows[i]] = i
+        if start < self.top + self.visible + self.buffer:
+            self._refill()
+        elif self.rows:
+            self.scrollbar.set(self.top / len(self.rows), min(1.0, (self.top + self.visible) / len(self.rows)))
+
+    def show_message(self, text):
+        """清空模型，只显示一行提示信息"""
+        self.rows = []
+        self._positions = {}
+        self.selected_id = None
+        self.top = 0
+        self._refill()
+        if not self.tree.exists(MESSAGE_IID):
+            self.tree.insert("", tk.END, iid=MESSAGE_IID, values=("", text))
+        else:
+            self.tree.item(MESSAGE_IID, values=("", text))
+
+    def select(self, item_id, notify=True):
+        """按ID选中一行并滚动到可见位置"""
+        if item_id not in self._positions:
+            return
+        self.selected_id = item_id
+        self._ensure_visible()
+        self._refill()
+        if notify and self.on_select:
+            self.on_select(item_id)
+
+    def refresh(self):
+        """模型中某些行的显示内容变化后重新填充可见行"""
+        self._slot_rows = [None] * len(self._slot_rows)
+        self._refill()
+
+    def _clear_message(self):
+        if self.tree.exists(MESSAGE_IID):
+            self.tree.delete(MESSAGE_IID)
+
+    def _ensure_visible(self):
+        index = self._positions.get(self.selected_id)
+        if index is None:
+            return
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.visible:
+            self.top = index - self.visible + 1
+
+    def _refill(self):
+        total = len(self.rows)
+        self.top = max(0, min(self.top, total - self.visible))
+        window = self.rows[self.top:self.top + self.visible + self.buffer]
+
+        # 增减槽位数量
+        while len(self._slots) < len(window):
+            slot = f"__slot{len(self._slots)}__"
+            self.tree.insert("", tk.END, iid=slot, values=("", ""))
+            self._slots.append(slot)
+            self._slot_rows.append(None)
+        if len(self._slots) > len(window):
+            self.tree.delete(*self._slots[len(window):])
+            del self._slots[len(window):]
+            del self._slot_rows[len(window):]
+
+        # 只更新内容发生变化的槽位
+        selected_slot = None
+        for k, item_id in enumerate(window):
+            if self._slot_rows[k] != item_id:
+                self.tree.item(self._slots[k], values=self.get_values(item_id))
+                self._slot_rows[k] = item_id
+            if item_id == self.selected_id:
+                selected_slot = self._slots[k]
+
+        if selected_slot is not None:
+            if self.tree.selection() != (selected_slot,):
+                self.tree.selection_set(selected_slot)
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+
+        # 槽位本身不滚动，滚动条位置由模型位置决定
+        self.tree.yview_moveto(0)
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible) / total))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _scroll_to(self, top):
+        self.top = int(top)
+        self._refill()
+
+    def _on_scrollbar(self, *args):
+        if not self.rows:
+            return
+        if args[0] == "moveto":
+            self._scroll_to(float(args[1]) * len(self.rows))
+        elif args[0] == "scroll":
+            step = self.visible if args[2] == "pages" else 1
+            self._scroll_to(self.top + int(args[1]) * step)
+
+    def _on_wheel(self, event):
+        if event.num == 4:
+            delta = -3
+        elif event.num == 5:
+            delta = 3
+        else:
+            # Windows下delta为120的倍数，macOS下为较小的整数
+            notches = event.delta / 120 if abs(event.delta) >= 120 else (1 if event.delta > 0 else -1)
+            delta = -int(notches * 3)
+        self._scroll_to(self.top + delta)
+        return "break"
+
+    def _on_configure(self, event):
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # 减去一行表头的高度
+        visible = max(1, event.height // rowheight - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self._ensure_visible()
+            self._refill()
+
+    def _move(self, delta):
+        if not self.rows:
+            return "break"
+        index = self._positions.get(self.selected_id)
+        if index is None:
+            index = self.top - 1 if delta > 0 else self.top + self.visible
+        index = max(0, min(len(self.rows) - 1, index + delta))
+        self.select(self.rows[index])
+        return "break"
+
+    def _on_tree_select(self, event):
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self._slots:
+            return
+        item_id = self._slot_rows[self._slots.index(selection[0])]
+        if item_id is None or item_id == self.selected_id:
+            return
+        self.selected_id = item_id
+        if self.on_select:
+            self.on_select(item_id)